@@ -0,0 +1,222 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import multiprocessing
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+import psutil
+
+from src.core_processes.processing_2d.mediapipe.mediapipe_skeleton_detector import MediapipeSkeletonDetector
+from src.data_layer.session_models.post_processing_parameter_models import MediapipeParametersModel
+from src.system.paths_and_filenames.folder_and_filenames import SYNCHRONIZED_VIDEOS_FOLDER_NAME
+
+# MediapipeParametersModel overrides for each way `process_folder` can run
+EXECUTION_MODES = {
+    "serial": dict(use_multiprocessing=False, use_threaded_pipeline=False),
+    "threaded": dict(use_multiprocessing=False, use_threaded_pipeline=True),
+    "multiprocessing": dict(use_multiprocessing=True, number_of_chunks_per_video=1),
+    "chunked": dict(use_multiprocessing=True, number_of_chunks_per_video=None),
+    "streaming": dict(use_multiprocessing=False, use_threaded_pipeline=True, stream_landmarks_to_disk=True),
+}
+
+PEAK_RSS_SAMPLE_INTERVAL_SECONDS = 0.05
+
+
+def create_synthetic_session(
+    session_folder_path: Union[str, Path],
+    number_of_cameras: int = 3,
+    number_of_frames: int = 150,
+    image_width: int = 1280,
+    image_height: int = 720,
+    framerate: float = 30.0,
+    seed: int = 0,
+) -> Path:
+    """
+    Writes `number_of_cameras` mp4s of moving shapes over a textured background into a session's synchronized videos
+    folder, so decoding and encoding cost roughly what they do on real recordings. Returns the videos folder
+    """
+    synchronized_videos_folder_path = Path(session_folder_path) / SYNCHRONIZED_VIDEOS_FOLDER_NAME
+    synchronized_videos_folder_path.mkdir(exist_ok=True, parents=True)
+    random_number_generator = np.random.default_rng(seed)
+
+    for camera_index in range(number_of_cameras):
+        background = cv2.resize(
+            random_number_generator.integers(0, 256, (image_height // 32, image_width // 32, 3), dtype=np.uint8),
+            (image_width, image_height),
+            interpolation=cv2.INTER_CUBIC,
+        )
+        shape_centers_XY = random_number_generator.random((4, 2)) * (image_width, image_height)
+        shape_velocities_XY = (random_number_generator.random((4, 2)) - 0.5) * 20
+
+        video_writer = cv2.VideoWriter(
+            str(synchronized_videos_folder_path / f"cam{camera_index}.mp4"),
+            cv2.VideoWriter_fourcc(*"mp4v"),
+            framerate,
+            (image_width, image_height),
+        )
+        try:
+            for frame_number in range(number_of_frames):
+                image = background.copy()
+                centers_XY = (shape_centers_XY + frame_number * shape_velocities_XY) % (image_width, image_height)
+                for shape_index, (x, y) in enumerate(centers_XY.astype(int)):
+                    color = tuple(int(channel) for channel in (60 * shape_index, 255 - 60 * shape_index, 128))
+                    cv2.circle(image, (int(x), int(y)), image_height // 10, color, -1)
+                video_writer.write(image)
+        finally:
+            video_writer.release()
+
+    return synchronized_videos_folder_path
+
+
+class PeakRssSampler:
+    """Polls the resident memory of a process and all its children on a background thread, keeping the peak total"""
+
+    def __init__(self, process_id: int, sample_interval_seconds: float = PEAK_RSS_SAMPLE_INTERVAL_SECONDS):
+        self._process = psutil.Process(process_id)
+        self._sample_interval_seconds = sample_interval_seconds
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self.peak_rss_bytes = 0
+
+    def __enter__(self) -> "PeakRssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop_event.is_set():
+            try:
+                processes = [self._process] + self._process.children(recursive=True)
+            except psutil.NoSuchProcess:
+                return
+            rss_bytes = 0
+            for process in processes:
+                try:
+                    rss_bytes += process.memory_info().rss
+                except psutil.NoSuchProcess:
+                    continue
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss_bytes)
+            self._stop_event.wait(self._sample_interval_seconds)
+
+
+def run_execution_mode(
+    video_folder_path: Union[str, Path],
+    output_data_folder_path: Union[str, Path],
+    parameter_model: MediapipeParametersModel,
+) -> Dict:
+    """Runs `process_folder` once and returns its wall time and where the time went"""
+    detector = MediapipeSkeletonDetector(parameter_model=parameter_model, use_tqdm=False)
+
+    tic = time.perf_counter()
+    detector.process_folder(
+        video_folder_path=video_folder_path,
+        output_data_folder_path=output_data_folder_path,
+        use_multiprocessing=parameter_model.use_multiprocessing,
+    )
+    return {
+        "wall_seconds": time.perf_counter() - tic,
+        "stage_seconds": detector.stage_timings.as_dict(),
+    }
+
+
+def _run_execution_mode_worker(result_queue: multiprocessing.Queue, *args):
+    try:
+        result_queue.put(run_execution_mode(*args))
+    except Exception as e:
+        result_queue.put({"error": repr(e)})
+
+
+def run_benchmark(
+    execution_modes: Sequence[str] = tuple(EXECUTION_MODES),
+    number_of_cameras: int = 3,
+    number_of_frames: int = 150,
+    image_width: int = 1280,
+    image_height: int = 720,
+    mediapipe_model_complexity: int = 1,
+    render_annotated_videos: bool = True,
+    max_number_of_processes: Optional[int] = None,
+    session_folder_path: Optional[Union[str, Path]] = None,
+) -> Dict:
+    """
+    Runs 2d skeleton detection on the same synthetic session under each of `execution_modes`, each in a fresh process
+    so one mode's memory doesn't count against the next, and reports frames per second, the peak resident memory of
+    that process and its workers, and the time spent in each stage of detection
+    """
+    temporary_directory = None
+    if session_folder_path is None:
+        temporary_directory = tempfile.TemporaryDirectory(prefix="freemocap_2d_benchmark_")
+        session_folder_path = temporary_directory.name
+    session_folder_path = Path(session_folder_path)
+
+    video_folder_path = create_synthetic_session(
+        session_folder_path=session_folder_path,
+        number_of_cameras=number_of_cameras,
+        number_of_frames=number_of_frames,
+        image_width=image_width,
+        image_height=image_height,
+    )
+
+    results = {
+        "number_of_cameras": number_of_cameras,
+        "number_of_frames": number_of_frames,
+        "image_width": image_width,
+        "image_height": image_height,
+        "mediapipe_model_complexity": mediapipe_model_complexity,
+        "render_annotated_videos": render_annotated_videos,
+        "cpu_count": psutil.cpu_count(),
+        "execution_modes": {},
+    }
+
+    mp_context = multiprocessing.get_context("spawn")
+    try:
+        for execution_mode in execution_modes:
+            parameter_model = MediapipeParametersModel(
+                mediapipe_model_complexity=mediapipe_model_complexity,
+                render_annotated_videos=render_annotated_videos,
+                max_number_of_processes=max_number_of_processes,
+                # every run has to do the work
+                use_2d_detection_cache=False,
+                checkpoint_2d_detection=False,
+                **EXECUTION_MODES[execution_mode],
+            )
+            logger.info(f"Benchmarking 2d detection in {execution_mode} mode")
+
+            result_queue = mp_context.Queue()
+            mode_process = mp_context.Process(
+                target=_run_execution_mode_worker,
+                args=(result_queue, video_folder_path, session_folder_path / f"output_{execution_mode}", parameter_model),
+            )
+            mode_process.start()
+            with PeakRssSampler(mode_process.pid) as peak_rss_sampler:
+                mode_results = result_queue.get()
+                mode_process.join()
+
+            if "error" not in mode_results:
+                total_number_of_frames = number_of_cameras * number_of_frames
+                stage_seconds_total = sum(mode_results["stage_seconds"].values())
+                mode_results["frames_per_second"] = total_number_of_frames / mode_results["wall_seconds"]
+                mode_results["stage_fractions"] = {
+                    stage_name: seconds / stage_seconds_total if stage_seconds_total > 0 else float("nan")
+                    for stage_name, seconds in mode_results["stage_seconds"].items()
+                }
+            mode_results["peak_rss_megabytes"] = peak_rss_sampler.peak_rss_bytes / 1024**2
+            results["execution_modes"][execution_mode] = mode_results
+    finally:
+        if temporary_directory is not None:
+            temporary_directory.cleanup()
+
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_benchmark(), indent=4))
@@ -0,0 +1,101 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import sys
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.data_models.mediapipe_skeleton_names_and_connections import (
+    get_mediapipe_landmark_group_slices,
+)
+from src.core_processes.processing_2d.mediapipe.mediapipe_pose_estimator import MediapipePoseEstimator
+from src.core_processes.processing_2d.pose_estimator import PoseEstimator
+from src.data_layer.session_models.post_processing_parameter_models import (
+    MediapipeParametersModel,
+    OnnxPoseParametersModel,
+)
+
+
+def create_synthetic_frames(number_of_frames: int, image_width: int, image_height: int, seed: int = 0) -> List[np.ndarray]:
+    """Smooth random BGR frames, so resizing and color conversion cost what they do on real video"""
+    random_number_generator = np.random.default_rng(seed)
+    coarse_frames = random_number_generator.integers(0, 256, (number_of_frames, image_height // 16, image_width // 16, 3), dtype=np.uint8)
+    return [np.ascontiguousarray(frame.repeat(16, axis=0).repeat(16, axis=1)) for frame in coarse_frames]
+
+
+def measure_frames_per_second(pose_estimator: PoseEstimator, frames: Sequence[np.ndarray], batch_size: int, repeats: int) -> float:
+    # the first batch pays for lazy allocations inside the model, don't count it
+    pose_estimator.detect(frames[:batch_size])
+
+    best_seconds = np.inf
+    for _ in range(repeats):
+        tic = time.perf_counter()
+        for first_frame_index in range(0, len(frames), batch_size):
+            pose_estimator.detect(frames[first_frame_index : first_frame_index + batch_size])
+        best_seconds = min(best_seconds, time.perf_counter() - tic)
+    return len(frames) / best_seconds
+
+
+def run_benchmark(
+    onnx_model_path: str,
+    batch_sizes: Sequence[int] = (1, 2, 4, 8, 16, 32),
+    number_of_frames: int = 128,
+    image_width: int = 1280,
+    image_height: int = 720,
+    intra_op_num_threads: int = 0,
+    repeats: int = 3,
+    include_mediapipe_baseline: bool = True,
+) -> Dict:
+    # imported here so the error is about onnxruntime, not this module
+    from src.core_processes.processing_2d.onnx.onnx_pose_estimator import OnnxPoseEstimator
+
+    frames = create_synthetic_frames(number_of_frames=number_of_frames, image_width=image_width, image_height=image_height)
+    body_only_slices = get_mediapipe_landmark_group_slices(include_hands=False, include_face=False)
+
+    onnx_pose_estimator = OnnxPoseEstimator(
+        parameter_model=OnnxPoseParametersModel(model_path=onnx_model_path, intra_op_num_threads=intra_op_num_threads),
+        landmark_group_slices=body_only_slices,
+    )
+    onnx_frames_per_second = {}
+    try:
+        for batch_size in batch_sizes:
+            onnx_frames_per_second[batch_size] = measure_frames_per_second(
+                onnx_pose_estimator, frames, batch_size=batch_size, repeats=repeats
+            )
+            logger.info(f"onnx batch size {batch_size}: {onnx_frames_per_second[batch_size]:.1f} fps")
+    finally:
+        onnx_pose_estimator.close()
+
+    results = {
+        "onnx_model_path": str(onnx_model_path),
+        "number_of_frames": number_of_frames,
+        "image_width": image_width,
+        "image_height": image_height,
+        "intra_op_num_threads": intra_op_num_threads,
+        "onnx_frames_per_second_by_batch_size": onnx_frames_per_second,
+        "best_batch_size": max(onnx_frames_per_second, key=onnx_frames_per_second.get),
+        "batched_speedup": max(onnx_frames_per_second.values()) / onnx_frames_per_second[batch_sizes[0]],
+    }
+
+    if include_mediapipe_baseline:
+        mediapipe_pose_estimator = MediapipePoseEstimator(
+            parameter_model=MediapipeParametersModel(include_hands=False, include_face=False),
+            landmark_group_slices=body_only_slices,
+        )
+        try:
+            results["mediapipe_pose_frames_per_second"] = measure_frames_per_second(
+                mediapipe_pose_estimator, frames, batch_size=1, repeats=1
+            )
+        finally:
+            mediapipe_pose_estimator.close()
+
+    return results
+
+
+if __name__ == "__main__":
+    # a COCO-17 top-down pose model exported to onnx with a dynamic batch dimension, e.g. SimpleBaseline or RTMPose
+    onnx_model_path = sys.argv[1] if len(sys.argv) > 1 else r"C:\Users\jonma\freemocap_data\models\pose_coco17_256x192.onnx"
+    print(json.dumps(run_benchmark(onnx_model_path=onnx_model_path), indent=4))
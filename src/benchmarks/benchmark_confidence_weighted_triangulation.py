@@ -0,0 +1,54 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import time
+
+import numpy as np
+
+from src.core_processes.capture_volume_calibration.triangulation_process_pool import triangulate_with_reprojection_error
+from src.utilities.synthetic_capture_data import (
+    add_confidence_dependent_noise,
+    create_synthetic_2d_data,
+    create_synthetic_camera_group,
+)
+
+
+def run_benchmark(number_of_cameras: int = 4, number_of_frames: int = 200, number_of_tracked_points: int = 553) -> dict:
+    camera_group = create_synthetic_camera_group(number_of_cameras=number_of_cameras)
+    points_3d, points_2d = create_synthetic_2d_data(
+        camera_group, number_of_frames=number_of_frames, number_of_tracked_points=number_of_tracked_points
+    )
+    points_2d, confidence = add_confidence_dependent_noise(points_2d)
+    number_of_points = points_2d.shape[1]
+
+    # compile the numba kernels outside of the timing
+    triangulate_with_reprojection_error(camera_group, points_2d[:, :10])
+    triangulate_with_reprojection_error(camera_group, points_2d[:, :10], confidence_flat=confidence[:, :10])
+
+    tic = time.perf_counter()
+    unweighted_points_3d, _ = triangulate_with_reprojection_error(camera_group, points_2d)
+    unweighted_seconds = time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    weighted_points_3d, _ = triangulate_with_reprojection_error(camera_group, points_2d, confidence_flat=confidence)
+    weighted_seconds = time.perf_counter() - tic
+
+    def get_errors_to_ground_truth(triangulated_points_3d: np.ndarray) -> np.ndarray:
+        return np.linalg.norm(triangulated_points_3d - points_3d, axis=1)
+
+    return {
+        "number_of_cameras": number_of_cameras,
+        "number_of_points": number_of_points,
+        "unweighted_points_per_second": number_of_points / unweighted_seconds,
+        "weighted_points_per_second": number_of_points / weighted_seconds,
+        "weighted_slowdown": weighted_seconds / unweighted_seconds,
+        "unweighted_median_error_to_ground_truth_mm": float(np.nanmedian(get_errors_to_ground_truth(unweighted_points_3d))),
+        "weighted_median_error_to_ground_truth_mm": float(np.nanmedian(get_errors_to_ground_truth(weighted_points_3d))),
+        "unweighted_95th_percentile_error_to_ground_truth_mm": float(np.nanpercentile(get_errors_to_ground_truth(unweighted_points_3d), 95)),
+        "weighted_95th_percentile_error_to_ground_truth_mm": float(np.nanpercentile(get_errors_to_ground_truth(weighted_points_3d), 95)),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_benchmark(), indent=4))
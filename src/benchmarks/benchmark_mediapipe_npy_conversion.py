@@ -0,0 +1,134 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import time
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.mediapipe_skeleton_detector import MediapipeSkeletonDetector
+
+
+def create_fake_mediapipe_results_list(
+    number_of_frames: int,
+    number_of_body_points: int = 33,
+    number_of_hand_points: int = 21,
+    number_of_face_points: int = 478,
+    seed: int = 0,
+) -> List:
+    """
+    Builds `number_of_frames` objects shaped like `Holistic.process` results. Uses real mediapipe protobuf landmark
+    lists so attribute access costs the same as it does in a real run
+    """
+    from mediapipe.framework.formats import landmark_pb2
+
+    random_number_generator = np.random.default_rng(seed)
+
+    def create_landmark_list(number_of_points: int):
+        landmark_list = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z, visibility in random_number_generator.random((number_of_points, 4)):
+            landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+        return landmark_list
+
+    return [
+        SimpleNamespace(
+            pose_landmarks=create_landmark_list(number_of_body_points),
+            pose_world_landmarks=create_landmark_list(number_of_body_points),
+            right_hand_landmarks=create_landmark_list(number_of_hand_points),
+            left_hand_landmarks=create_landmark_list(number_of_hand_points) if frame_number % 3 else None,
+            face_landmarks=create_landmark_list(number_of_face_points),
+        )
+        for frame_number in range(number_of_frames)
+    ]
+
+
+def legacy_mediapipe_results_list_to_npy_arrays(
+    detector: MediapipeSkeletonDetector,
+    mediapipe_results_list: List,
+    image_width: float,
+    image_height: float,
+):
+    """The original one-scalar-at-a-time conversion, kept here as the benchmark baseline"""
+    number_of_frames = len(mediapipe_results_list)
+
+    body = np.full((number_of_frames, detector.number_of_body_tracked_points, 3), np.nan)
+    body_world = np.full((number_of_frames, detector.number_of_body_tracked_points, 3), np.nan)
+    body_confidence = np.full((number_of_frames, detector.number_of_body_tracked_points), np.nan)
+    right_hand = np.full((number_of_frames, detector.number_of_right_hand_tracked_points, 3), np.nan)
+    left_hand = np.full((number_of_frames, detector.number_of_left_hand_tracked_points, 3), np.nan)
+    face = np.full((number_of_frames, detector.number_of_face_tracked_points, 3), np.nan)
+
+    all_tracked_points_visible_on_frame_list = []
+
+    for frame_number, frame_results in enumerate(mediapipe_results_list):
+        if frame_results.pose_landmarks is not None:
+            for landmark_number, landmark_data in enumerate(frame_results.pose_landmarks.landmark):
+                body[frame_number, landmark_number, 0] = landmark_data.x * image_width
+                body[frame_number, landmark_number, 1] = landmark_data.y * image_height
+                body[frame_number, landmark_number, 2] = landmark_data.z * image_width
+                body_confidence[frame_number, landmark_number] = landmark_data.visibility
+
+            for landmark_number, landmark_data in enumerate(frame_results.pose_world_landmarks.landmark):
+                body_world[frame_number, landmark_number, 0] = landmark_data.x * image_width
+                body_world[frame_number, landmark_number, 1] = landmark_data.y * image_height
+                body_world[frame_number, landmark_number, 2] = landmark_data.z * image_width
+
+        for landmark_list, array in [
+            (frame_results.right_hand_landmarks, right_hand),
+            (frame_results.left_hand_landmarks, left_hand),
+            (frame_results.face_landmarks, face),
+        ]:
+            if landmark_list is not None:
+                for landmark_number, landmark_data in enumerate(landmark_list.landmark):
+                    array[frame_number, landmark_number, 0] = landmark_data.x * image_width
+                    array[frame_number, landmark_number, 1] = landmark_data.y * image_height
+                    array[frame_number, landmark_number, 2] = landmark_data.z * image_width
+
+        all_points_visible = all(
+            [
+                all(sum(np.isnan(body[frame_number, :, :])) == 0),
+                all(sum(np.isnan(right_hand[frame_number, :, :])) == 0),
+                all(sum(np.isnan(left_hand[frame_number, :, :])) == 0),
+                all(sum(np.isnan(face[frame_number, :, :])) == 0),
+            ]
+        )
+        all_tracked_points_visible_on_frame_list.append(all_points_visible)
+
+    return np.hstack([body, right_hand, left_hand, face])
+
+
+def run_benchmark(number_of_frames: int = 300, image_width: float = 1920, image_height: float = 1080, repeats: int = 3) -> dict:
+    detector = MediapipeSkeletonDetector(use_tqdm=False)
+    mediapipe_results_list = create_fake_mediapipe_results_list(number_of_frames=number_of_frames)
+
+    legacy_times = []
+    vectorized_times = []
+    for _ in range(repeats):
+        tic = time.perf_counter()
+        legacy_data2d = legacy_mediapipe_results_list_to_npy_arrays(
+            detector, mediapipe_results_list, image_width=image_width, image_height=image_height
+        )
+        legacy_times.append(time.perf_counter() - tic)
+
+        tic = time.perf_counter()
+        vectorized_data2d = detector._mediapipe_results_list_to_npy_arrays(
+            mediapipe_results_list, image_width=image_width, image_height=image_height
+        ).all_data2d_nFrames_nTrackedPts_XY
+        vectorized_times.append(time.perf_counter() - tic)
+
+    if not np.allclose(legacy_data2d, vectorized_data2d, equal_nan=True):
+        raise ValueError("Vectorized conversion does not match the legacy conversion")
+
+    results = {
+        "number_of_frames": number_of_frames,
+        "legacy_seconds_per_frame": min(legacy_times) / number_of_frames,
+        "vectorized_seconds_per_frame": min(vectorized_times) / number_of_frames,
+    }
+    results["speedup"] = results["legacy_seconds_per_frame"] / results["vectorized_seconds_per_frame"]
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_benchmark(), indent=4))
@@ -0,0 +1,60 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import time
+
+import numpy as np
+
+from src.utilities.synthetic_capture_data import (
+    create_synthetic_2d_data,
+    create_synthetic_camera_group,
+    opencv_project,
+    opencv_reprojection_error,
+)
+
+
+def best_seconds(function, repeats: int) -> float:
+    seconds = np.inf
+    for _ in range(repeats):
+        tic = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - tic)
+    return seconds
+
+
+def run_benchmark(number_of_cameras: int = 4, number_of_frames: int = 1000, number_of_tracked_points: int = 553, repeats: int = 3) -> dict:
+    camera_group = create_synthetic_camera_group(number_of_cameras=number_of_cameras)
+    points_3d, points_2d = create_synthetic_2d_data(
+        camera_group, number_of_frames=number_of_frames, number_of_tracked_points=number_of_tracked_points
+    )
+    number_of_points = points_3d.shape[0]
+
+    max_projection_difference = np.nanmax(np.abs(opencv_project(camera_group, points_3d) - camera_group.project(points_3d)))
+    max_reprojection_error_difference = np.nanmax(
+        np.abs(opencv_reprojection_error(camera_group, points_3d, points_2d) - camera_group.reprojection_error(points_3d, points_2d, mean=True))
+    )
+    if max_projection_difference > 1e-6:
+        raise ValueError(f"Batched projection is {max_projection_difference} pixels off from opencv's")
+
+    opencv_project_seconds = best_seconds(lambda: opencv_project(camera_group, points_3d), repeats)
+    batched_project_seconds = best_seconds(lambda: camera_group.project(points_3d), repeats)
+    opencv_reprojection_error_seconds = best_seconds(lambda: opencv_reprojection_error(camera_group, points_3d, points_2d), repeats)
+    batched_reprojection_error_seconds = best_seconds(lambda: camera_group.reprojection_error(points_3d, points_2d, mean=True), repeats)
+
+    return {
+        "number_of_cameras": number_of_cameras,
+        "number_of_points": number_of_points,
+        "opencv_project_points_per_second": number_of_points / opencv_project_seconds,
+        "batched_project_points_per_second": number_of_points / batched_project_seconds,
+        "project_speedup": opencv_project_seconds / batched_project_seconds,
+        "opencv_reprojection_error_points_per_second": number_of_points / opencv_reprojection_error_seconds,
+        "batched_reprojection_error_points_per_second": number_of_points / batched_reprojection_error_seconds,
+        "reprojection_error_speedup": opencv_reprojection_error_seconds / batched_reprojection_error_seconds,
+        "max_projection_difference_pixels": float(max_projection_difference),
+        "max_reprojection_error_difference_pixels": float(max_reprojection_error_difference),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_benchmark(), indent=4))
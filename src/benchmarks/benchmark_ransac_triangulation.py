@@ -0,0 +1,49 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import time
+
+import numpy as np
+
+from src.utilities.synthetic_capture_data import add_outliers, create_synthetic_2d_data, create_synthetic_camera_group
+
+
+def run_benchmark(number_of_cameras: int = 4, number_of_frames: int = 20, number_of_tracked_points: int = 553, min_cams: int = 2) -> dict:
+    camera_group = create_synthetic_camera_group(number_of_cameras=number_of_cameras)
+    points_3d, points_2d = create_synthetic_2d_data(
+        camera_group, number_of_frames=number_of_frames, number_of_tracked_points=number_of_tracked_points
+    )
+    points_2d = add_outliers(points_2d)
+    number_of_points = points_2d.shape[1]
+
+    # compile the numba kernels outside of the timing
+    camera_group.triangulate_ransac(points_2d[:, :10], min_cams=min_cams)
+    camera_group.triangulate_possible(points_2d[:, :10, None], min_cams=min_cams)
+
+    tic = time.perf_counter()
+    legacy_points_3d = camera_group.triangulate_possible(points_2d[:, :, None], min_cams=min_cams)
+    legacy_seconds = time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    batched_points_3d = camera_group.triangulate_ransac(points_2d, min_cams=min_cams)
+    batched_seconds = time.perf_counter() - tic
+
+    if not np.allclose(legacy_points_3d, batched_points_3d, equal_nan=True, rtol=1e-6, atol=1e-6):
+        raise ValueError("Batched ransac triangulation does not match `triangulate_possible`")
+
+    simple_points_3d = camera_group.triangulate(points_2d)
+    return {
+        "number_of_cameras": number_of_cameras,
+        "number_of_points": number_of_points,
+        "legacy_points_per_second": number_of_points / legacy_seconds,
+        "batched_points_per_second": number_of_points / batched_seconds,
+        "speedup": legacy_seconds / batched_seconds,
+        "max_abs_difference_mm": float(np.nanmax(np.abs(legacy_points_3d - batched_points_3d))),
+        "median_error_to_ground_truth_mm": float(np.nanmedian(np.linalg.norm(batched_points_3d - points_3d, axis=1))),
+        "simple_median_error_to_ground_truth_mm": float(np.nanmedian(np.linalg.norm(simple_points_3d - points_3d, axis=1))),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_benchmark(), indent=4))
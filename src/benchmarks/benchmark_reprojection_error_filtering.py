@@ -0,0 +1,81 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import time
+
+import numpy as np
+
+from src.core_processes.capture_volume_calibration.triangulate_3d_data import remove_3d_data_with_high_reprojection_error
+from src.utilities.synthetic_capture_data import add_outliers, create_synthetic_2d_data, create_synthetic_camera_group
+
+
+def run_benchmark(
+    number_of_cameras: int = 4,
+    number_of_frames: int = 20,
+    number_of_tracked_points: int = 553,
+    outlier_fraction: float = 0.15,
+    number_of_median_absolute_deviations: float = 3.0,
+    min_cams: int = 2,
+) -> dict:
+    """
+    Triangulates 2d data with outlier camera views three ways: the simple method, the simple method followed by the
+    reprojection error filter, and ransac, and reports how fast each is and how close each gets to the ground truth
+    """
+    camera_group = create_synthetic_camera_group(number_of_cameras=number_of_cameras)
+    points_3d, points_2d = create_synthetic_2d_data(
+        camera_group, number_of_frames=number_of_frames, number_of_tracked_points=number_of_tracked_points
+    )
+    points_2d = add_outliers(points_2d, outlier_fraction=outlier_fraction)
+    number_of_points = points_2d.shape[1]
+
+    # compile the numba kernels outside of the timing
+    camera_group.triangulate(points_2d[:, :10])
+    camera_group.triangulate_ransac(points_2d[:, :10], min_cams=min_cams)
+
+    tic = time.perf_counter()
+    simple_points_3d = camera_group.triangulate(points_2d)
+    simple_reprojection_error = camera_group.reprojection_error(simple_points_3d, points_2d, mean=True)
+    simple_seconds = time.perf_counter() - tic
+
+    filtered_points_3d = simple_points_3d.reshape(number_of_frames, number_of_tracked_points, 3).copy()
+    filtered_reprojection_error = simple_reprojection_error.reshape(number_of_frames, number_of_tracked_points).copy()
+    tic = time.perf_counter()
+    remove_3d_data_with_high_reprojection_error(
+        anipose_calibration_object=camera_group,
+        data2d=points_2d.reshape(number_of_cameras, number_of_frames, number_of_tracked_points, 2),
+        data3d=filtered_points_3d,
+        reprojection_error=filtered_reprojection_error,
+        number_of_median_absolute_deviations=number_of_median_absolute_deviations,
+        min_cams=min_cams,
+    )
+    filtering_seconds = time.perf_counter() - tic
+    filtered_points_3d = filtered_points_3d.reshape(-1, 3)
+
+    tic = time.perf_counter()
+    ransac_points_3d = camera_group.triangulate_ransac(points_2d, min_cams=min_cams)
+    camera_group.reprojection_error(ransac_points_3d, points_2d, mean=True)
+    ransac_seconds = time.perf_counter() - tic
+
+    def get_errors_to_ground_truth(triangulated_points_3d: np.ndarray) -> np.ndarray:
+        return np.linalg.norm(triangulated_points_3d - points_3d, axis=1)
+
+    return {
+        "number_of_cameras": number_of_cameras,
+        "number_of_points": number_of_points,
+        "outlier_fraction": outlier_fraction,
+        "simple_points_per_second": number_of_points / simple_seconds,
+        "filtered_points_per_second": number_of_points / (simple_seconds + filtering_seconds),
+        "ransac_points_per_second": number_of_points / ransac_seconds,
+        "filtered_speedup_over_ransac": ransac_seconds / (simple_seconds + filtering_seconds),
+        "simple_median_error_to_ground_truth_mm": float(np.nanmedian(get_errors_to_ground_truth(simple_points_3d))),
+        "filtered_median_error_to_ground_truth_mm": float(np.nanmedian(get_errors_to_ground_truth(filtered_points_3d))),
+        "ransac_median_error_to_ground_truth_mm": float(np.nanmedian(get_errors_to_ground_truth(ransac_points_3d))),
+        "simple_95th_percentile_error_to_ground_truth_mm": float(np.nanpercentile(get_errors_to_ground_truth(simple_points_3d), 95)),
+        "filtered_95th_percentile_error_to_ground_truth_mm": float(np.nanpercentile(get_errors_to_ground_truth(filtered_points_3d), 95)),
+        "ransac_95th_percentile_error_to_ground_truth_mm": float(np.nanpercentile(get_errors_to_ground_truth(ransac_points_3d), 95)),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_benchmark(), indent=4))
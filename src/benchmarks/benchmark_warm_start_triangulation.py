@@ -0,0 +1,111 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import time
+
+import numpy as np
+
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.anipose_lib import (
+    mean_reprojection_error,
+    refine_points_gauss_newton,
+)
+from src.utilities.synthetic_capture_data import create_synthetic_camera_group, create_synthetic_trajectories
+
+
+def run_benchmark(
+    number_of_cameras: int = 4,
+    number_of_frames: int = 300,
+    number_of_tracked_points: int = 553,
+    number_of_optimized_frames: int = 60,
+    number_of_optimized_points: int = 33,
+) -> dict:
+    """
+    Triangulates smoothly moving points with the simple method, the simple method followed by Gauss-Newton refinement
+    to convergence from that cold start, and the warm started streaming triangulation, and reports how fast each is,
+    how many Gauss-Newton steps the refinements needed and how close each gets to the ground truth.
+    Also times `triangulate_optim` on a smaller clip started from the simple and the warm started triangulations
+    """
+    camera_group = create_synthetic_camera_group(number_of_cameras=number_of_cameras)
+    points_3d, points_2d = create_synthetic_trajectories(
+        camera_group, number_of_frames=number_of_frames, number_of_tracked_points=number_of_tracked_points
+    )
+    points_2d_flat = points_2d.reshape(number_of_cameras, -1, 2)
+    number_of_points = points_2d_flat.shape[1]
+
+    # compile the numba kernels outside of the timing
+    camera_group.triangulate(points_2d_flat[:, :10])
+
+    tic = time.perf_counter()
+    simple_points_3d = camera_group.triangulate(points_2d_flat)
+    simple_seconds = time.perf_counter() - tic
+
+    undistorted_points_2d = np.empty(points_2d_flat.shape)
+    for camera_index, camera in enumerate(camera_group.cameras):
+        undistorted_points_2d[camera_index] = camera.undistort_points(np.copy(points_2d_flat[camera_index]))
+    rotation_mats = np.array([camera.get_rotation_matrix() for camera in camera_group.cameras])
+    tvecs = np.array([camera.get_translation() for camera in camera_group.cameras])
+    focal_lengths = np.array([camera.get_focal_length(both=True) for camera in camera_group.cameras])
+    tic = time.perf_counter()
+    cold_points_3d, cold_steps = refine_points_gauss_newton(
+        undistorted_points_2d, simple_points_3d, rotation_mats, tvecs, focal_lengths, n_iters=50
+    )
+    cold_seconds = simple_seconds + time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    warm_points_3d = camera_group.triangulate_warm_start(points_2d).reshape(-1, 3)
+    warm_seconds = time.perf_counter() - tic
+    # the steps a frame needs to converge from its DLT start, and from the constant velocity warm start
+    frame_points = slice(2 * number_of_tracked_points, 3 * number_of_tracked_points)
+    _, dlt_started_frame_steps = refine_points_gauss_newton(
+        undistorted_points_2d[:, frame_points], simple_points_3d[frame_points], rotation_mats, tvecs, focal_lengths, n_iters=50
+    )
+    warm_points_3d_by_frame = warm_points_3d.reshape(number_of_frames, number_of_tracked_points, 3)
+    _, warm_started_frame_steps = refine_points_gauss_newton(
+        undistorted_points_2d[:, frame_points],
+        2 * warm_points_3d_by_frame[1] - warm_points_3d_by_frame[0],
+        rotation_mats,
+        tvecs,
+        focal_lengths,
+        n_iters=50,
+    )
+
+    def get_errors_to_ground_truth(triangulated_points_3d: np.ndarray) -> np.ndarray:
+        return np.linalg.norm(triangulated_points_3d - points_3d.reshape(-1, 3), axis=1)
+
+    def get_median_reprojection_error(triangulated_points_3d: np.ndarray) -> float:
+        errors = camera_group.reprojection_error(triangulated_points_3d, points_2d_flat)
+        return float(np.nanmedian(mean_reprojection_error(errors)))
+
+    optim_points_2d = np.ascontiguousarray(points_2d[:, :number_of_optimized_frames, :number_of_optimized_points])
+    # compile the optimization's error function outside of the timing too
+    camera_group.triangulate_optim(optim_points_2d)
+    tic = time.perf_counter()
+    camera_group.triangulate_optim(optim_points_2d)
+    optim_simple_seconds = time.perf_counter() - tic
+    tic = time.perf_counter()
+    camera_group.triangulate_optim(optim_points_2d, init_warm_start=True)
+    optim_warm_seconds = time.perf_counter() - tic
+
+    return {
+        "number_of_cameras": number_of_cameras,
+        "number_of_points": number_of_points,
+        "simple_points_per_second": number_of_points / simple_seconds,
+        "cold_gauss_newton_points_per_second": number_of_points / cold_seconds,
+        "warm_start_points_per_second": number_of_points / warm_seconds,
+        "cold_gauss_newton_steps": cold_steps,
+        "dlt_started_frame_gauss_newton_steps": dlt_started_frame_steps,
+        "warm_started_frame_gauss_newton_steps": warm_started_frame_steps,
+        "simple_median_error_to_ground_truth_mm": float(np.nanmedian(get_errors_to_ground_truth(simple_points_3d))),
+        "cold_gauss_newton_median_error_to_ground_truth_mm": float(np.nanmedian(get_errors_to_ground_truth(cold_points_3d))),
+        "warm_start_median_error_to_ground_truth_mm": float(np.nanmedian(get_errors_to_ground_truth(warm_points_3d))),
+        "simple_median_reprojection_error_px": get_median_reprojection_error(simple_points_3d),
+        "cold_gauss_newton_median_reprojection_error_px": get_median_reprojection_error(cold_points_3d),
+        "warm_start_median_reprojection_error_px": get_median_reprojection_error(warm_points_3d),
+        "triangulate_optim_from_simple_seconds": optim_simple_seconds,
+        "triangulate_optim_from_warm_start_seconds": optim_warm_seconds,
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_benchmark(), indent=4))
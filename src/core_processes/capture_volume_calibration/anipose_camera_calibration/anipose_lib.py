@@ -18,17 +18,32 @@ from aniposelib.boards import (
     merge_rows,
 )
 from aniposelib.utils import get_connections, get_initial_extrinsics, get_rtvec, make_M
-from numba import jit
+from numba import jit, prange
 from scipy import optimize
 from scipy import signal
 from scipy.sparse import dok_matrix
-from tqdm import trange
+from tqdm import tqdm, trange
 
 numba_logger = logging.getLogger("numba")
 numba_logger.setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
+# points per `triangulate_simple_kernel` call in `triangulate_simple_batch`, between progress updates and kill checks
+TRIANGULATION_BATCH_SIZE = 2**16
+
+# points per `project_points_pinhole` call in `CameraGroup.project`, which bounds the size of its temporary arrays
+PROJECTION_BATCH_SIZE = 2**16
+
+# camera subsets that reproject a point worse than this (in pixels) are never picked by the ransac triangulation
+RANSAC_MAX_REPROJECTION_ERROR = 200
+
+# most Gauss-Newton steps `CameraGroup.triangulate_warm_start` takes per frame, which are usually 1 or 2 from a warm start
+GAUSS_NEWTON_ITERATIONS = 5
+
+# a point's Gauss-Newton refinement stops once its step is shorter than this, in the calibration's units
+GAUSS_NEWTON_STEP_TOLERANCE = 1e-3
+
 
 @jit(nopython=True, parallel=True)
 def triangulate_simple(points, camera_mats):
@@ -45,6 +60,262 @@ def triangulate_simple(points, camera_mats):
     return p3d
 
 
+@jit(nopython=True, parallel=True, cache=True)
+def triangulate_simple_kernel(points, camera_mats, out):
+    """`triangulate_simple` for each of N points in parallel, given an NxCx2 array of points that every one of the C
+    cameras saw. Writes the Nx3 result into `out`"""
+    n_points = points.shape[0]
+    num_cams = camera_mats.shape[0]
+    for ip in prange(n_points):
+        A = np.empty((num_cams * 2, 4))
+        for i in range(num_cams):
+            x, y = points[ip, i]
+            mat = camera_mats[i]
+            A[i * 2] = x * mat[2] - mat[0]
+            A[i * 2 + 1] = y * mat[2] - mat[1]
+        u, s, vh = np.linalg.svd(A, full_matrices=True)
+        p3d = vh[-1]
+        out[ip] = p3d[:3] / p3d[3]
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def triangulate_weighted_kernel(points, weights, camera_mats, out):
+    """`triangulate_simple_kernel` with each camera's two rows of the DLT scaled by its weight for the point, given the
+    NxC weights of the NxCx2 points. Writes the Nx3 result into `out`"""
+    n_points = points.shape[0]
+    num_cams = camera_mats.shape[0]
+    for ip in prange(n_points):
+        A = np.empty((num_cams * 2, 4))
+        for i in range(num_cams):
+            x, y = points[ip, i]
+            mat = camera_mats[i]
+            w = weights[ip, i]
+            A[i * 2] = w * (x * mat[2] - mat[0])
+            A[i * 2 + 1] = w * (y * mat[2] - mat[1])
+        u, s, vh = np.linalg.svd(A, full_matrices=True)
+        p3d = vh[-1]
+        out[ip] = p3d[:3] / p3d[3]
+
+
+def triangulate_simple_batch(points, camera_mats, progress=False, kill_event: multiprocessing.Event = None, weights=None):
+    """Given a CxNx2 array of undistorted points (NaN where a camera didn't see a point) and the C camera matrices,
+    this returns an Nx3 array of points triangulated with the same DLT as `triangulate_simple`.
+    Points are grouped by which cameras saw them, and each group is solved in parallel by `triangulate_simple_kernel`.
+    Given CxN `weights` (e.g. the detector's confidences), each camera's rows are scaled by its weight for the point
+    instead, by `triangulate_weighted_kernel`. A NaN weight counts as 1, and cameras weighted 0 or less are left out.
+    Points seen by fewer than 2 cameras are NaN. Returns None if the kill event was set"""
+    n_cams, n_points, _ = points.shape
+    out = np.full((n_points, 3), np.nan)
+
+    good = ~np.isnan(points[:, :, 0])
+    if weights is not None:
+        weights = np.where(np.isnan(weights), 1.0, weights).astype("float64")
+        good &= weights > 0
+    # one bit per camera, so points seen by the same cameras get the same code
+    visibility_codes = (good.T.astype("int64") << np.arange(n_cams)).sum(axis=1)
+    sorted_point_ixs = np.argsort(visibility_codes, kind="stable")
+    group_starts = np.flatnonzero(np.diff(visibility_codes[sorted_point_ixs])) + 1
+    point_groups = np.split(sorted_point_ixs, group_starts)
+
+    progress_bar = tqdm(total=n_points, ncols=70) if progress else None
+    try:
+        for point_ixs in point_groups:
+            cam_ixs = np.flatnonzero(good[:, point_ixs[0]])
+            if len(cam_ixs) < 2:
+                if progress_bar is not None:
+                    progress_bar.update(len(point_ixs))
+                continue
+            mats = np.ascontiguousarray(camera_mats[cam_ixs], dtype="float64")
+
+            for batch_start in range(0, len(point_ixs), TRIANGULATION_BATCH_SIZE):
+                batch_ixs = point_ixs[batch_start : batch_start + TRIANGULATION_BATCH_SIZE]
+                # n_batch x n_good_cams x 2
+                batch_points = np.ascontiguousarray(points[np.ix_(cam_ixs, batch_ixs)].transpose(1, 0, 2), dtype="float64")
+                batch_out = np.empty((len(batch_ixs), 3))
+                if weights is None:
+                    triangulate_simple_kernel(batch_points, mats, batch_out)
+                else:
+                    batch_weights = np.ascontiguousarray(weights[np.ix_(cam_ixs, batch_ixs)].T)
+                    triangulate_weighted_kernel(batch_points, batch_weights, mats, batch_out)
+                out[batch_ixs] = batch_out
+
+                if progress_bar is not None:
+                    progress_bar.update(len(batch_ixs))
+                if kill_event is not None and kill_event.is_set():
+                    return None
+    finally:
+        if progress_bar is not None:
+            progress_bar.close()
+
+    return out
+
+
+def get_camera_subsets(n_cams):
+    """Every subset of at least 2 of the n cameras as an SxC boolean array, in the order `triangulate_possible`
+    tries them for a point (all cameras first, the first camera changing slowest)"""
+    subsets = np.array(list(itertools.product([True, False], repeat=n_cams)), dtype="bool").reshape(-1, n_cams)
+    return subsets[subsets.sum(axis=1) >= 2]
+
+
+def triangulate_ransac_batch(
+    points,
+    undistorted_points,
+    cameras,
+    min_cams=2,
+    threshold=0.5,
+    progress=False,
+    kill_event: multiprocessing.Event = None,
+):
+    """Given a CxNx2 array of points (NaN where a camera didn't see a point), the same points undistorted and the C
+    cameras, this returns an Nx3 array of the points triangulated from whichever subset of the cameras that saw them
+    reprojects best, picked the same way `triangulate_possible` picks them for one option per point: the first subset
+    with a mean reprojection error under `threshold`, otherwise the one with the lowest error under
+    `RANSAC_MAX_REPROJECTION_ERROR`. Subsets need `min_cams` cameras, unless they're all the cameras that saw the point.
+
+    Rather than looping over points, this loops over the camera subsets once, and triangulates and reprojects every
+    point that subset applies to (and that doesn't have a good enough subset yet) in batches.
+    Returns None if the kill event was set"""
+    n_cams, n_points, _ = points.shape
+    camera_mats = np.array([cam.get_extrinsics_mat() for cam in cameras])
+
+    good = ~np.isnan(points[:, :, 0])
+    n_good_cams = good.sum(axis=0)
+    best_points = np.full((n_points, 3), np.nan)
+    best_errors = np.full(n_points, RANSAC_MAX_REPROJECTION_ERROR, dtype="float64")
+    done = np.zeros(n_points, dtype="bool")
+
+    subsets = get_camera_subsets(n_cams)
+    iterator = tqdm(subsets, ncols=70) if progress else subsets
+    for subset in iterator:
+        cam_ixs = np.flatnonzero(subset)
+        applies = ~done & good[cam_ixs].all(axis=0)
+        if len(cam_ixs) < min_cams:
+            applies &= n_good_cams == len(cam_ixs)
+        point_ixs = np.flatnonzero(applies)
+        mats = np.ascontiguousarray(camera_mats[cam_ixs], dtype="float64")
+
+        for batch_start in range(0, len(point_ixs), TRIANGULATION_BATCH_SIZE):
+            if kill_event is not None and kill_event.is_set():
+                return None
+            batch_ixs = point_ixs[batch_start : batch_start + TRIANGULATION_BATCH_SIZE]
+            batch_points = np.ascontiguousarray(
+                undistorted_points[np.ix_(cam_ixs, batch_ixs)].transpose(1, 0, 2), dtype="float64"
+            )
+            batch_p3ds = np.empty((len(batch_ixs), 3))
+            triangulate_simple_kernel(batch_points, mats, batch_p3ds)
+
+            batch_errors = np.zeros(len(batch_ixs))
+            for cnum in cam_ixs:
+                projected = cameras[cnum].project(batch_p3ds).reshape(-1, 2)
+                batch_errors += np.linalg.norm(points[cnum, batch_ixs] - projected, axis=1)
+            batch_errors /= len(cam_ixs)
+
+            # NaN errors (degenerate points) never compare as better
+            better = batch_errors < best_errors[batch_ixs]
+            best_points[batch_ixs[better]] = batch_p3ds[better]
+            best_errors[batch_ixs[better]] = batch_errors[better]
+            done[batch_ixs[better & (batch_errors < threshold)]] = True
+
+    return best_points
+
+
+def refine_points_gauss_newton(
+    points,
+    p3ds,
+    rotation_mats,
+    tvecs,
+    focal_lengths,
+    n_iters=GAUSS_NEWTON_ITERATIONS,
+    tolerance=GAUSS_NEWTON_STEP_TOLERANCE,
+    weights=None,
+):
+    """Given a CxNx2 array of undistorted points (NaN where a camera didn't see a point), an Nx3 array of starting
+    points, and the Cx3x3 rotation matrices, Cx3 translations and Cx2 (fx, fy) focal lengths of the C cameras, this
+    takes up to `n_iters` Gauss-Newton steps on the reprojection error of every point at once and returns the refined
+    Nx3 points and the number of steps taken. The error is scaled by the focal lengths so it's roughly in pixels, and
+    optionally by CxN `weights` the same way `triangulate_simple_batch` uses them.
+    Each point's 3x3 normal equations are built and solved together, and points stop moving once their step is shorter
+    than `tolerance`. Points with fewer than 2 usable views (seen, weighted above 0 and in front of the camera) or a
+    NaN start are left as they are"""
+    p3ds = np.array(p3ds, dtype="float64")
+    good = ~np.isnan(points[:, :, 0])
+    if weights is None:
+        weights = np.ones(good.shape)
+    else:
+        weights = np.where(np.isnan(weights), 1.0, weights).astype("float64")
+        good &= weights > 0
+    # the scale of each camera's x and y residuals, CxNx2
+    scales = np.where(good, weights, 0.0)[:, :, None] * focal_lengths[:, None, :]
+    points = np.where(good[:, :, None], points, 0.0)
+
+    active = np.flatnonzero(~np.isnan(p3ds[:, 0]) & (good.sum(axis=0) >= 2))
+    n_steps = 0
+    while n_steps < n_iters and len(active) > 0:
+        n_steps += 1
+        # CxAx3 points in each camera's coordinates
+        points_cam = np.matmul(p3ds[active], rotation_mats.transpose(0, 2, 1)) + tvecs[:, None, :]
+        z = points_cam[:, :, 2]
+        in_front = z > 0
+        inv_z = np.divide(1.0, z, out=np.zeros_like(z), where=in_front)
+        projected = points_cam[:, :, :2] * inv_z[:, :, None]
+        active_scales = scales[:, active] * in_front[:, :, None]
+
+        # CxAx2 scaled residuals and CxAx2x3 jacobians of the projection, d(x / z) / dX = (R[0] - (x / z) R[2]) / z
+        residuals = (projected - points[:, active]) * active_scales
+        jacobians = rotation_mats[:, None, :2, :] - projected[:, :, :, None] * rotation_mats[:, None, None, 2, :]
+        jacobians *= (inv_z[:, :, None] * active_scales)[:, :, :, None]
+
+        jtj = np.einsum("cnri,cnrj->nij", jacobians, jacobians)
+        jtr = np.einsum("cnri,cnr->ni", jacobians, residuals)
+        solvable = (in_front & good[:, active]).sum(axis=0) >= 2
+        # a touch of damping keeps the nearly degenerate points (e.g. on the line between 2 cameras) solvable
+        jtj += 1e-9 * np.trace(jtj, axis1=1, axis2=2)[:, None, None] * np.eye(3)
+        jtj[~solvable] = np.eye(3)
+        jtr[~solvable] = 0
+
+        steps = -np.linalg.solve(jtj, jtr[:, :, None])[:, :, 0]
+        p3ds[active] += steps
+        active = active[np.linalg.norm(steps, axis=1) > tolerance]
+
+    return p3ds, n_steps
+
+
+def project_points_pinhole(points, rotation_mats, tvecs, camera_mats, dists):
+    """Given an Nx3 array of points, and the Cx3x3 rotation matrices, Cx3 translations, Cx3x3 camera matrices and
+    Cx5 (k1, k2, p1, p2, k3) distortions of C pinhole cameras, this returns the CxNx2 array of pixels
+    `cv2.projectPoints` gives for each camera, computed for all the cameras at once"""
+    points_cam = np.matmul(points, rotation_mats.transpose(0, 2, 1)) + tvecs[:, None, :]
+
+    # like opencv, points at z == 0 aren't divided by z
+    z = points_cam[:, :, 2]
+    inv_z = np.divide(1.0, z, out=np.ones_like(z), where=z != 0)
+    x = points_cam[:, :, 0] * inv_z
+    y = points_cam[:, :, 1] * inv_z
+
+    k1, k2, p1, p2, k3 = [dists[:, i, None] for i in range(5)]
+    x2 = x * x
+    y2 = y * y
+    xy2 = 2 * x * y
+    r2 = x2 + y2
+    radial = 1 + r2 * (k1 + r2 * (k2 + r2 * k3))
+
+    out = np.empty(points_cam.shape[:2] + (2,))
+    out[:, :, 0] = camera_mats[:, 0, 0, None] * (x * radial + p1 * xy2 + p2 * (r2 + 2 * x2)) + camera_mats[:, 0, 2, None]
+    out[:, :, 1] = camera_mats[:, 1, 1, None] * (y * radial + p1 * (r2 + 2 * y2) + p2 * xy2) + camera_mats[:, 1, 2, None]
+    return out
+
+
+def mean_reprojection_error(errors):
+    """Given the CxNx2 errors from `reprojection_error`, this returns the length N mean error distance over the cameras
+    that saw each point, NaN for points fewer than 2 cameras saw"""
+    errors_norm = np.linalg.norm(errors, axis=2)
+    good = ~np.isnan(errors_norm)
+    errors_norm[~good] = 0
+    denom = np.sum(good, axis=0).astype("float64")
+    denom[denom < 1.5] = np.nan
+    return np.sum(errors_norm, axis=0) / denom
+
+
 def get_error_dict(errors_full, min_points=10):
     n_cams = errors_full.shape[0]
     errors_norm = np.linalg.norm(errors_full, axis=2)
@@ -190,6 +461,12 @@ def transform_points(points, rvecs, tvecs):
 
 
 class Camera:
+    """A pinhole camera with radial distortion.
+
+    Anything derived from the intrinsics or extrinsics (e.g. the extrinsics matrix) is computed once and cached until a
+    setter changes the camera, so change cameras through their setters rather than editing `matrix`, `dist`, `rvec`
+    or `tvec` in place"""
+
     def __init__(
         self,
         matrix=np.eye(3),
@@ -200,6 +477,7 @@ class Camera:
         name=None,
         extra_dist=False,
     ):
+        self._derived_state = {}
         self.set_camera_matrix(matrix)
         self.set_distortions(dist)
         self.set_size(size)
@@ -239,12 +517,14 @@ class Camera:
 
     def set_camera_matrix(self, matrix):
         self.matrix = np.array(matrix, dtype="float64")
+        self._invalidate_derived_state()
 
     def set_focal_length(self, fx, fy=None):
         if fy is None:
             fy = fx
         self.matrix[0, 0] = fx
         self.matrix[1, 1] = fy
+        self._invalidate_derived_state()
 
     def get_focal_length(self, both=False):
         fx = self.matrix[0, 0]
@@ -256,21 +536,51 @@ class Camera:
 
     def set_distortions(self, dist):
         self.dist = np.array(dist, dtype="float64").ravel()
+        self._invalidate_derived_state()
 
     def set_rotation(self, rvec):
         self.rvec = np.array(rvec, dtype="float64").ravel()
+        self._invalidate_derived_state()
 
     def get_rotation(self):
         return self.rvec
 
     def set_translation(self, tvec):
         self.tvec = np.array(tvec, dtype="float64").ravel()
+        self._invalidate_derived_state()
 
     def get_translation(self):
         return self.tvec
 
     def get_extrinsics_mat(self):
-        return make_M(self.rvec, self.tvec)
+        """the 4x4 world to camera matrix, cached (and read only)"""
+        return self._get_derived_state("extrinsics_mat", lambda: make_M(self.rvec, self.tvec))
+
+    def get_rotation_matrix(self):
+        """the 3x3 world to camera rotation, cached (and read only)"""
+        return self._get_derived_state("rotation_matrix", lambda: cv2.Rodrigues(self.rvec)[0])
+
+    def get_projection_mat(self):
+        """the 3x4 matrix taking homogeneous world points to homogeneous (distortion free) pixels, cached (and read only)"""
+        return self._get_derived_state("projection_mat", lambda: self.matrix @ self.get_extrinsics_mat()[:3])
+
+    def get_distortions_k1k2p1p2k3(self):
+        """the distortions padded to opencv's 5 coefficient (k1, k2, p1, p2, k3) model, cached (and read only),
+        or None if they don't fit it and the camera has to be projected by opencv"""
+        if len(self.dist) > 5:
+            return None
+        return self._get_derived_state("distortions_k1k2p1p2k3", lambda: np.pad(self.dist, (0, 5 - len(self.dist))))
+
+    def _get_derived_state(self, name, compute):
+        value = self._derived_state.get(name)
+        if value is None:
+            value = np.ascontiguousarray(compute(), dtype="float64")
+            value.setflags(write=False)
+            self._derived_state[name] = value
+        return value
+
+    def _invalidate_derived_state(self):
+        self._derived_state.clear()
 
     def get_name(self):
         return self.name
@@ -326,27 +636,37 @@ class Camera:
             new_points,
             np.zeros(3),
             np.zeros(3),
-            self.matrix.astype("float64"),
-            self.dist.astype("float64"),
+            self.matrix,
+            self.dist,
         )
         return out.reshape(shape)
 
     def undistort_points(self, points):
         shape = points.shape
         points = points.reshape(-1, 1, 2)
-        out = cv2.undistortPoints(points, self.matrix.astype("float64"), self.dist.astype("float64"))
+        out = cv2.undistortPoints(points, self.matrix, self.dist)
         return out.reshape(shape)
 
     def project(self, points):
         points = points.reshape(-1, 1, 3)
-        out, _ = cv2.projectPoints(
-            points,
-            self.rvec,
-            self.tvec,
-            self.matrix.astype("float64"),
-            self.dist.astype("float64"),
+        dists = self.get_distortions_k1k2p1p2k3()
+        if dists is None:
+            out, _ = cv2.projectPoints(
+                points,
+                self.rvec,
+                self.tvec,
+                self.matrix,
+                self.dist,
+            )
+            return out
+        out = project_points_pinhole(
+            points.reshape(-1, 3),
+            self.get_rotation_matrix()[None],
+            self.tvec[None],
+            self.matrix[None],
+            dists[None],
         )
-        return out
+        return out.reshape(-1, 1, 2)
 
     def single_camera_reprojection_error(self, p3d, p2d):
         projecting_3d_points_onto_2d_image_plane_og = self.project(p3d)
@@ -376,6 +696,7 @@ class FisheyeCamera(Camera):
         name=None,
         extra_dist=False,
     ):
+        self._derived_state = {}
         self.set_camera_matrix(matrix)
         self.set_distortions(dist)
         self.set_size(size)
@@ -402,8 +723,8 @@ class FisheyeCamera(Camera):
             new_points,
             np.zeros(3),
             np.zeros(3),
-            self.matrix.astype("float64"),
-            self.dist.astype("float64"),
+            self.matrix,
+            self.dist,
         )
         return out.reshape(shape)
 
@@ -411,20 +732,24 @@ class FisheyeCamera(Camera):
         shape = points.shape
         points = points.reshape(-1, 1, 2)
         out = cv2.fisheye.undistortPoints(
-            points.astype("float64"),
-            self.matrix.astype("float64"),
-            self.dist.astype("float64"),
+            points.astype("float64", copy=False),
+            self.matrix,
+            self.dist,
         )
         return out.reshape(shape)
 
+    def get_distortions_k1k2p1p2k3(self):
+        # fisheye distortion doesn't fit the pinhole model, so these are always projected by opencv
+        return None
+
     def project(self, points):
         points = points.reshape(-1, 1, 3)
         out, _ = cv2.fisheye.projectPoints(
             points,
             self.rvec,
             self.tvec,
-            self.matrix.astype("float64"),
-            self.dist.astype("float64"),
+            self.matrix,
+            self.dist,
         )
         return out
 
@@ -487,20 +812,40 @@ class CameraGroup:
 
     def project(self, points):
         """Given an Nx3 array of points, this returns an CxNx2 array of 2D points,
-        where C is the number of cameras"""
-        points = points.reshape(-1, 1, 3)
+        where C is the number of cameras.
+        Pinhole cameras are all projected together by `project_points_pinhole`, fisheye cameras by opencv"""
+        points = np.asarray(points, dtype="float64").reshape(-1, 3)
         n_points = points.shape[0]
         n_cams = len(self.cameras)
 
         out = np.empty((n_cams, n_points, 2), dtype="float64")
+        dists = [cam.get_distortions_k1k2p1p2k3() for cam in self.cameras]
+        pinhole_cnums = [cnum for cnum in range(n_cams) if dists[cnum] is not None]
+
+        if pinhole_cnums:
+            pinhole_cameras = [self.cameras[cnum] for cnum in pinhole_cnums]
+            rotation_mats = np.array([cam.get_rotation_matrix() for cam in pinhole_cameras])
+            tvecs = np.array([cam.tvec for cam in pinhole_cameras])
+            camera_mats = np.array([cam.matrix for cam in pinhole_cameras])
+            pinhole_dists = np.array([dists[cnum] for cnum in pinhole_cnums])
+            for batch_start in range(0, n_points, PROJECTION_BATCH_SIZE):
+                batch = slice(batch_start, batch_start + PROJECTION_BATCH_SIZE)
+                out[pinhole_cnums, batch] = project_points_pinhole(
+                    points[batch], rotation_mats, tvecs, camera_mats, pinhole_dists
+                )
+
         for cnum, cam in enumerate(self.cameras):
-            out[cnum] = cam.project(points).reshape(n_points, 2)
+            if dists[cnum] is None:
+                out[cnum] = cam.project(points).reshape(n_points, 2)
 
         return out
 
-    def triangulate(self, points, undistort=True, progress=False, kill_event: multiprocessing.Event = None):
+    def triangulate(
+        self, points, undistort=True, progress=False, kill_event: multiprocessing.Event = None, weights=None
+    ):
         """Given an CxNx2 array, this returns an Nx3 array of points,
-        where N is the number of points and C is the number of cameras"""
+        where N is the number of points and C is the number of cameras.
+        Optionally, CxN `weights` scale each camera's DLT rows for each point (see `triangulate_simple_batch`)"""
 
         assert points.shape[0] == len(
             self.cameras
@@ -511,35 +856,30 @@ class CameraGroup:
         one_point = False
         if len(points.shape) == 2:
             points = points.reshape(-1, 1, 2)
+            if weights is not None:
+                weights = np.reshape(weights, (-1, 1))
             one_point = True
 
         if undistort:
             new_points = np.empty(points.shape)
             for cnum, cam in enumerate(self.cameras):
-                # must copy in order to satisfy opencv underneath
-                sub = np.copy(points[cnum])
-                new_points[cnum] = cam.undistort_points(sub)
+                # opencv needs contiguous points, which they already are unless `points` is a strided view
+                new_points[cnum] = cam.undistort_points(np.ascontiguousarray(points[cnum]))
             points = new_points
 
         n_cams, n_points, _ = points.shape
 
-        out = np.empty((n_points, 3))
-        out[:] = np.nan
-
         cam_mats = np.array([cam.get_extrinsics_mat() for cam in self.cameras])
 
-        if progress:
-            iterator = trange(n_points, ncols=70)
-        else:
-            iterator = range(n_points)
-
-        for ip in iterator:
-            subp = points[:, ip, :]
-            good = ~np.isnan(subp[:, 0])
+        if n_points == 1 and weights is None:
+            # a lone point (e.g. from `triangulate_possible`) isn't worth grouping and batching
+            out = np.full((1, 3), np.nan)
+            good = ~np.isnan(points[:, 0, 0])
             if np.sum(good) >= 2:
-                out[ip] = triangulate_simple(subp[good], cam_mats[good])
-
-            if kill_event is not None and kill_event.is_set():
+                out[0] = triangulate_simple(points[good, 0], cam_mats[good])
+        else:
+            out = triangulate_simple_batch(points, cam_mats, progress=progress, kill_event=kill_event, weights=weights)
+            if out is None:
                 return None
 
         if one_point:
@@ -598,7 +938,7 @@ class CameraGroup:
 
         for point_ix in iterator:
             best_point = None
-            best_error = 200
+            best_error = RANSAC_MAX_REPROJECTION_ERROR
 
             n_cams_max = len(all_iters[point_ix])
 
@@ -644,10 +984,17 @@ class CameraGroup:
         return out  # simplify output so that `triangulate_ransac` can be used exactly the same way as `triangulate`
 
     def triangulate_ransac(
-        self, points, undistort=True, min_cams=2, progress=False, kill_event: multiprocessing.Event = None
+        self,
+        points,
+        undistort=True,
+        min_cams=2,
+        progress=False,
+        threshold=0.5,
+        kill_event: multiprocessing.Event = None,
     ):
         """Given an CxNx2 array, this returns an Nx3 array of points,
-        where N is the number of points and C is the number of cameras"""
+        where N is the number of points and C is the number of cameras.
+        Gives the same points as `triangulate_possible` with one option per point, but batched over camera subsets"""
 
         assert points.shape[0] == len(
             self.cameras
@@ -655,15 +1002,209 @@ class CameraGroup:
             len(self.cameras), points.shape
         )
 
-        n_cams, n_points, _ = points.shape
+        one_point = False
+        if len(points.shape) == 2:
+            points = points.reshape(-1, 1, 2)
+            one_point = True
 
-        points_ransac = points.reshape(n_cams, n_points, 1, 2)
+        if undistort:
+            undistorted_points = np.empty(points.shape)
+            for cnum, cam in enumerate(self.cameras):
+                # opencv needs contiguous points, which they already are unless `points` is a strided view
+                undistorted_points[cnum] = cam.undistort_points(np.ascontiguousarray(points[cnum]))
+        else:
+            undistorted_points = points
 
-        return self.triangulate_possible(
-            points_ransac, undistort=undistort, min_cams=min_cams, progress=progress, kill_event=kill_event
+        out = triangulate_ransac_batch(
+            points,
+            undistorted_points,
+            self.cameras,
+            min_cams=min_cams,
+            threshold=threshold,
+            progress=progress,
+            kill_event=kill_event,
         )
+        if out is None:
+            return None
+
+        if one_point:
+            out = out[0]
+
+        return out
+
+    def triangulate_warm_start(
+        self,
+        points,
+        undistort=True,
+        n_iters=GAUSS_NEWTON_ITERATIONS,
+        tolerance=GAUSS_NEWTON_STEP_TOLERANCE,
+        progress=False,
+        kill_event: multiprocessing.Event = None,
+        weights=None,
+    ):
+        """
+        Take in an array of 2D points of shape CxNxJx2, where
+        C: number of camera
+        N: number of frames
+        J: number of joints
+
+        This function streams through the frames in order and returns an array of 3D points of shape NxJx3.
+        Each frame's joints start from where the previous 2 frames' solutions put them at constant velocity (or where
+        the previous frame's solution is, if only that one was triangulated), and are refined by
+        `refine_points_gauss_newton` for all the joints at once. Joints that weren't triangulated in the previous frame
+        start from the DLT in `triangulate_simple_batch` instead. Optionally, CxNxJ `weights` weight both.
+        Joints seen by fewer than 2 cameras are NaN. Returns None if the kill event was set
+        """
+        assert points.shape[0] == len(
+            self.cameras
+        ), "Invalid points shape, first dim should be equal to" " number of cameras ({}), but shape is {}".format(
+            len(self.cameras), points.shape
+        )
+
+        n_cams, n_frames, n_joints, _ = points.shape
+
+        if undistort:
+            new_points = np.empty(points.shape)
+            for cnum, cam in enumerate(self.cameras):
+                new_points[cnum] = cam.undistort_points(np.ascontiguousarray(points[cnum]))
+            points = new_points
+
+        cam_mats = np.array([cam.get_extrinsics_mat() for cam in self.cameras])
+        rotation_mats = np.array([cam.get_rotation_matrix() for cam in self.cameras])
+        tvecs = np.array([cam.get_translation() for cam in self.cameras], dtype="float64").reshape(n_cams, 3)
+        focal_lengths = np.array([cam.get_focal_length(both=True) for cam in self.cameras])
+
+        good = ~np.isnan(points[:, :, :, 0])
+        if weights is not None:
+            good &= ~(weights <= 0)
+
+        out = np.full((n_frames, n_joints, 3), np.nan)
+        previous_p3ds = np.full((n_joints, 3), np.nan)
+        velocities = np.full((n_joints, 3), np.nan)
+        total_steps = 0
+        iterator = trange(n_frames, ncols=70) if progress else range(n_frames)
+        for frame_number in iterator:
+            if kill_event is not None and kill_event.is_set():
+                return None
+            frame_points = points[:, frame_number]
+            frame_weights = None if weights is None else weights[:, frame_number]
+            triangulable = good[:, frame_number].sum(axis=0) >= 2
+
+            p3ds = np.where(np.isnan(velocities), previous_p3ds, previous_p3ds + velocities)
+            cold_ixs = np.flatnonzero(triangulable & np.isnan(p3ds[:, 0]))
+            if len(cold_ixs) > 0:
+                p3ds[cold_ixs] = triangulate_simple_batch(
+                    frame_points[:, cold_ixs],
+                    cam_mats,
+                    weights=None if frame_weights is None else frame_weights[:, cold_ixs],
+                )
+
+            p3ds, n_steps = refine_points_gauss_newton(
+                frame_points,
+                p3ds,
+                rotation_mats,
+                tvecs,
+                focal_lengths,
+                n_iters=n_iters,
+                tolerance=tolerance,
+                weights=frame_weights,
+            )
+            total_steps += n_steps
+            p3ds[~triangulable] = np.nan
+            out[frame_number] = p3ds
+            velocities = p3ds - previous_p3ds
+            previous_p3ds = p3ds
+
+        logger.debug(f"Warm start triangulation took {total_steps / max(n_frames, 1):.2f} Gauss-Newton steps per frame")
+        return out
+
+    def triangulate_without_outlier_cameras(
+        self,
+        points,
+        p3ds,
+        errors,
+        threshold,
+        undistort=True,
+        min_cams=2,
+        kill_event: multiprocessing.Event = None,
+        weights=None,
+    ):
+        """Given an CxNx2 array of points, the Nx3 points triangulated from them and their length N mean reprojection
+        errors, this re-triangulates every point with an error over `threshold` without each of the cameras that saw
+        it in turn, and drops the camera whose removal lowers the point's error the most. The points still over the
+        threshold go round again until dropping a camera doesn't lower their error or they are down to `min_cams` cameras.
+        Each round triangulates just the points being filtered, one batch per camera left out, with the optional CxN
+        `weights` (see `triangulate_simple_batch`).
+
+        Returns the Nx3 points, their length N mean reprojection errors over the cameras that were kept and the CxN
+        mask of those cameras, or None if the kill event was set"""
+        n_cams = points.shape[0]
+        cam_mats = np.array([cam.get_extrinsics_mat() for cam in self.cameras])
+        out_p3ds = np.array(p3ds, dtype="float64")
+        out_errors = np.array(errors, dtype="float64")
+        out_used = ~np.isnan(points[:, :, 0])
+
+        # only the points over the threshold are ever looked at again, so work on just those
+        # NaN errors (points fewer than 2 cameras saw) never compare as over the threshold
+        filtered_ixs = np.flatnonzero((out_errors > threshold) & (out_used.sum(axis=0) > min_cams))
+        if len(filtered_ixs) == 0:
+            # e.g. every point over the threshold is already down to `min_cams` cameras (always, with 2 cameras)
+            return out_p3ds, out_errors, out_used
+        points = np.asarray(points[:, filtered_ixs], dtype="float64")
+        p3ds = out_p3ds[filtered_ixs]
+        errors = out_errors[filtered_ixs]
+        used = out_used[:, filtered_ixs]
+        if weights is not None:
+            weights = np.asarray(weights, dtype="float64")[:, filtered_ixs]
+
+        if undistort:
+            undistorted_points = np.empty(points.shape)
+            for cnum, cam in enumerate(self.cameras):
+                undistorted_points[cnum] = cam.undistort_points(points[cnum])
+        else:
+            undistorted_points = points
+
+        point_ixs = np.arange(len(filtered_ixs))
+        while len(point_ixs) > 0:
+            best_p3ds = p3ds[point_ixs]
+            best_errors = errors[point_ixs]
+            best_used = used[:, point_ixs]
+
+            for cnum in range(n_cams):
+                if kill_event is not None and kill_event.is_set():
+                    return None
+                trial_ixs = np.flatnonzero(used[cnum, point_ixs])
+                if len(trial_ixs) == 0:
+                    continue
+                trial_used = used[:, point_ixs[trial_ixs]]
+                trial_used[cnum] = False
+
+                trial_p3ds = triangulate_simple_batch(
+                    np.where(trial_used[:, :, None], undistorted_points[:, point_ixs[trial_ixs]], np.nan),
+                    cam_mats,
+                    weights=weights[:, point_ixs[trial_ixs]] if weights is not None else None,
+                )
+                trial_errors = self.reprojection_error(
+                    trial_p3ds, np.where(trial_used[:, :, None], points[:, point_ixs[trial_ixs]], np.nan), mean=True
+                )
+
+                better = trial_errors < best_errors[trial_ixs]
+                best_p3ds[trial_ixs[better]] = trial_p3ds[better]
+                best_errors[trial_ixs[better]] = trial_errors[better]
+                best_used[:, trial_ixs[better]] = trial_used[:, better]
+
+            improved = best_errors < errors[point_ixs]
+            point_ixs = point_ixs[improved]
+            p3ds[point_ixs] = best_p3ds[improved]
+            errors[point_ixs] = best_errors[improved]
+            used[:, point_ixs] = best_used[:, improved]
+            point_ixs = point_ixs[(errors[point_ixs] > threshold) & (used[:, point_ixs].sum(axis=0) > min_cams)]
+
+        out_p3ds[filtered_ixs] = p3ds
+        out_errors[filtered_ixs] = errors
+        out_used[:, filtered_ixs] = used
+        return out_p3ds, out_errors, out_used
 
-    @jit(parallel=True, forceobj=True)
     def reprojection_error(self, p3ds, p2ds, mean=False):
         """Given an Nx3 array of 3D points and an CxNx2 array of 2D points,
         where N is the number of points and C is the number of cameras,
@@ -682,18 +1223,10 @@ class CameraGroup:
             3,
         ), "shapes of 2D and 3D points are not consistent: " "2D={}, 3D={}".format(p2ds.shape, p3ds.shape)
 
-        errors = np.empty((n_cams, n_points, 2))
-
-        for cnum, cam in enumerate(self.cameras):
-            errors[cnum] = cam.single_camera_reprojection_error(p3ds, p2ds[cnum])
+        errors = p2ds - self.project(p3ds)
 
         if mean:
-            errors_norm = np.linalg.norm(errors, axis=2)
-            good = ~np.isnan(errors_norm)
-            errors_norm[~good] = 0
-            denom = np.sum(good, axis=0).astype("float64")
-            denom[denom < 1.5] = np.nan
-            errors = np.sum(errors_norm, axis=0) / denom
+            errors = mean_reprojection_error(errors)
 
         if one_point:
             if mean:
@@ -750,7 +1283,7 @@ class CameraGroup:
             p2ds, extra = resample_points(p2ds_full, extra_full, n_samp=n_samp_full)
             p3ds = self.triangulate(p2ds)
             errors_full = self.reprojection_error(p3ds, p2ds, mean=False)
-            errors_norm = self.reprojection_error(p3ds, p2ds, mean=True)
+            errors_norm = mean_reprojection_error(errors_full)
 
             error_dict = get_error_dict(errors_full)
             max_error = 0
@@ -788,7 +1321,7 @@ class CameraGroup:
         p2ds, extra = resample_points(p2ds_full, extra_full, n_samp=n_samp_full)
         p3ds = self.triangulate(p2ds)
         errors_full = self.reprojection_error(p3ds, p2ds, mean=False)
-        errors_norm = self.reprojection_error(p3ds, p2ds, mean=True)
+        errors_norm = mean_reprojection_error(errors_full)
         error_dict = get_error_dict(errors_full)
         if verbose:
             print(error_dict)
@@ -812,10 +1345,9 @@ class CameraGroup:
             verbose=verbose,
         )
 
-        error = self.average_error(p2ds, median=True)
-
         p3ds = self.triangulate(p2ds)
         errors_full = self.reprojection_error(p3ds, p2ds, mean=False)
+        error = np.median(mean_reprojection_error(errors_full))
         error_dict = get_error_dict(errors_full)
         if verbose:
             print(error_dict)
@@ -1255,7 +1787,7 @@ class CameraGroup:
 
         return p3ds_new2, alphas_norm
 
-    def triangulate_optim(self, points, init_ransac=False, init_progress=False, **kwargs):
+    def triangulate_optim(self, points, init_ransac=False, init_warm_start=False, init_progress=False, **kwargs):
         """
         Take in an array of 2D points of shape CxNxJx2, and an array of constraints of shape Kx2, where
         C: number of camera
@@ -1269,6 +1801,8 @@ class CameraGroup:
         constraints = [[0, 1], [1, 2], [2, 3]]
         (meaning that lengths of segments 0->1, 1->2, 2->3 are all constant)
 
+        The optimization starts from the ransac triangulation if `init_ransac`, from `triangulate_warm_start` if
+        `init_warm_start`, and from the simple triangulation otherwise.
         """
 
         assert points.shape[0] == len(
@@ -1283,8 +1817,10 @@ class CameraGroup:
 
         points_shaped = points.reshape(n_cams, n_frames * n_joints, 2)
         if init_ransac:
-            p3ds, picked, p2ds, errors = self.triangulate_ransac(points_shaped, progress=init_progress)
-            points = p2ds.reshape(points.shape)
+            # `triangulate_ransac` only returns the points now, so the optimization sees all the 2d points
+            p3ds = self.triangulate_ransac(points_shaped, progress=init_progress)
+        elif init_warm_start:
+            p3ds = self.triangulate_warm_start(points, progress=init_progress)
         else:
             p3ds = self.triangulate(points_shaped, progress=init_progress)
         p3ds = p3ds.reshape((n_frames, n_joints, 3))
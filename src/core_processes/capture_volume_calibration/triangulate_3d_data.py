@@ -2,16 +2,27 @@ import logging
 logger = logging.getLogger(__name__)
 
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 import numpy as np
 import multiprocessing
 
 from src.core_processes.capture_volume_calibration.anipose_camera_calibration.anipose_lib import CameraGroup
+from src.core_processes.capture_volume_calibration.triangulation_process_pool import (
+    run_memory_mapped_triangulation_process_pool,
+    run_triangulation_process_pool,
+    threshold_by_confidence,
+    triangulate_with_reprojection_error,
+)
 
 from src.system.paths_and_filenames.folder_and_filenames import (
     RAW_MEDIAPIPE_3D_NPY_FILENAME,
     MEDIAPIPE_REPROJECTION_ERROR_NPY_FILENAME
 )
+from src.utilities.storage_dtype import get_storage_dtype
+
+# the median and MAD of the reprojection error are taken from at most this many points (8 MB as float64), so
+# computing the filter threshold on a memory mapped recording doesn't read the whole error array into memory
+MAX_NUMBER_OF_REPROJECTION_ERROR_SAMPLES = 1_000_000
 
 
 def triangulate_3d_data(
@@ -20,26 +31,38 @@ def triangulate_3d_data(
     output_data_folder_path: Union[str, Path],
     mediapipe_confidence_cutoff_threshold: float,
     use_triangulate_ransac: bool = False,
-    kill_event: multiprocessing.Event = None
+    kill_event: multiprocessing.Event = None,
+    use_multiprocessing: bool = False,
+    number_of_points_per_chunk: int = 2**16,
+    max_number_of_processes: Optional[int] = None,
+    storage_dtype: str = "float64",
+    use_reprojection_error_filtering: bool = False,
+    reprojection_error_threshold_number_of_mads: float = 3.0,
+    reprojection_error_filtering_min_cams: int = 2,
+    mediapipe_2d_confidence: Optional[np.ndarray] = None,
 ):
+    storage_dtype = get_storage_dtype(storage_dtype)
     number_cameras = mediapipe_2d_data.shape[0]
     number_frames = mediapipe_2d_data.shape[1]
-    number_tracked_points = mediapipe_2d_data[2]
-    number_spatial_dimensions = mediapipe_2d_data[3]
+    number_tracked_points = mediapipe_2d_data.shape[2]
+    number_spatial_dimensions = mediapipe_2d_data.shape[3]
 
     if not number_spatial_dimensions == 2:
         logger.error(f"Should be 2D data, but mediapipe array has {number_spatial_dimensions} spatial dimensions")
         raise Exception
     
-    # TODO: Removed 2d data confidence thresholding
-    # mediapipe_2d_data = threshold_by_confidence(
-    #     data2d=mediapipe_2d_data,
-    #     confidence_threshold=mediapipe_confidence_cutoff_threshold
-    # )
-    
     # reshape to collapse across frames [number_cameras, number_tracked_points(number_frames*number_tracked_points), XY]
     data2d_flat = mediapipe_2d_data.reshape(number_cameras, -1, 2)
 
+    # with the [number_cameras, number_frames, number_tracked_points] confidences, views under the cut-off are left out
+    # and the rest are weighted by their confidence
+    confidence_flat = None
+    confidence_threshold = None
+    if mediapipe_2d_confidence is not None:
+        confidence_flat = mediapipe_2d_confidence.reshape(number_cameras, -1)
+        confidence_threshold = mediapipe_confidence_cutoff_threshold
+        logger.info(f"Weighting the 2d points by their confidence, leaving out those under {confidence_threshold}")
+
     logger.info(
         f"Reconstructing 3d points from 2d points with shape: \n"
         f"number_cameras: {number_cameras}\n"
@@ -48,21 +71,56 @@ def triangulate_3d_data(
         f"number_spatial_dimensions: {number_spatial_dimensions}"
     )
 
-    if use_triangulate_ransac:
-        logger.info("Using 'triangulate_ransac' method")
-        data3d_flat = anipose_calibration_object.triangulate_ransac(data2d_flat, progress=True, kill_event=kill_event)
+    if use_multiprocessing:
+        triangulation_results = run_triangulation_process_pool(
+            anipose_calibration_object=anipose_calibration_object,
+            data2d_flat=data2d_flat,
+            use_triangulate_ransac=use_triangulate_ransac,
+            number_of_points_per_chunk=number_of_points_per_chunk,
+            max_number_of_processes=max_number_of_processes,
+            kill_event=kill_event,
+            storage_dtype=storage_dtype,
+            confidence_flat=confidence_flat,
+            confidence_threshold=confidence_threshold,
+        )
+        if triangulation_results is None:
+            logger.info("3d triangulation was stopped before it finished")
+            return None, None
+        data3d_flat, data3d_reprojectionError_flat = triangulation_results
     else:
-        logger.info("Using simple 'triangulate' method")
-        data3d_flat = anipose_calibration_object.triangulate(data2d_flat, progress=True, kill_event=kill_event)
-    spatial_data3d_numFrames_numTrackedPoints_XYZ_og = data3d_flat.reshape(number_frames, number_tracked_points, 3)
+        logger.info(f"Using {'ransac' if use_triangulate_ransac else 'simple'} 'triangulate' method")
+        triangulation_results = triangulate_with_reprojection_error(
+            anipose_calibration_object,
+            data2d_flat,
+            use_triangulate_ransac=use_triangulate_ransac,
+            kill_event=kill_event,
+            progress=True,
+            confidence_flat=confidence_flat,
+            confidence_threshold=confidence_threshold,
+        )
+        if triangulation_results is None:
+            logger.info("3d triangulation was stopped before it finished")
+            return None, None
+        data3d_flat, data3d_reprojectionError_flat = triangulation_results
 
-    data3d_reprojectionError_flat = anipose_calibration_object.reprojection_error(data3d_flat, data2d_flat, mean=True)
-    data3d_reprojection_error_numFrames_numTrackedPoints = data3d_reprojectionError_flat.reshape(number_frames, number_tracked_points)
+    spatial_data3d_numFrames_numTrackedPoints_XYZ = data3d_flat.reshape(number_frames, number_tracked_points, 3).astype(storage_dtype, copy=False)
+    data3d_reprojection_error_numFrames_numTrackedPoints = data3d_reprojectionError_flat.reshape(number_frames, number_tracked_points).astype(storage_dtype, copy=False)
 
-    spatial_data3d_numFrames_numTrackedPoints_XYZ = remove_3d_data_with_high_reprojection_error(
-        data3d = spatial_data3d_numFrames_numTrackedPoints_XYZ_og,
-        reprojection_error = data3d_reprojection_error_numFrames_numTrackedPoints
-    )
+    if use_reprojection_error_filtering:
+        finished = remove_3d_data_with_high_reprojection_error(
+            anipose_calibration_object=anipose_calibration_object,
+            data2d=mediapipe_2d_data,
+            data3d=spatial_data3d_numFrames_numTrackedPoints_XYZ,
+            reprojection_error=data3d_reprojection_error_numFrames_numTrackedPoints,
+            number_of_median_absolute_deviations=reprojection_error_threshold_number_of_mads,
+            min_cams=reprojection_error_filtering_min_cams,
+            kill_event=kill_event,
+            confidence=mediapipe_2d_confidence,
+            confidence_threshold=confidence_threshold,
+        )
+        if not finished:
+            logger.info("3d triangulation was stopped before it finished")
+            return None, None
 
     save_mediapipe_3d_data_to_npy(
         data3d = spatial_data3d_numFrames_numTrackedPoints_XYZ,
@@ -75,6 +133,138 @@ def triangulate_3d_data(
         data3d_reprojection_error_numFrames_numTrackedPoints
     )
 
+def triangulate_3d_data_from_npy(
+    anipose_calibration_object: CameraGroup,
+    mediapipe_2d_data_npy_file_path: Union[str, Path],
+    output_data_folder_path: Union[str, Path],
+    number_of_frames_per_block: int = 1000,
+    use_triangulate_ransac: bool = False,
+    kill_event: multiprocessing.Event = None,
+    use_multiprocessing: bool = False,
+    max_number_of_processes: Optional[int] = None,
+    storage_dtype: str = "float64",
+    use_reprojection_error_filtering: bool = False,
+    reprojection_error_threshold_number_of_mads: float = 3.0,
+    reprojection_error_filtering_min_cams: int = 2,
+    mediapipe_2d_confidence_npy_file_path: Optional[Union[str, Path]] = None,
+    mediapipe_confidence_cutoff_threshold: Optional[float] = None,
+):
+    """
+    `triangulate_3d_data` for recordings too big to hold in memory: the [number_cameras, number_frames,
+    number_tracked_points, XY(Z)] 2d data is memory mapped from its .npy file and triangulated `number_of_frames_per_block`
+    frames at a time (one block per worker task when `use_multiprocessing`), straight into memory mapped 3d and
+    reprojection error .npy files. Peak memory is set by the block size, not the length of the recording.
+    Given the .npy file of the [number_cameras, number_frames, number_tracked_points] confidences, it's memory mapped
+    too, and used like `mediapipe_2d_confidence` in `triangulate_3d_data`.
+
+    Returns the memory mapped 3d data and reprojection errors, or (None, None) if the kill event was set
+    """
+    storage_dtype = get_storage_dtype(storage_dtype)
+    mediapipe_2d_data = np.load(mediapipe_2d_data_npy_file_path, mmap_mode="r")
+    number_cameras, number_frames, number_tracked_points, number_spatial_dimensions = mediapipe_2d_data.shape
+    mediapipe_2d_confidence = None
+    if mediapipe_2d_confidence_npy_file_path is not None:
+        mediapipe_2d_confidence = np.load(mediapipe_2d_confidence_npy_file_path, mmap_mode="r")
+        logger.info(f"Weighting the 2d points by their confidence, leaving out those under {mediapipe_confidence_cutoff_threshold}")
+
+    if number_spatial_dimensions < 2:
+        logger.error(f"Should be 2D data, but mediapipe array has {number_spatial_dimensions} spatial dimensions")
+        raise Exception
+
+    logger.info(
+        f"Reconstructing 3d points from memory mapped 2d points in blocks of {number_of_frames_per_block} frames: \n"
+        f"number_cameras: {number_cameras}\n"
+        f"number_frames: {number_frames}\n"
+        f"number_tracked_points: {number_tracked_points}"
+    )
+
+    output_data_folder_path = Path(output_data_folder_path)
+    output_data_folder_path.mkdir(parents=True, exist_ok=True)
+    data3d_save_path = output_data_folder_path / RAW_MEDIAPIPE_3D_NPY_FILENAME
+    reprojection_error_save_path = output_data_folder_path / MEDIAPIPE_REPROJECTION_ERROR_NPY_FILENAME
+    spatial_data3d_numFrames_numTrackedPoints_XYZ = np.lib.format.open_memmap(
+        data3d_save_path, mode="w+", dtype=storage_dtype, shape=(number_frames, number_tracked_points, 3)
+    )
+    data3d_reprojection_error_numFrames_numTrackedPoints = np.lib.format.open_memmap(
+        reprojection_error_save_path, mode="w+", dtype=storage_dtype, shape=(number_frames, number_tracked_points)
+    )
+    spatial_data3d_numFrames_numTrackedPoints_XYZ[:] = np.nan
+    data3d_reprojection_error_numFrames_numTrackedPoints[:] = np.nan
+
+    if use_multiprocessing:
+        spatial_data3d_numFrames_numTrackedPoints_XYZ.flush()
+        data3d_reprojection_error_numFrames_numTrackedPoints.flush()
+        finished = run_memory_mapped_triangulation_process_pool(
+            anipose_calibration_object=anipose_calibration_object,
+            data2d_npy_file_path=mediapipe_2d_data_npy_file_path,
+            data3d_npy_file_path=data3d_save_path,
+            reprojection_error_npy_file_path=reprojection_error_save_path,
+            number_of_points_per_chunk=number_of_frames_per_block * number_tracked_points,
+            use_triangulate_ransac=use_triangulate_ransac,
+            max_number_of_processes=max_number_of_processes,
+            kill_event=kill_event,
+            confidence_npy_file_path=mediapipe_2d_confidence_npy_file_path,
+            confidence_threshold=mediapipe_confidence_cutoff_threshold,
+        )
+        if not finished:
+            logger.info("3d triangulation was stopped before it finished")
+            return None, None
+    else:
+        for start_frame in range(0, number_frames, number_of_frames_per_block):
+            block_frames = slice(start_frame, min(start_frame + number_of_frames_per_block, number_frames))
+            block_data2d_flat = np.ascontiguousarray(mediapipe_2d_data[:, block_frames, :, :2]).reshape(number_cameras, -1, 2)
+            block_confidence_flat = None
+            if mediapipe_2d_confidence is not None:
+                block_confidence_flat = np.array(mediapipe_2d_confidence[:, block_frames]).reshape(number_cameras, -1)
+
+            block_results = triangulate_with_reprojection_error(
+                anipose_calibration_object,
+                block_data2d_flat,
+                use_triangulate_ransac=use_triangulate_ransac,
+                kill_event=kill_event,
+                confidence_flat=block_confidence_flat,
+                confidence_threshold=mediapipe_confidence_cutoff_threshold,
+            )
+            if block_results is None:
+                logger.info("3d triangulation was stopped before it finished")
+                return None, None
+
+            block_data3d_flat, block_reprojection_error_flat = block_results
+            spatial_data3d_numFrames_numTrackedPoints_XYZ[block_frames] = block_data3d_flat.reshape(-1, number_tracked_points, 3)
+            data3d_reprojection_error_numFrames_numTrackedPoints[block_frames] = block_reprojection_error_flat.reshape(-1, number_tracked_points)
+            logger.info(f"Triangulated frames {block_frames.start} to {block_frames.stop} of {number_frames}")
+
+        # the workers wrote through their own maps, so only the serial path has anything to flush
+        spatial_data3d_numFrames_numTrackedPoints_XYZ.flush()
+        data3d_reprojection_error_numFrames_numTrackedPoints.flush()
+
+    if use_reprojection_error_filtering:
+        finished = remove_3d_data_with_high_reprojection_error(
+            anipose_calibration_object=anipose_calibration_object,
+            data2d=mediapipe_2d_data,
+            data3d=spatial_data3d_numFrames_numTrackedPoints_XYZ,
+            reprojection_error=data3d_reprojection_error_numFrames_numTrackedPoints,
+            number_of_median_absolute_deviations=reprojection_error_threshold_number_of_mads,
+            min_cams=reprojection_error_filtering_min_cams,
+            number_of_frames_per_block=number_of_frames_per_block,
+            kill_event=kill_event,
+            confidence=mediapipe_2d_confidence,
+            confidence_threshold=mediapipe_confidence_cutoff_threshold,
+        )
+        if not finished:
+            logger.info("3d triangulation was stopped before it finished")
+            return None, None
+        spatial_data3d_numFrames_numTrackedPoints_XYZ.flush()
+        data3d_reprojection_error_numFrames_numTrackedPoints.flush()
+
+    logger.info(f"Saved: {data3d_save_path}")
+    logger.info(f"Saved: {reprojection_error_save_path}")
+
+    return (
+        spatial_data3d_numFrames_numTrackedPoints_XYZ,
+        data3d_reprojection_error_numFrames_numTrackedPoints
+    )
+
 def save_mediapipe_3d_data_to_npy(
     data3d: np.ndarray,
     reprojection_error: np.ndarray,
@@ -91,47 +281,138 @@ def save_mediapipe_3d_data_to_npy(
     logger.info(f"Saving {reprojection_error_save_path}")
     np.save(str(reprojection_error_save_path), reprojection_error)
 
-def threshold_by_confidence(
-    data2d: np.ndarray,
-    confidence_threshold: float = 0.0
-):
-    data2d[data2d <= confidence_threshold] = np.nan
-    number_nans = np.sum(np.isnan(data2d))
-    number_points = np.prod(data2d.shape)
-    percentage_nans = (np.sum(np.isnan(data2d)) / number_points) * 100
-    logger.info(f"After confidence thresholding 'mediapipe_2d' with a confidence threshold of {confidence_threshold}, it has {number_nans} NaN values out of {number_points} ({percentage_nans} %)")
-    return data2d
+def get_reprojection_error_threshold(
+    reprojection_error: np.ndarray,
+    number_of_median_absolute_deviations: float = 3.0,
+    number_of_frames_per_block: Optional[int] = None,
+) -> float:
+    """
+    The median + `number_of_median_absolute_deviations` * MAD of the points' mean reprojection errors. Reads the
+    [number_frames, number_tracked_points] `reprojection_error` `number_of_frames_per_block` frames at a time (all of
+    them if None). Past `MAX_NUMBER_OF_REPROJECTION_ERROR_SAMPLES` finite errors, the median and MAD are those of a
+    random sample of that size, so memory stays bounded by the block size
+    """
+    number_frames = reprojection_error.shape[0]
+    if number_of_frames_per_block is None:
+        number_of_frames_per_block = number_frames
+    frame_blocks = [
+        slice(start_frame, min(start_frame + number_of_frames_per_block, number_frames))
+        for start_frame in range(0, number_frames, number_of_frames_per_block)
+    ]
 
-def remove_3d_data_with_high_reprojection_error(
-    data3d: np.ndarray,
-    reprojection_error: np.ndarray
-):
-    return data3d
-    # TODO: Fix this function, causing over filtering in conjunction with anipose calibration confidence threshold
+    # first pass: the exact mean and std, and how many finite errors there are to sample from
+    number_of_finite_errors = 0
+    reprojection_error_sum = 0.0
+    reprojection_error_sum_of_squares = 0.0
+    for block_frames in frame_blocks:
+        block_reprojection_error = np.asarray(reprojection_error[block_frames], dtype=np.float64)
+        block_reprojection_error = block_reprojection_error[np.isfinite(block_reprojection_error)]
+        number_of_finite_errors += block_reprojection_error.size
+        reprojection_error_sum += np.sum(block_reprojection_error)
+        reprojection_error_sum_of_squares += np.sum(block_reprojection_error**2)
+
+    # second pass: every finite error, or a random sample of them on long recordings
+    sample_fraction = MAX_NUMBER_OF_REPROJECTION_ERROR_SAMPLES / max(number_of_finite_errors, 1)
+    random_number_generator = np.random.default_rng(0)
+    reprojection_error_samples = []
+    for block_frames in frame_blocks:
+        block_reprojection_error = np.asarray(reprojection_error[block_frames], dtype=np.float64)
+        block_reprojection_error = block_reprojection_error[np.isfinite(block_reprojection_error)]
+        if sample_fraction < 1:
+            block_reprojection_error = block_reprojection_error[random_number_generator.random(block_reprojection_error.size) < sample_fraction]
+        reprojection_error_samples.append(block_reprojection_error)
+    reprojection_error_samples = np.concatenate(reprojection_error_samples)
+
+    reprojection_error_median = np.nanmedian(reprojection_error_samples)
+    median_absolute_deviation = np.nanmedian(np.abs(reprojection_error_samples - reprojection_error_median))
 
-    logger.info("Removing 3D data with high reprojection error")
-    mean_reprojection_error_per_frame = np.nanmean(data3d, axis=1)
+    reprojection_error_mean = reprojection_error_sum / number_of_finite_errors if number_of_finite_errors else np.nan
+    reprojection_error_std = (
+        np.sqrt(max(reprojection_error_sum_of_squares / number_of_finite_errors - reprojection_error_mean**2, 0.0))
+        if number_of_finite_errors
+        else np.nan
+    )
+    logger.info(
+        f"\nInitial reprojection error - \nmean: {reprojection_error_mean:.3f}, \nstd: {reprojection_error_std:.3f}, "
+        f"\nmedian: {reprojection_error_median:.3f}, \nmedian abs deviation: {median_absolute_deviation:.3f}"
+    )
+    return float(reprojection_error_median + number_of_median_absolute_deviations * median_absolute_deviation)
 
-    reprojection_error_mean = np.nanmean(mean_reprojection_error_per_frame)
-    reprojection_error_median = np.nanmedian(mean_reprojection_error_per_frame)
-    reprojection_error_std = np.nanstd(mean_reprojection_error_per_frame)
+def remove_3d_data_with_high_reprojection_error(
+    anipose_calibration_object: CameraGroup,
+    data2d: np.ndarray,
+    data3d: np.ndarray,
+    reprojection_error: np.ndarray,
+    number_of_median_absolute_deviations: float = 3.0,
+    min_cams: int = 2,
+    number_of_frames_per_block: Optional[int] = None,
+    kill_event: multiprocessing.Event = None,
+    confidence: Optional[np.ndarray] = None,
+    confidence_threshold: Optional[float] = None,
+) -> bool:
+    """
+    Re-triangulates, in place, the points of the [number_frames, number_tracked_points, XYZ] `data3d` whose
+    [number_frames, number_tracked_points] `reprojection_error` is over median + k * MAD. Each round leaves out each
+    camera of the [number_cameras, number_frames, number_tracked_points, XY(Z)] `data2d` that saw the point in turn
+    (one triangulation per camera), and keeps the drop that lowers the error the most, until its error stops improving
+    or it is down to `min_cams` cameras (see `CameraGroup.triangulate_without_outlier_cameras`).
+    Points that improve get the error over the cameras they kept. Given the [number_cameras, number_frames,
+    number_tracked_points] `confidence`, views under `confidence_threshold` are left out and the rest weighted by it,
+    the same as when they were triangulated.
 
-    median_absolute_deviation = np.nanmedian(np.abs(mean_reprojection_error_per_frame - reprojection_error_median))
+    Works `number_of_frames_per_block` frames at a time (all of them if None), so the arrays can be memory maps.
+    Returns False if the kill event was set
+    """
+    logger.info("Re-triangulating 3D data with high reprojection error, leaving out each camera in turn")
+    error_threshold = get_reprojection_error_threshold(
+        reprojection_error,
+        number_of_median_absolute_deviations=number_of_median_absolute_deviations,
+        number_of_frames_per_block=number_of_frames_per_block,
+    )
+    logger.info(f"Filtering points with reprojection error > {error_threshold:.3f}")
 
-    logger.info(f"\nInitial reprojection error - \nmean: {reprojection_error_mean:.3f}, \nstd: {reprojection_error_std:.3f}, \nmedian: {reprojection_error_median:.3f}, \nmedian abs deviation: {median_absolute_deviation:.3f}")
+    number_cameras, number_frames, number_tracked_points = data2d.shape[:3]
+    if number_of_frames_per_block is None:
+        number_of_frames_per_block = number_frames
 
-    error_threshold = reprojection_error_median + 3 * median_absolute_deviation
+    number_points_over_threshold_before = 0
+    number_points_over_threshold_after = 0
+    number_camera_views_dropped = 0
+    for start_frame in range(0, number_frames, number_of_frames_per_block):
+        block_frames = slice(start_frame, min(start_frame + number_of_frames_per_block, number_frames))
+        block_reprojection_error_flat = np.asarray(reprojection_error[block_frames], dtype=np.float64).reshape(-1)
+        # NaN errors (points fewer than 2 cameras saw) are never over the threshold
+        if not np.any(block_reprojection_error_flat > error_threshold):
+            continue
 
-    number_nans_before_thresholding = np.sum(np.isnan(data3d))
+        block_data2d_flat = np.ascontiguousarray(data2d[:, block_frames, :, :2], dtype=np.float64).reshape(number_cameras, -1, 2)
+        block_confidence_flat = None
+        if confidence is not None:
+            block_confidence_flat = np.asarray(confidence[:, block_frames], dtype=np.float64).reshape(number_cameras, -1)
+            if confidence_threshold is not None:
+                block_data2d_flat = threshold_by_confidence(block_data2d_flat, block_confidence_flat, confidence_threshold)
+        filter_results = anipose_calibration_object.triangulate_without_outlier_cameras(
+            block_data2d_flat,
+            np.asarray(data3d[block_frames], dtype=np.float64).reshape(-1, 3),
+            block_reprojection_error_flat,
+            threshold=error_threshold,
+            min_cams=min_cams,
+            kill_event=kill_event,
+            weights=block_confidence_flat,
+        )
+        if filter_results is None:
+            return False
 
-    # replace points with high reprojection error
-    data3d[reprojection_error > error_threshold] = np.nan
+        block_data3d_flat, block_filtered_reprojection_error_flat, block_cameras_used = filter_results
+        data3d[block_frames] = block_data3d_flat.reshape(-1, number_tracked_points, 3)
+        reprojection_error[block_frames] = block_filtered_reprojection_error_flat.reshape(-1, number_tracked_points)
 
-    number_nans_after_thresholding = np.sum(np.isnan(data3d))
-    percentage_nans_removed = ((number_nans_before_thresholding - number_nans_after_thresholding) / number_nans_before_thresholding) * 100
+        number_points_over_threshold_before += np.sum(block_reprojection_error_flat > error_threshold)
+        number_points_over_threshold_after += np.sum(block_filtered_reprojection_error_flat > error_threshold)
+        number_camera_views_dropped += np.sum(~np.isnan(block_data2d_flat[:, :, 0]) & ~block_cameras_used)
 
-    logger.info(f"Removing points with reprojection errror > {error_threshold:.3f}")
-    logger.info(f"Number NaNs before thresholding: {number_nans_before_thresholding}")
-    logger.info(f"Number NaNs after thresholding: {number_nans_after_thresholding} ({percentage_nans_removed:.2f} %)")
+    logger.info(f"Number points over the threshold before filtering: {number_points_over_threshold_before}")
+    logger.info(f"Number points over the threshold after filtering: {number_points_over_threshold_after}")
+    logger.info(f"Number camera views dropped: {number_camera_views_dropped}")
 
-    return data3d
\ No newline at end of file
+    return True
@@ -0,0 +1,356 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+
+import numba
+import numpy as np
+
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.anipose_lib import CameraGroup
+from src.utilities.number_of_processes import get_number_of_processes
+from src.utilities.shared_memory import SharedNumpyArray
+
+# how often (as a fraction of all points) the aggregated progress is logged, which is what the GUI shows
+PROGRESS_LOG_FRACTION = 0.05
+
+# set in each worker process by `_initialize_worker`
+_worker_camera_group = None
+_worker_stop_event = None
+_worker_progress_queue = None
+
+
+@dataclass
+class TriangulationChunk:
+    chunk_index: int
+    start_point: int
+    end_point: int
+
+    @property
+    def number_of_points(self) -> int:
+        return self.end_point - self.start_point
+
+
+def get_triangulation_chunks(number_of_points: int, number_of_points_per_chunk: int) -> List[TriangulationChunk]:
+    number_of_points_per_chunk = max(1, number_of_points_per_chunk)
+    return [
+        TriangulationChunk(
+            chunk_index=chunk_index,
+            start_point=start_point,
+            end_point=min(start_point + number_of_points_per_chunk, number_of_points),
+        )
+        for chunk_index, start_point in enumerate(range(0, number_of_points, number_of_points_per_chunk))
+    ]
+
+
+def threshold_by_confidence(
+    data2d: np.ndarray,
+    confidence: np.ndarray,
+    confidence_threshold: float = 0.0,
+) -> np.ndarray:
+    """
+    A float64 copy of the [number_cameras, ..., XY(Z)] `data2d` with the camera views whose [number_cameras, ...]
+    `confidence` is under `confidence_threshold` set to NaN. Views without a confidence (NaN) are kept
+    """
+    return np.where((confidence < confidence_threshold)[..., None], np.nan, np.asarray(data2d, dtype=np.float64))
+
+
+def triangulate_with_reprojection_error(
+    camera_group: CameraGroup,
+    data2d_flat: np.ndarray,
+    use_triangulate_ransac: bool = False,
+    kill_event: multiprocessing.Event = None,
+    progress: bool = False,
+    confidence_flat: Optional[np.ndarray] = None,
+    confidence_threshold: Optional[float] = None,
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Triangulates the [number_cameras, number_points, XY] `data2d_flat` and gets each point's mean reprojection error.
+    Given the [number_cameras, number_points] `confidence_flat`, views under `confidence_threshold` are left out and
+    the simple method weights the rest by their confidence (ransac only uses the threshold).
+    Returns the float64 [number_points, XYZ] points and [number_points] errors, or None if the kill event was set
+    """
+    # the 2d points may be stored as float32, undistortion and the SVD always run in float64
+    data2d_flat = data2d_flat.astype(np.float64, copy=False)
+    weights = None
+    if confidence_flat is not None:
+        weights = confidence_flat.astype(np.float64)
+        if confidence_threshold is not None:
+            data2d_flat = threshold_by_confidence(data2d_flat, weights, confidence_threshold)
+
+    if use_triangulate_ransac:
+        data3d_flat = camera_group.triangulate_ransac(data2d_flat, progress=progress, kill_event=kill_event)
+    else:
+        data3d_flat = camera_group.triangulate(data2d_flat, progress=progress, kill_event=kill_event, weights=weights)
+    if data3d_flat is None:
+        return None
+    return data3d_flat, camera_group.reprojection_error(data3d_flat, data2d_flat, mean=True)
+
+
+def run_triangulation_process_pool(
+    anipose_calibration_object: CameraGroup,
+    data2d_flat: np.ndarray,
+    use_triangulate_ransac: bool = False,
+    number_of_points_per_chunk: int = 2**16,
+    max_number_of_processes: Optional[int] = None,
+    kill_event: multiprocessing.Event = None,
+    storage_dtype: np.dtype = np.float64,
+    confidence_flat: Optional[np.ndarray] = None,
+    confidence_threshold: Optional[float] = None,
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Triangulates the [number_cameras, number_points, XY] `data2d_flat` in chunks of points across a process pool, and
+    computes each chunk's mean reprojection error while the worker still has it. Workers read the 2d points from, and
+    write the [number_points, XYZ] points and [number_points] reprojection errors (as `storage_dtype`) into, shared memory.
+    The optional [number_cameras, number_points] `confidence_flat` is shared too, see `triangulate_with_reprojection_error`.
+    Progress over all chunks is logged as they finish, and the kill event is checked between chunks.
+
+    Returns the 3d points and reprojection errors, or None if processing was stopped by the kill event
+    """
+    number_cameras, number_points, _ = data2d_flat.shape
+
+    shared_data2d = SharedNumpyArray(shape=data2d_flat.shape, dtype=data2d_flat.dtype, fill_value=None)
+    shared_data3d = SharedNumpyArray(shape=(number_points, 3), dtype=storage_dtype)
+    shared_reprojection_error = SharedNumpyArray(shape=(number_points,), dtype=storage_dtype)
+    shared_arrays = [shared_data2d, shared_data3d, shared_reprojection_error]
+    shared_data2d.array[:] = data2d_flat
+    if confidence_flat is not None:
+        shared_confidence = SharedNumpyArray(shape=confidence_flat.shape, dtype=confidence_flat.dtype, fill_value=None)
+        shared_confidence.array[:] = confidence_flat
+        shared_arrays.append(shared_confidence)
+    shared_array_descriptors = tuple(shared_array.descriptor for shared_array in shared_arrays)
+
+    try:
+        finished = _run_triangulation_chunks(
+            anipose_calibration_object=anipose_calibration_object,
+            chunks=get_triangulation_chunks(number_points, number_of_points_per_chunk),
+            worker=_triangulate_shared_memory_chunk_worker,
+            worker_args=(shared_array_descriptors, use_triangulate_ransac, confidence_threshold),
+            use_triangulate_ransac=use_triangulate_ransac,
+            max_number_of_processes=max_number_of_processes,
+            kill_event=kill_event,
+        )
+        if not finished:
+            return None
+        return shared_data3d.array.copy(), shared_reprojection_error.array.copy()
+    finally:
+        for shared_array in shared_arrays:
+            shared_array.close()
+            shared_array.unlink()
+
+
+def run_memory_mapped_triangulation_process_pool(
+    anipose_calibration_object: CameraGroup,
+    data2d_npy_file_path: Union[str, Path],
+    data3d_npy_file_path: Union[str, Path],
+    reprojection_error_npy_file_path: Union[str, Path],
+    number_of_points_per_chunk: int = 2**16,
+    use_triangulate_ransac: bool = False,
+    max_number_of_processes: Optional[int] = None,
+    kill_event: multiprocessing.Event = None,
+    confidence_npy_file_path: Optional[Union[str, Path]] = None,
+    confidence_threshold: Optional[float] = None,
+) -> bool:
+    """
+    Like `run_triangulation_process_pool`, but the workers memory map the .npy files instead of sharing memory: they
+    read their chunk of points from the [number_cameras, number_frames, number_tracked_points, XY(Z)] 2d data (and
+    [number_cameras, number_frames, number_tracked_points] confidences, if given) and write
+    into the already created [number_frames, number_tracked_points, XYZ] 3d and [number_frames, number_tracked_points]
+    reprojection error files, so nothing bigger than a chunk is ever in memory.
+
+    Returns True if every chunk finished, False if processing was stopped by the kill event
+    """
+    data2d = np.load(data2d_npy_file_path, mmap_mode="r")
+    number_points = data2d.shape[1] * data2d.shape[2]
+    del data2d
+
+    return _run_triangulation_chunks(
+        anipose_calibration_object=anipose_calibration_object,
+        chunks=get_triangulation_chunks(number_points, number_of_points_per_chunk),
+        worker=_triangulate_memory_mapped_chunk_worker,
+        worker_args=(
+            (
+                str(data2d_npy_file_path),
+                str(data3d_npy_file_path),
+                str(reprojection_error_npy_file_path),
+                str(confidence_npy_file_path) if confidence_npy_file_path is not None else None,
+            ),
+            use_triangulate_ransac,
+            confidence_threshold,
+        ),
+        use_triangulate_ransac=use_triangulate_ransac,
+        max_number_of_processes=max_number_of_processes,
+        kill_event=kill_event,
+    )
+
+
+def _run_triangulation_chunks(
+    anipose_calibration_object: CameraGroup,
+    chunks: List[TriangulationChunk],
+    worker: Callable,
+    worker_args: Tuple,
+    use_triangulate_ransac: bool,
+    max_number_of_processes: Optional[int],
+    kill_event: multiprocessing.Event,
+) -> bool:
+    """Runs `worker(chunk, *worker_args)` for every chunk in a process pool, logging the progress over all chunks"""
+    number_points = sum(chunk.number_of_points for chunk in chunks)
+    number_of_processes = get_number_of_processes(len(chunks), max_number_of_processes)
+    # the simple triangulation kernel is itself multithreaded, so split the cores between the workers
+    numba_threads_per_process = max(1, (os.cpu_count() or 1) // number_of_processes)
+    logger.info(
+        f"Triangulating {number_points} points in {len(chunks)} chunks using {number_of_processes} processes "
+        f"({'ransac' if use_triangulate_ransac else 'simple'} method)"
+    )
+
+    # numba's threads don't survive a fork, so always spawn
+    mp_context = multiprocessing.get_context("spawn")
+    stop_event = mp_context.Event()
+    progress_queue = mp_context.Queue()
+    points_triangulated = 0
+    progress_log_step = max(1, int(PROGRESS_LOG_FRACTION * number_points))
+    next_progress_log_points = min(progress_log_step, number_points)
+    worker_exception = None
+
+    with ProcessPoolExecutor(
+        max_workers=number_of_processes,
+        mp_context=mp_context,
+        initializer=_initialize_worker,
+        initargs=(anipose_calibration_object, stop_event, progress_queue, numba_threads_per_process),
+    ) as executor:
+        pending_futures = {executor.submit(worker, chunk, *worker_args) for chunk in chunks}
+
+        while pending_futures:
+            done_futures, pending_futures = wait(pending_futures, timeout=0.1)
+            points_triangulated += _collect_worker_progress(progress_queue)
+            if points_triangulated >= next_progress_log_points:
+                logger.info(
+                    f"Triangulated {points_triangulated} of {number_points} points "
+                    f"({100 * points_triangulated / number_points:.0f}%)"
+                )
+                next_progress_log_points = min(points_triangulated + progress_log_step, number_points)
+
+            for future in done_futures:
+                if future.cancelled() or future.exception() is None:
+                    continue
+                logger.error(f"Triangulation worker failed: {future.exception()}")
+                worker_exception = future.exception()
+                stop_event.set()
+
+            if kill_event is not None and kill_event.is_set() and not stop_event.is_set():
+                logger.info("Kill event set, stopping triangulation workers")
+                stop_event.set()
+
+            if stop_event.is_set():
+                for future in pending_futures:
+                    future.cancel()
+
+    if worker_exception is not None:
+        raise worker_exception
+
+    return not stop_event.is_set()
+
+
+def _initialize_worker(
+    camera_group: CameraGroup,
+    stop_event: multiprocessing.Event,
+    progress_queue: multiprocessing.Queue,
+    numba_threads_per_process: int,
+):
+    global _worker_camera_group, _worker_stop_event, _worker_progress_queue
+    _worker_camera_group = camera_group
+    _worker_stop_event = stop_event
+    _worker_progress_queue = progress_queue
+    numba.set_num_threads(min(numba_threads_per_process, numba.config.NUMBA_NUM_THREADS))
+
+
+def _triangulate_shared_memory_chunk_worker(
+    chunk: TriangulationChunk,
+    shared_array_descriptors: Tuple,
+    use_triangulate_ransac: bool,
+    confidence_threshold: Optional[float],
+):
+    if _worker_stop_event.is_set():
+        return
+
+    shared_arrays = [SharedNumpyArray.attach(descriptor) for descriptor in shared_array_descriptors]
+    shared_data2d, shared_data3d, shared_reprojection_error = shared_arrays[:3]
+    try:
+        point_range = slice(chunk.start_point, chunk.end_point)
+        # a contiguous copy, so opencv's undistortion gets the memory layout it wants
+        chunk_data2d = np.ascontiguousarray(shared_data2d.array[:, point_range])
+        chunk_confidence = shared_arrays[3].array[:, point_range].copy() if len(shared_arrays) > 3 else None
+
+        chunk_results = triangulate_with_reprojection_error(
+            _worker_camera_group,
+            chunk_data2d,
+            use_triangulate_ransac=use_triangulate_ransac,
+            kill_event=_worker_stop_event,
+            confidence_flat=chunk_confidence,
+            confidence_threshold=confidence_threshold,
+        )
+        if chunk_results is None:
+            return
+
+        shared_data3d.array[point_range], shared_reprojection_error.array[point_range] = chunk_results
+        _worker_progress_queue.put(chunk.number_of_points)
+    finally:
+        for shared_array in shared_arrays:
+            shared_array.close()
+
+
+def _triangulate_memory_mapped_chunk_worker(
+    chunk: TriangulationChunk,
+    npy_file_paths: Tuple[str, str, str, Optional[str]],
+    use_triangulate_ransac: bool,
+    confidence_threshold: Optional[float],
+):
+    if _worker_stop_event.is_set():
+        return
+
+    data2d_npy_file_path, data3d_npy_file_path, reprojection_error_npy_file_path, confidence_npy_file_path = npy_file_paths
+    data2d = np.load(data2d_npy_file_path, mmap_mode="r")
+    point_range = slice(chunk.start_point, chunk.end_point)
+    # merging the frame and tracked point axes of the memmap is a view, only this chunk's points are read
+    chunk_data2d = np.ascontiguousarray(data2d.reshape(data2d.shape[0], -1, data2d.shape[3])[:, point_range, :2])
+    del data2d
+
+    chunk_confidence = None
+    if confidence_npy_file_path is not None:
+        confidence = np.load(confidence_npy_file_path, mmap_mode="r")
+        chunk_confidence = np.array(confidence.reshape(confidence.shape[0], -1)[:, point_range])
+        del confidence
+
+    chunk_results = triangulate_with_reprojection_error(
+        _worker_camera_group,
+        chunk_data2d,
+        use_triangulate_ransac=use_triangulate_ransac,
+        kill_event=_worker_stop_event,
+        confidence_flat=chunk_confidence,
+        confidence_threshold=confidence_threshold,
+    )
+    if chunk_results is None:
+        return
+
+    # the chunks don't overlap, so the workers can all write into the same files
+    data3d = np.load(data3d_npy_file_path, mmap_mode="r+")
+    reprojection_error = np.load(reprojection_error_npy_file_path, mmap_mode="r+")
+    data3d.reshape(-1, 3)[point_range], reprojection_error.reshape(-1)[point_range] = chunk_results
+    data3d.flush()
+    reprojection_error.flush()
+    del data3d, reprojection_error
+    _worker_progress_queue.put(chunk.number_of_points)
+
+
+def _collect_worker_progress(progress_queue: multiprocessing.Queue) -> int:
+    number_of_points = 0
+    while True:
+        try:
+            number_of_points += progress_queue.get_nowait()
+        except queue.Empty:
+            return number_of_points
@@ -245,16 +245,16 @@ def calculate_segment_COM(body_segment_dataframe: pd.DataFrame, skeleton_coords,
         segment_COM_frame_dict.append(segment_COM_dict)
     return segment_COM_frame_dict
 
-def reformat_segment_COM(segment_COM_frame_dict: list[dict], num_frame_range: range, num_segments: int) -> np.ndarray:
-    segment_COM_frame_imgPoint_XYZ = np.empty([int(len(num_frame_range)), int(num_segments), 3])
+def reformat_segment_COM(segment_COM_frame_dict: list[dict], num_frame_range: range, num_segments: int, dtype: np.dtype = np.float64) -> np.ndarray:
+    segment_COM_frame_imgPoint_XYZ = np.empty([int(len(num_frame_range)), int(num_segments), 3], dtype=dtype)
     for frame in num_frame_range:
         frame_skeleton = segment_COM_frame_dict[frame]
         for joint_count, segment in enumerate(frame_skeleton.keys()):
             segment_COM_frame_imgPoint_XYZ[frame, joint_count, :] = frame_skeleton[segment]
     return segment_COM_frame_imgPoint_XYZ
 
-def calculate_total_body_COM(body_segment_dataframe: pd.DataFrame, segment_COM_frame_dict: list[dict], num_frames_range: range):
-    total_body_COM_frame_XYZ = np.empty([int(len(num_frames_range)), 3])
+def calculate_total_body_COM(body_segment_dataframe: pd.DataFrame, segment_COM_frame_dict: list[dict], num_frames_range: range, dtype: np.dtype = np.float64):
+    total_body_COM_frame_XYZ = np.empty([int(len(num_frames_range)), 3], dtype=dtype)
     for frame in track(num_frames_range, description="Calculating Total Body Center of Mass"):
         frame_total_body_percentages = []
         frame_skeleton = segment_COM_frame_dict[frame]
@@ -278,8 +278,9 @@ def calculate_center_of_mass(pose_data: np.ndarray, skeleton_coords: list, body_
     num_segments = len(body_segment_dataframe)
 
     segment_COM_frame_dict = calculate_segment_COM(body_segment_dataframe, skeleton_coords, num_frames_range)
-    segment_COM_frame_imgPoint_XYZ = reformat_segment_COM(segment_COM_frame_dict, num_frames_range, num_segments)
-    total_body_COM_frame_XYZ = calculate_total_body_COM(body_segment_dataframe, segment_COM_frame_dict, num_frames_range)
+    # the COM arrays are stored in the same dtype as the skeleton they come from
+    segment_COM_frame_imgPoint_XYZ = reformat_segment_COM(segment_COM_frame_dict, num_frames_range, num_segments, dtype=pose_data.dtype)
+    total_body_COM_frame_XYZ = calculate_total_body_COM(body_segment_dataframe, segment_COM_frame_dict, num_frames_range, dtype=pose_data.dtype)
 
     return (
         segment_COM_frame_dict, 
@@ -89,7 +89,7 @@ def process_single_camera_skeleton_data(
     # TODO: project to a plane other than Z. For now just Z
     logger.info("Single camera detected - Altering 3d data to resemble mulit-camera data")
 
-    skeleton_reprojection_error = np.zeros(input_image_data_frame_marker_xyz.shape[0:2])
+    skeleton_reprojection_error = np.zeros(input_image_data_frame_marker_xyz.shape[0:2], dtype=input_image_data_frame_marker_xyz.dtype)
     raw_skel3d = project_3d_data_to_z_plane(skel3d=input_image_data_frame_marker_xyz)
 
     save_mediapipe_3d_data_to_npy(
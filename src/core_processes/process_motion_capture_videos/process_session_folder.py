@@ -7,7 +7,7 @@ import numpy as np
 import pandas as pd
 
 from src.core_processes.capture_volume_calibration.anipose_camera_calibration.load_anipose_calibration import load_anipose_calibration_toml_from_path
-from src.core_processes.capture_volume_calibration.triangulate_3d_data import triangulate_3d_data
+from src.core_processes.capture_volume_calibration.triangulate_3d_data import triangulate_3d_data, triangulate_3d_data_from_npy
 from src.core_processes.post_process_skeleton.center_of_mass import run_center_of_mass_calculations
 from src.core_processes.post_process_skeleton.estimate_skeleton_segment_lengths import (
     estimate_skeleton_segment_lengths,
@@ -20,14 +20,16 @@ from src.core_processes.post_process_skeleton.post_process_skeleton import (
 )
 from src.core_processes.processing_2d.mediapipe.convert_mediapipe_npy_to_csv import convert_mediapipe_npy_to_csv
 from src.core_processes.processing_2d.mediapipe.mediapipe_skeleton_detector import MediapipeSkeletonDetector
+from src.core_processes.processing_2d.mediapipe.render_annotated_videos import render_annotated_videos
 
-from src.core_processes.processing_2d.mediapipe.data_models.mediapipe_skeleton_names_and_connections import mediapipe_names_and_connections_dict
+from src.core_processes.processing_2d.mediapipe.data_models.mediapipe_skeleton_names_and_connections import get_mediapipe_names_and_connections_dict
 
 from src.data_layer.data_saver import DataSaver
 from src.data_layer.session_models.post_processing_parameter_models import PostProcessingParameterModel
 
 from src.system.logging.configure import log_view_format_string
 from src.system.logging.queue_logger import DirectQueueHandler
+from src.utilities.storage_dtype import get_storage_dtype
 
 from src.system.paths_and_filenames.folder_and_filenames import (
     RAW_DATA_FOLDER_NAME,
@@ -62,6 +64,8 @@ def process_session_folder(
         logger.addHandler(handler)
 
     session = session_processing_parameter_model
+    # in blocks, the 3d stage memory maps the 2d data instead of holding all of it
+    use_memory_mapped_3d_stage = session.anipose_triangulate_3d_parameters_model.number_of_frames_per_block is not None
 
     if not Path(session.session_info_model.synchronized_videos_folder_path).exists():
         raise FileNotFoundError(f"Could not find synchronized_videos folder at {session.session_info_model.synchronized_videos_folder_path}")
@@ -70,25 +74,57 @@ def process_session_folder(
     if session.mediapipe_parameters_model.skip_2d_image_tracking:
         logger.info(f"Skipping 2D skeleton detection and loading data from: {session.session_info_model.mediapipe_2d_data_npy_file_path}")
         try:
-            mediapipe_image_data_numCams_numFrames_numTrackedPts_XYZ = np.load(session.session_info_model.mediapipe_2d_data_npy_file_path)
+            mediapipe_image_data_numCams_numFrames_numTrackedPts_XYZ = np.load(
+                session.session_info_model.mediapipe_2d_data_npy_file_path,
+                mmap_mode="r" if use_memory_mapped_3d_stage else None,
+            )
         except Exception as e:
             logger.error(e)
             logger.error("Failed to load 2D data, cannot continue processing", exc_info=True)
             return
     else:
         logger.info("Detecting 2D skeletons")
-        mediapipe_skeleton_detector = MediapipeSkeletonDetector(parameter_model=session.mediapipe_parameters_model, use_tqdm=use_tqdm)
+        mediapipe_skeleton_detector = MediapipeSkeletonDetector(
+            parameter_model=session.mediapipe_parameters_model,
+            use_tqdm=use_tqdm,
+            onnx_pose_parameters_model=session.onnx_pose_parameters_model,
+            storage_dtype=session.storage_dtype,
+        )
 
         mediapipe_image_data_numCams_numFrames_numTrackedPts_XYZ = (
             mediapipe_skeleton_detector.process_folder(
                 video_folder_path=session.session_info_model.synchronized_videos_folder_path,
                 output_data_folder_path=session.session_info_model.output_data_folder_path / RAW_DATA_FOLDER_NAME,
+                kill_event=kill_event,
                 use_multiprocessing=session.mediapipe_parameters_model.use_multiprocessing,
             )
         )
 
     if kill_event is not None and kill_event.is_set():
         return
+
+    if use_memory_mapped_3d_stage and not isinstance(mediapipe_image_data_numCams_numFrames_numTrackedPts_XYZ, np.memmap):
+        # let go of the in-memory 2d data, the detector saved it
+        mediapipe_image_data_numCams_numFrames_numTrackedPts_XYZ = np.load(
+            session.session_info_model.mediapipe_2d_data_npy_file_path, mmap_mode="r"
+        )
+
+    if (
+        session.mediapipe_parameters_model.render_annotated_videos
+        and session.mediapipe_parameters_model.defer_annotated_video_rendering
+        and session.mediapipe_parameters_model.annotated_video_camera_indices is not None
+    ):
+        logger.info("Rendering deferred annotated videos")
+        render_annotated_videos(
+            synchronized_videos_folder_path=session.session_info_model.synchronized_videos_folder_path,
+            mediapipe_2d_data_npy_file_path=session.session_info_model.mediapipe_2d_data_npy_file_path,
+            output_data_folder_path=session.session_info_model.output_data_folder_path / RAW_DATA_FOLDER_NAME,
+            camera_indices=session.mediapipe_parameters_model.annotated_video_camera_indices,
+            landmark_groups=session.mediapipe_parameters_model.annotated_landmark_groups,
+            max_number_of_processes=session.mediapipe_parameters_model.max_number_of_processes,
+            include_hands=session.mediapipe_parameters_model.include_hands,
+            include_face=session.mediapipe_parameters_model.include_face,
+        )
     
     try:
         assert test_image_tracking_data_shape(
@@ -123,17 +159,56 @@ def process_session_folder(
                 save_copy_of_calibration_data_path=session.session_info_model.path
             )
 
-            (
-                raw_skel3d_frame_marker_xyz, 
-                skeleton_reprojection_error_fr_mar
-            ) = triangulate_3d_data(
-                anipose_calibration_object=anipose_calibration_object,
-                mediapipe_2d_data=mediapipe_image_data_numCams_numFrames_numTrackedPts_XYZ[:, :, :, :2],
-                output_data_folder_path=session.session_info_model.raw_data_folder_path,
-                mediapipe_confidence_cutoff_threshold=session.anipose_triangulate_3d_parameters_model.confidence_threshold_cutoff,
-                use_triangulate_ransac=session.anipose_triangulate_3d_parameters_model.use_triangulate_ransac_method,
-                kill_event=kill_event
-            )
+            mediapipe_2d_confidence_npy_file_path = None
+            if session.anipose_triangulate_3d_parameters_model.use_confidence_weighted_triangulation:
+                mediapipe_2d_confidence_npy_file_path = session.session_info_model.mediapipe_2d_confidence_npy_file_path
+                if not mediapipe_2d_confidence_npy_file_path.exists():
+                    logger.warning(
+                        f"No 2d confidence data found at {mediapipe_2d_confidence_npy_file_path} (re-run 2d tracking to make it), "
+                        f"triangulating without confidence weighting"
+                    )
+                    mediapipe_2d_confidence_npy_file_path = None
+
+            if use_memory_mapped_3d_stage:
+                (
+                    raw_skel3d_frame_marker_xyz,
+                    skeleton_reprojection_error_fr_mar
+                ) = triangulate_3d_data_from_npy(
+                    anipose_calibration_object=anipose_calibration_object,
+                    mediapipe_2d_data_npy_file_path=session.session_info_model.mediapipe_2d_data_npy_file_path,
+                    output_data_folder_path=session.session_info_model.raw_data_folder_path,
+                    number_of_frames_per_block=session.anipose_triangulate_3d_parameters_model.number_of_frames_per_block,
+                    use_triangulate_ransac=session.anipose_triangulate_3d_parameters_model.use_triangulate_ransac_method,
+                    kill_event=kill_event,
+                    use_multiprocessing=session.anipose_triangulate_3d_parameters_model.use_multiprocessing,
+                    max_number_of_processes=session.anipose_triangulate_3d_parameters_model.max_number_of_processes,
+                    storage_dtype=session.storage_dtype,
+                    use_reprojection_error_filtering=session.anipose_triangulate_3d_parameters_model.use_reprojection_error_filtering,
+                    reprojection_error_threshold_number_of_mads=session.anipose_triangulate_3d_parameters_model.reprojection_error_threshold_number_of_mads,
+                    reprojection_error_filtering_min_cams=session.anipose_triangulate_3d_parameters_model.reprojection_error_filtering_min_cams,
+                    mediapipe_2d_confidence_npy_file_path=mediapipe_2d_confidence_npy_file_path,
+                    mediapipe_confidence_cutoff_threshold=session.anipose_triangulate_3d_parameters_model.confidence_threshold_cutoff,
+                )
+            else:
+                (
+                    raw_skel3d_frame_marker_xyz,
+                    skeleton_reprojection_error_fr_mar
+                ) = triangulate_3d_data(
+                    anipose_calibration_object=anipose_calibration_object,
+                    mediapipe_2d_data=mediapipe_image_data_numCams_numFrames_numTrackedPts_XYZ[:, :, :, :2],
+                    output_data_folder_path=session.session_info_model.raw_data_folder_path,
+                    mediapipe_confidence_cutoff_threshold=session.anipose_triangulate_3d_parameters_model.confidence_threshold_cutoff,
+                    use_triangulate_ransac=session.anipose_triangulate_3d_parameters_model.use_triangulate_ransac_method,
+                    kill_event=kill_event,
+                    use_multiprocessing=session.anipose_triangulate_3d_parameters_model.use_multiprocessing,
+                    number_of_points_per_chunk=session.anipose_triangulate_3d_parameters_model.number_of_points_per_chunk,
+                    max_number_of_processes=session.anipose_triangulate_3d_parameters_model.max_number_of_processes,
+                    storage_dtype=session.storage_dtype,
+                    use_reprojection_error_filtering=session.anipose_triangulate_3d_parameters_model.use_reprojection_error_filtering,
+                    reprojection_error_threshold_number_of_mads=session.anipose_triangulate_3d_parameters_model.reprojection_error_threshold_number_of_mads,
+                    reprojection_error_filtering_min_cams=session.anipose_triangulate_3d_parameters_model.reprojection_error_filtering_min_cams,
+                    mediapipe_2d_confidence=np.load(mediapipe_2d_confidence_npy_file_path) if mediapipe_2d_confidence_npy_file_path is not None else None,
+                )
 
     if kill_event is not None and kill_event.is_set():
         return
@@ -156,6 +231,9 @@ def process_session_folder(
         raw_skel3d_frame_marker_xyz=rotated_raw_ske3d_frame_marker_xyz,
     )
 
+    # the filtering works in float64, bring the result back to the storage dtype before it is saved and used for COM
+    skel3d_frame_marker_xyz = skel3d_frame_marker_xyz.astype(get_storage_dtype(session.storage_dtype), copy=False)
+
     save_folder_path = session.session_info_model.output_data_folder_path
 
     logger.info("Saving post processed data")
@@ -193,7 +271,9 @@ def process_session_folder(
     logger.info("Reducing 'npy' data and converting to '.csv'...")
     convert_mediapipe_npy_to_csv(
         mediapipe_3d_frame_trackedPoint_xyz=skel3d_frame_marker_xyz,
-        output_data_folder_path=session.session_info_model.output_data_folder_path
+        output_data_folder_path=session.session_info_model.output_data_folder_path,
+        include_hands=session.mediapipe_parameters_model.include_hands,
+        include_face=session.mediapipe_parameters_model.include_face,
     )
 
     path_to_skeleton_body_csv = session.session_info_model.output_data_folder_path / MEDIAPIPE_BODY_3D_DATAFRAME_CSV_FILENAME
@@ -214,11 +294,18 @@ def process_session_folder(
     save_dictionary_to_json(
         save_path=session.session_info_model.output_data_folder_path,
         filename=MEDIAPIPE_NAMES_AND_CONNECTIONS_JSON_FILENAME,
-        dictionary=mediapipe_names_and_connections_dict
+        dictionary=get_mediapipe_names_and_connections_dict(
+            include_hands=session.mediapipe_parameters_model.include_hands,
+            include_face=session.mediapipe_parameters_model.include_face,
+        )
     )
 
     # TODO: Move this method above and deprecate the above methods...
-    DataSaver(session_folder_path=session.session_info_model.path).save_all()
+    DataSaver(
+        session_folder_path=session.session_info_model.path,
+        include_hands=session.mediapipe_parameters_model.include_hands,
+        include_face=session.mediapipe_parameters_model.include_face,
+    ).save_all()
 
     logger.info(f"Done processing {session.session_info_model.path}")
 
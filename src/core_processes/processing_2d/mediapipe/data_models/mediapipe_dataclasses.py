@@ -18,10 +18,43 @@ class Mediapipe2dNumpyArrays:
 
     body_frameNumber_trackedPointNumber_confidence: np.ndarray = None
 
+    # optional contiguous [number_of_frames, number_of_markers, XYZ] buffer that the body/hand/face arrays are views into
+    data2d_frameNumber_trackedPointNumber_XYZ: np.ndarray = None
+
     @property
     def has_data(self):
         return not np.isnan(self.body_frameNumber_trackedPointNumber_XYZ).all()
 
+    @property
+    def all_body_tracked_points_visible_on_frame(self) -> np.ndarray:
+        return self._all_points_visible_on_frame(self.body_frameNumber_trackedPointNumber_XYZ)
+
+    @property
+    def all_right_hand_points_visible_on_frame(self) -> np.ndarray:
+        return self._all_points_visible_on_frame(self.rightHand_frameNumber_trackedPointNumber_XYZ)
+
+    @property
+    def all_left_hand_points_visible_on_frame(self) -> np.ndarray:
+        return self._all_points_visible_on_frame(self.leftHand_frameNumber_trackedPointNumber_XYZ)
+
+    @property
+    def all_face_points_visible_on_frame(self) -> np.ndarray:
+        return self._all_points_visible_on_frame(self.face_frameNumber_trackedPointNumber_XYZ)
+
+    @property
+    def all_tracked_points_visible_on_frame(self) -> np.ndarray:
+        return (
+            self.all_body_tracked_points_visible_on_frame
+            & self.all_right_hand_points_visible_on_frame
+            & self.all_left_hand_points_visible_on_frame
+            & self.all_face_points_visible_on_frame
+        )
+
+    @staticmethod
+    def _all_points_visible_on_frame(frameNumber_trackedPointNumber_XYZ: np.ndarray) -> np.ndarray:
+        """boolean array with one value per frame, True if none of the tracked points are NaN on that frame"""
+        return ~np.isnan(frameNumber_trackedPointNumber_XYZ).any(axis=(-2, -1))
+
     @property
     def all_data2d_nFrames_nTrackedPts_XY(self):
         """dimensions will be [number_of_frames , number_of_markers, XY]"""
@@ -30,6 +63,10 @@ class Mediapipe2dNumpyArrays:
             # if there's no body data, there's no hand or face data either
             return
 
+        if self.data2d_frameNumber_trackedPointNumber_XYZ is not None:
+            # already laid out as [body, right hand, left hand, face], no need to stack a copy
+            return self.data2d_frameNumber_trackedPointNumber_XYZ
+
         if len(self.body_frameNumber_trackedPointNumber_XYZ.shape) == 3:  # multiple frames
             return np.hstack(
                 [
@@ -1,4 +1,7 @@
+from typing import Dict, List, Optional
+
 from mediapipe.python.solutions import holistic as mp_holistic
+from mediapipe.python.solutions.face_mesh import FACEMESH_NUM_LANDMARKS, FACEMESH_NUM_LANDMARKS_WITH_IRISES
 
 
 mediapipe_body_connections = [connection for connection in mp_holistic.POSE_CONNECTIONS]
@@ -12,6 +15,13 @@ mediapipe_body_landmark_names = [landmark.name.lower() for landmark in mp_holist
 NUMBER_OF_MEDIAPIPE_BODY_MARKERS = len(mediapipe_body_landmark_names)
 
 mediapipe_hand_landmark_names = [landmark.name.lower() for landmark in mp_holistic.HandLandmark]
+NUMBER_OF_MEDIAPIPE_HAND_MARKERS = len(mediapipe_hand_landmark_names)
+
+# the face mesh has 468 points, or 478 when mediapipe also refines the irises
+NUMBER_OF_MEDIAPIPE_FACE_MARKERS = FACEMESH_NUM_LANDMARKS_WITH_IRISES
+
+# in the order they sit along the tracked point axis of the 2d and 3d data
+MEDIAPIPE_LANDMARK_GROUPS = ["body", "right_hand", "left_hand", "face"]
 
 
 mediapipe_face_landmark_names = [
@@ -90,4 +100,58 @@ mediapipe_skeleton_schema = {
         "connections": mediapipe_face_connections,
         "parent": "nose",
     },
-}
\ No newline at end of file
+}
+
+
+def get_mediapipe_landmark_groups(include_hands: bool = True, include_face: bool = True) -> List[str]:
+    """The landmark groups that are tracked and stored, body always included"""
+    return [
+        landmark_group
+        for landmark_group in MEDIAPIPE_LANDMARK_GROUPS
+        if (landmark_group != "face" or include_face) and (landmark_group not in ["right_hand", "left_hand"] or include_hands)
+    ]
+
+
+def get_mediapipe_landmark_group_slices(
+    include_hands: bool = True,
+    include_face: bool = True,
+    number_of_tracked_points: Optional[int] = None,
+) -> Dict[str, slice]:
+    """
+    Where each tracked landmark group sits along the tracked point axis. Groups that weren't tracked aren't stored at
+    all, so the data only has the groups it was made with. If `number_of_tracked_points` is given the face takes up
+    whatever follows the hands, and a point count that doesn't fit the groups raises a ValueError
+    """
+    landmark_group_sizes = {
+        "body": NUMBER_OF_MEDIAPIPE_BODY_MARKERS,
+        "right_hand": NUMBER_OF_MEDIAPIPE_HAND_MARKERS,
+        "left_hand": NUMBER_OF_MEDIAPIPE_HAND_MARKERS,
+        "face": NUMBER_OF_MEDIAPIPE_FACE_MARKERS,
+    }
+
+    landmark_group_slices = {}
+    first_index = 0
+    for landmark_group in get_mediapipe_landmark_groups(include_hands=include_hands, include_face=include_face):
+        last_index = first_index + landmark_group_sizes[landmark_group]
+        if landmark_group == "face" and number_of_tracked_points is not None:
+            last_index = number_of_tracked_points
+        landmark_group_slices[landmark_group] = slice(first_index, last_index)
+        first_index = last_index
+
+    number_of_face_points = landmark_group_slices["face"].stop - landmark_group_slices["face"].start if include_face else None
+    if number_of_tracked_points is not None and (
+        first_index != number_of_tracked_points
+        or number_of_face_points not in [None, FACEMESH_NUM_LANDMARKS, FACEMESH_NUM_LANDMARKS_WITH_IRISES]
+    ):
+        raise ValueError(
+            f"Data with {number_of_tracked_points} tracked points doesn't match the landmark groups "
+            f"{list(landmark_group_slices.keys())}, check `include_hands` and `include_face`"
+        )
+    return landmark_group_slices
+
+
+def get_mediapipe_names_and_connections_dict(include_hands: bool = True, include_face: bool = True) -> dict:
+    return {
+        landmark_group: mediapipe_names_and_connections_dict[landmark_group]
+        for landmark_group in get_mediapipe_landmark_groups(include_hands=include_hands, include_face=include_face)
+    }
@@ -0,0 +1,202 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import itertools
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+import numpy as np
+
+# put on a queue to tell the stage reading from it that there are no more frames coming
+_END_OF_STREAM = object()
+
+
+@dataclass
+class PipelineStageStats:
+    name: str
+    number_of_frames: int = 0
+    busy_seconds: float = 0.0
+    input_queue_occupancy_sum: int = 0
+    input_queue_occupancy_max: int = 0
+
+    def record(self, busy_seconds: float, input_queue_occupancy: Optional[int] = None, number_of_frames: int = 1):
+        self.number_of_frames += number_of_frames
+        self.busy_seconds += busy_seconds
+        if input_queue_occupancy is not None:
+            self.input_queue_occupancy_sum += input_queue_occupancy
+            self.input_queue_occupancy_max = max(self.input_queue_occupancy_max, input_queue_occupancy)
+
+    def summary(self, queue_depth: int) -> str:
+        frames_per_second = self.number_of_frames / self.busy_seconds if self.busy_seconds > 0 else float("nan")
+        summary = f"{self.name}: {self.number_of_frames} frames, {self.busy_seconds:.2f}s busy ({frames_per_second:.1f} fps)"
+        if self.number_of_frames > 0 and self.name != "decode":
+            mean_occupancy = self.input_queue_occupancy_sum / self.number_of_frames
+            summary += f", input queue mean {mean_occupancy:.1f}/{queue_depth} max {self.input_queue_occupancy_max}/{queue_depth}"
+        return summary
+
+
+@dataclass
+class SkeletonDetectionStageTimings:
+    """
+    Seconds spent in each stage of 2d skeleton detection, summed over every frame (and every worker, so with threads
+    or processes running side by side these are busy times, not a split of the wall clock). Each stage is only ever
+    added to from one thread, so the threaded pipeline can share one of these between its stages
+    """
+
+    decode_seconds: float = 0.0
+    inference_seconds: float = 0.0
+    convert_seconds: float = 0.0
+    annotate_seconds: float = 0.0
+    encode_seconds: float = 0.0
+
+    def add(self, other: "SkeletonDetectionStageTimings"):
+        for stage_name, seconds in asdict(other).items():
+            setattr(self, stage_name, getattr(self, stage_name) + seconds)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def run_threaded_frame_pipeline(
+    read_frame: Callable[[], np.ndarray],
+    process_frames: Callable[[List[int], List[np.ndarray]], List[Any]],
+    write_frame: Optional[Callable[[np.ndarray, Any], None]],
+    frame_numbers: Iterable[int],
+    queue_depth: int = 8,
+    kill_event: threading.Event = None,
+    name: str = "",
+    batch_size: int = 1,
+):
+    """
+    Runs a decode -> inference -> annotate/encode pipeline for one video. `read_frame` runs on a decoder thread and
+    `write_frame(image, results)` on an encoder thread, while `process_frames(frame_numbers, images)` runs on the calling
+    thread (so the model stays on the thread that created it) with up to `batch_size` consecutive frames at a time,
+    returning one result per frame. The stages are joined by queues holding at most `queue_depth` frames (at least
+    one batch), so decoding and encoding overlap with inference without buffering the whole video.
+    Logs each stage's throughput and how full its input queue was. If `write_frame` is None there is no encoder stage.
+    """
+    batch_size = max(1, batch_size)
+    queue_depth = max(queue_depth, batch_size)
+    decoded_frame_queue = queue.Queue(maxsize=queue_depth)
+    processed_frame_queue = queue.Queue(maxsize=queue_depth)
+    # set when a stage fails or the kill event fires, every stage then drops what it has and exits
+    abort_event = threading.Event()
+    frame_numbers = frame_numbers if hasattr(frame_numbers, "__len__") else list(frame_numbers)
+    number_of_frames = len(frame_numbers)
+
+    decode_stats = PipelineStageStats(name="decode")
+    inference_stats = PipelineStageStats(name="inference")
+    encode_stats = PipelineStageStats(name="encode")
+    stage_exceptions = []
+
+    def decode():
+        try:
+            for _ in range(number_of_frames):
+                tic = time.perf_counter()
+                image = read_frame()
+                decode_stats.record(time.perf_counter() - tic)
+                if not _put_unless_aborted(decoded_frame_queue, image, abort_event):
+                    return
+            _put_unless_aborted(decoded_frame_queue, _END_OF_STREAM, abort_event)
+        except Exception as e:
+            stage_exceptions.append(e)
+            abort_event.set()
+
+    def encode():
+        try:
+            while True:
+                input_queue_occupancy = processed_frame_queue.qsize()
+                item = _get_unless_aborted(processed_frame_queue, abort_event)
+                if item is _END_OF_STREAM:
+                    return
+                image, results = item
+                tic = time.perf_counter()
+                write_frame(image, results)
+                encode_stats.record(time.perf_counter() - tic, input_queue_occupancy)
+        except Exception as e:
+            stage_exceptions.append(e)
+            abort_event.set()
+
+    decoder_thread = threading.Thread(target=decode, name=f"{name}_decoder", daemon=True)
+    encoder_thread = threading.Thread(target=encode, name=f"{name}_encoder", daemon=True)
+    decoder_thread.start()
+    if write_frame is not None:
+        encoder_thread.start()
+
+    try:
+        end_of_stream = False
+        # iterated rather than sliced, `frame_numbers` may be a progress bar
+        frame_number_iterator = iter(frame_numbers)
+        while not end_of_stream:
+            if kill_event is not None and kill_event.is_set():
+                logger.info(f"Kill event set, stopping frame pipeline for {name}")
+                abort_event.set()
+                break
+
+            input_queue_occupancy = decoded_frame_queue.qsize()
+            batch_frame_numbers = list(itertools.islice(frame_number_iterator, batch_size))
+            batch_images = []
+            for _ in batch_frame_numbers:
+                image = _get_unless_aborted(decoded_frame_queue, abort_event)
+                if image is _END_OF_STREAM:
+                    end_of_stream = True
+                    break
+                batch_images.append(image)
+            batch_frame_numbers = batch_frame_numbers[: len(batch_images)]
+            if len(batch_images) == 0:
+                break
+
+            tic = time.perf_counter()
+            batch_results = process_frames(batch_frame_numbers, batch_images)
+            inference_stats.record(time.perf_counter() - tic, input_queue_occupancy, number_of_frames=len(batch_images))
+
+            if write_frame is not None and not all(
+                _put_unless_aborted(processed_frame_queue, (image, results), abort_event)
+                for image, results in zip(batch_images, batch_results)
+            ):
+                break
+        if write_frame is not None:
+            _put_unless_aborted(processed_frame_queue, _END_OF_STREAM, abort_event)
+    except Exception as e:
+        stage_exceptions.append(e)
+        abort_event.set()
+    finally:
+        decoder_thread.join()
+        if write_frame is not None:
+            encoder_thread.join()
+
+    logger.info(
+        f"Frame pipeline stats for {name} - "
+        + "; ".join(
+            stats.summary(queue_depth)
+            for stats in [decode_stats, inference_stats, encode_stats]
+            if stats is not encode_stats or write_frame is not None
+        )
+    )
+
+    if stage_exceptions:
+        raise stage_exceptions[0]
+
+
+def _put_unless_aborted(frame_queue: queue.Queue, item, abort_event: threading.Event) -> bool:
+    """Blocking put that gives up once `abort_event` is set. Returns whether the item was queued"""
+    while not abort_event.is_set():
+        try:
+            frame_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get_unless_aborted(frame_queue: queue.Queue, abort_event: threading.Event):
+    """Blocking get that returns the end of stream marker once `abort_event` is set"""
+    while not abort_event.is_set():
+        try:
+            return frame_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END_OF_STREAM
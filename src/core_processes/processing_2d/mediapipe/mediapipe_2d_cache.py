@@ -0,0 +1,118 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from src.data_layer.session_models.post_processing_parameter_models import MediapipeParametersModel, OnnxPoseParametersModel
+
+VIDEO_FINGERPRINT_NUMBER_OF_BLOCKS = 16
+VIDEO_FINGERPRINT_BLOCK_SIZE = 64 * 1024
+
+# the MediapipeParametersModel fields that change what skeleton detection writes to the 2d data
+DETECTION_PARAMETER_NAMES = [
+    "mediapipe_model_complexity",
+    "min_detection_confidence",
+    "min_tracking_confidence",
+    "static_image_mode",
+    "landmark_confidence_threshold",
+    "include_hands",
+    "include_face",
+    "detector_backend",
+    "frame_stride",
+    "interpolate_skipped_frames",
+    "regions_of_interest",
+    "inference_downscale_factor",
+]
+
+CACHED_ARRAY_NAMES = ["data2d", "body_world", "body_confidence"]
+
+
+def compute_video_fingerprint(video_file_path: Union[str, Path]) -> str:
+    """
+    A fast content hash of a video: its size plus evenly spaced blocks from start to end, so multi gigabyte
+    recordings don't have to be read in full. Any re-encode, trim or re-sync changes the size or the sampled bytes
+    """
+    video_file_path = Path(video_file_path)
+    file_size = video_file_path.stat().st_size
+    fingerprint = hashlib.blake2b(digest_size=16)
+    fingerprint.update(str(file_size).encode())
+
+    block_offsets = np.linspace(0, max(file_size - VIDEO_FINGERPRINT_BLOCK_SIZE, 0), VIDEO_FINGERPRINT_NUMBER_OF_BLOCKS)
+    with open(video_file_path, "rb") as video_file:
+        for block_offset in np.unique(block_offsets.astype(np.int64)):
+            video_file.seek(int(block_offset))
+            fingerprint.update(video_file.read(VIDEO_FINGERPRINT_BLOCK_SIZE))
+
+    return fingerprint.hexdigest()
+
+
+def compute_detection_parameters_fingerprint(
+    parameter_model: MediapipeParametersModel,
+    onnx_pose_parameters_model: Optional[OnnxPoseParametersModel] = None,
+    storage_dtype: Union[str, np.dtype] = "float64",
+) -> str:
+    parameters = {name: getattr(parameter_model, name) for name in DETECTION_PARAMETER_NAMES}
+    # cached arrays and checkpoint buffers are served as stored, so a float32 run must not pick up float64 results
+    parameters["storage_dtype"] = np.dtype(storage_dtype).name
+    if parameter_model.detector_backend == "onnx" and onnx_pose_parameters_model is not None:
+        parameters["onnx_pose_parameters"] = onnx_pose_parameters_model.model_dump()
+        # a retrained model saved over the old one must not hit the old model's cache
+        if onnx_pose_parameters_model.model_path is not None and Path(onnx_pose_parameters_model.model_path).is_file():
+            parameters["onnx_model_fingerprint"] = compute_video_fingerprint(onnx_pose_parameters_model.model_path)
+    return hashlib.blake2b(json.dumps(parameters, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+class Mediapipe2dDetectionCache:
+    """
+    Per camera cache of 2d skeleton detection results, keyed on the video's content fingerprint, the detection
+    parameters and the storage dtype, so re-processing a session only re-runs detection on cameras whose video or
+    parameters changed
+    """
+
+    def __init__(
+        self,
+        cache_folder_path: Union[str, Path],
+        parameter_model: MediapipeParametersModel,
+        onnx_pose_parameters_model: Optional[OnnxPoseParametersModel] = None,
+        storage_dtype: Union[str, np.dtype] = "float64",
+    ):
+        self._cache_folder_path = Path(cache_folder_path)
+        self._parameters_fingerprint = compute_detection_parameters_fingerprint(
+            parameter_model=parameter_model,
+            onnx_pose_parameters_model=onnx_pose_parameters_model,
+            storage_dtype=storage_dtype,
+        )
+
+    def get_cache_key(self, video_file_path: Union[str, Path]) -> str:
+        return hashlib.blake2b(
+            (compute_video_fingerprint(video_file_path) + self._parameters_fingerprint).encode(),
+            digest_size=16,
+        ).hexdigest()
+
+    def load(self, cache_key: str) -> Optional[Dict[str, np.ndarray]]:
+        array_paths = self._get_array_paths(cache_key)
+        if not all(array_path.exists() for array_path in array_paths.values()):
+            return None
+
+        try:
+            # memory mapped, the output arrays copy the data out of the cache files exactly once
+            return {array_name: np.load(str(array_path), mmap_mode="r") for array_name, array_path in array_paths.items()}
+        except Exception as e:
+            logger.warning(f"Failed to load cached 2d data {cache_key}, it will be re-detected: {e}")
+            return None
+
+    def save(self, cache_key: str, arrays: Dict[str, np.ndarray]):
+        self._cache_folder_path.mkdir(exist_ok=True, parents=True)
+        for array_name, array_path in self._get_array_paths(cache_key).items():
+            # write then rename so an interrupted save never looks like a cache hit
+            temporary_array_path = array_path.with_suffix(".tmp.npy")
+            np.save(str(temporary_array_path), arrays[array_name])
+            temporary_array_path.replace(array_path)
+
+    def _get_array_paths(self, cache_key: str) -> Dict[str, Path]:
+        return {array_name: self._cache_folder_path / f"{cache_key}_{array_name}.npy" for array_name in CACHED_ARRAY_NAMES}
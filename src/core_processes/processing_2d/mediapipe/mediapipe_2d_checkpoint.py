@@ -0,0 +1,148 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+CHECKPOINT_METADATA_FILENAME = "checkpoint.json"
+FRAME_RANGE_PROGRESS_FILENAME_PREFIX = "frames_"
+
+
+class Mediapipe2dDetectionCheckpoint:
+    """
+    On-disk progress of 2d skeleton detection for one camera. The landmark buffers are `.npy` memmaps that the
+    detection writes into directly, and every frame range being processed keeps a small json file recording how far
+    into the range the buffers have been flushed. A restarted run re-opens the same buffers and only processes
+    what is missing.
+
+    The checkpoint folder is named after the camera's cache key (video fingerprint + detection parameters), and
+    `create_or_resume` discards any checkpoint for the same video that was made with a different key
+    """
+
+    def __init__(self, checkpoint_folder_path: Union[str, Path]):
+        self._checkpoint_folder_path = Path(checkpoint_folder_path)
+        self._is_resumed = False
+
+    @property
+    def checkpoint_folder_path(self) -> Path:
+        return self._checkpoint_folder_path
+
+    @property
+    def is_resumed(self) -> bool:
+        """Whether some frames were already done by an earlier run"""
+        return self._is_resumed
+
+    @classmethod
+    def create_or_resume(
+        cls,
+        checkpoints_folder_path: Union[str, Path],
+        cache_key: str,
+        video_file_path: Union[str, Path],
+        buffer_shapes: Dict[str, Tuple[int, ...]],
+        buffer_dtype: np.dtype = np.float64,
+    ) -> "Mediapipe2dDetectionCheckpoint":
+        checkpoints_folder_path = Path(checkpoints_folder_path)
+        video_name = Path(video_file_path).name
+        metadata = {
+            "cache_key": cache_key,
+            "video_name": video_name,
+            "buffer_shapes": {buffer_name: list(buffer_shape) for buffer_name, buffer_shape in buffer_shapes.items()},
+            "buffer_dtype": np.dtype(buffer_dtype).name,
+        }
+
+        cls._discard_stale_checkpoints(checkpoints_folder_path, video_name=video_name, cache_key=cache_key)
+
+        checkpoint = cls(checkpoints_folder_path / cache_key)
+        if checkpoint._read_metadata() == metadata and all(path.exists() for path in checkpoint._get_buffer_paths(buffer_shapes).values()):
+            completed_frames = sum(end - start for start, end in checkpoint.get_completed_frame_ranges())
+            if completed_frames > 0:
+                logger.info(f"Resuming 2d skeleton detection on {video_name} from checkpoint ({completed_frames} frames already done)")
+                checkpoint._is_resumed = True
+            return checkpoint
+
+        if checkpoint.checkpoint_folder_path.exists():
+            logger.warning(f"Checkpoint for {video_name} doesn't match the current buffers, starting over")
+            checkpoint.remove()
+
+        checkpoint.checkpoint_folder_path.mkdir(parents=True)
+        for buffer_name, buffer_path in checkpoint._get_buffer_paths(buffer_shapes).items():
+            buffer = np.lib.format.open_memmap(str(buffer_path), mode="w+", dtype=buffer_dtype, shape=buffer_shapes[buffer_name])
+            buffer[:] = np.nan
+            buffer.flush()
+            del buffer
+        # metadata goes last so a half created checkpoint is never resumed
+        (checkpoint.checkpoint_folder_path / CHECKPOINT_METADATA_FILENAME).write_text(json.dumps(metadata, indent=4))
+        return checkpoint
+
+    def open_buffers(self) -> Dict[str, np.memmap]:
+        metadata = self._read_metadata()
+        return {
+            buffer_name: np.load(str(buffer_path), mmap_mode="r+")
+            for buffer_name, buffer_path in self._get_buffer_paths(metadata["buffer_shapes"]).items()
+        }
+
+    def record_progress(self, start_frame: int, end_frame: int, completed_until_frame: int):
+        """Call only after the buffers for frames `start_frame` to `completed_until_frame` have been flushed"""
+        progress_path = self._checkpoint_folder_path / f"{FRAME_RANGE_PROGRESS_FILENAME_PREFIX}{start_frame:08d}_{end_frame:08d}.json"
+        temporary_progress_path = progress_path.with_suffix(".tmp")
+        temporary_progress_path.write_text(
+            json.dumps({"start_frame": start_frame, "end_frame": end_frame, "completed_until_frame": completed_until_frame})
+        )
+        temporary_progress_path.replace(progress_path)
+
+    def get_completed_frame_ranges(self) -> List[Tuple[int, int]]:
+        completed_frame_ranges = []
+        for progress_path in self._checkpoint_folder_path.glob(f"{FRAME_RANGE_PROGRESS_FILENAME_PREFIX}*.json"):
+            progress = json.loads(progress_path.read_text())
+            if progress["completed_until_frame"] > progress["start_frame"]:
+                completed_frame_ranges.append((progress["start_frame"], progress["completed_until_frame"]))
+        return _merge_frame_ranges(completed_frame_ranges)
+
+    def get_remaining_frame_ranges(self, number_of_frames: int) -> List[Tuple[int, int]]:
+        remaining_frame_ranges = []
+        next_frame = 0
+        for start_frame, end_frame in self.get_completed_frame_ranges():
+            if start_frame > next_frame:
+                remaining_frame_ranges.append((next_frame, min(start_frame, number_of_frames)))
+            next_frame = max(next_frame, end_frame)
+        if next_frame < number_of_frames:
+            remaining_frame_ranges.append((next_frame, number_of_frames))
+        return remaining_frame_ranges
+
+    def remove(self):
+        shutil.rmtree(self._checkpoint_folder_path, ignore_errors=True)
+
+    def _read_metadata(self) -> dict:
+        metadata_path = self._checkpoint_folder_path / CHECKPOINT_METADATA_FILENAME
+        if not metadata_path.exists():
+            return {}
+        return json.loads(metadata_path.read_text())
+
+    def _get_buffer_paths(self, buffer_shapes: Dict) -> Dict[str, Path]:
+        return {buffer_name: self._checkpoint_folder_path / f"{buffer_name}.npy" for buffer_name in buffer_shapes}
+
+    @classmethod
+    def _discard_stale_checkpoints(cls, checkpoints_folder_path: Path, video_name: str, cache_key: str):
+        if not checkpoints_folder_path.exists():
+            return
+        for checkpoint_folder_path in checkpoints_folder_path.iterdir():
+            if checkpoint_folder_path.name == cache_key or not checkpoint_folder_path.is_dir():
+                continue
+            checkpoint = cls(checkpoint_folder_path)
+            if checkpoint._read_metadata().get("video_name") == video_name:
+                logger.info(f"Video or detection parameters for {video_name} changed since its last checkpoint, discarding it")
+                checkpoint.remove()
+
+
+def _merge_frame_ranges(frame_ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged_frame_ranges = []
+    for start_frame, end_frame in sorted(frame_ranges):
+        if merged_frame_ranges and start_frame <= merged_frame_ranges[-1][1]:
+            merged_frame_ranges[-1] = (merged_frame_ranges[-1][0], max(merged_frame_ranges[-1][1], end_frame))
+        else:
+            merged_frame_ranges.append((start_frame, end_frame))
+    return merged_frame_ranges
@@ -0,0 +1,152 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import itertools
+from typing import Dict, Optional, Sequence
+
+import mediapipe as mp
+import numpy as np
+
+from src.core_processes.processing_2d.pose_estimator import PoseEstimator, PoseEstimatorResults
+from src.data_layer.session_models.post_processing_parameter_models import MediapipeParametersModel
+
+mp_holistic = mp.solutions.holistic
+mp_pose = mp.solutions.pose
+
+# a serialized `NormalizedLandmarkList` is a run of length-delimited records (protobuf tag 0x0A), one per landmark,
+# each holding the 32 bit float fields x (tag 0x0D), y (tag 0x15), z (tag 0x1D) and visibility (tag 0x25) in order
+LANDMARK_RECORD_TAG = 0x0A
+LANDMARK_FIELD_TAGS = np.array([0x0D, 0x15, 0x1D, 0x25], dtype=np.uint8)
+
+# where each landmark group lives on holistic's (and pose's) results
+mediapipe_results_landmark_attribute_names = {
+    "body": "pose_landmarks",
+    "right_hand": "right_hand_landmarks",
+    "left_hand": "left_hand_landmarks",
+    "face": "face_landmarks",
+}
+
+
+class MediapipePoseEstimator(PoseEstimator):
+    """
+    Mediapipe Holistic, or just mediapipe Pose when neither the hands nor the face are tracked (it skips holistic's
+    hand and face models entirely). Mediapipe tracks from one frame to the next, so a batch is run one image at a time
+    """
+
+    name = "mediapipe"
+
+    def __init__(self, parameter_model: MediapipeParametersModel, landmark_group_slices: Dict[str, slice]):
+        super().__init__(landmark_group_slices=landmark_group_slices)
+        if "right_hand" in landmark_group_slices or "face" in landmark_group_slices:
+            self._tracker = mp_holistic.Holistic(
+                model_complexity=parameter_model.mediapipe_model_complexity,
+                min_detection_confidence=parameter_model.min_detection_confidence,
+                min_tracking_confidence=parameter_model.min_tracking_confidence,
+            )
+        else:
+            self._tracker = mp_pose.Pose(
+                model_complexity=parameter_model.mediapipe_model_complexity,
+                min_detection_confidence=parameter_model.min_detection_confidence,
+                min_tracking_confidence=parameter_model.min_tracking_confidence,
+            )
+
+    def detect(self, images: Sequence[np.ndarray]) -> PoseEstimatorResults:
+        mediapipe_results_list = [self._tracker.process(image) for image in images]
+        pose_estimator_results = mediapipe_results_to_pose_estimator_results(
+            mediapipe_results_list=mediapipe_results_list,
+            pose_estimator_results=self._empty_results(batch_size=len(images)),
+            landmark_group_slices=self._landmark_group_slices,
+        )
+        pose_estimator_results.raw_results = mediapipe_results_list
+        return pose_estimator_results
+
+    def close(self):
+        self._tracker.close()
+
+
+def mediapipe_results_to_pose_estimator_results(
+    mediapipe_results_list: list,
+    pose_estimator_results: PoseEstimatorResults,
+    landmark_group_slices: Dict[str, slice],
+) -> PoseEstimatorResults:
+    """Fills NaN initialized `pose_estimator_results` from one holistic or pose result per image"""
+    for batch_index, frame_results in enumerate(mediapipe_results_list):
+        # mediapipe calls their 'confidence' score 'visibility'
+        if frame_results.pose_landmarks is not None:
+            body_XYZ_visibility = mediapipe_landmarks_to_npy(frame_results.pose_landmarks, include_visibility=True)
+            pose_estimator_results.body_confidences[batch_index] = body_XYZ_visibility[:, 3]
+            if frame_results.pose_world_landmarks is not None:
+                if pose_estimator_results.body_world_XYZ is None:
+                    pose_estimator_results.body_world_XYZ = np.full(
+                        (pose_estimator_results.batch_size, *pose_estimator_results.body_confidences.shape[1:], 3), np.nan
+                    )
+                pose_estimator_results.body_world_XYZ[batch_index] = mediapipe_landmarks_to_npy(frame_results.pose_world_landmarks)
+
+        # groups that aren't tracked aren't in the slices (and pose's results have no hand or face landmarks)
+        for landmark_group, landmark_group_slice in landmark_group_slices.items():
+            landmark_list = getattr(frame_results, mediapipe_results_landmark_attribute_names[landmark_group], None)
+            if landmark_list is None:
+                continue
+            if landmark_group == "body":
+                landmarks_XYZ = body_XYZ_visibility[:, :3]
+            else:
+                landmarks_XYZ = mediapipe_landmarks_to_npy(landmark_list)
+            # holistic's face has 468 points unless the irises are refined, the remaining points stay NaN
+            first_index = landmark_group_slice.start
+            pose_estimator_results.landmarks_XYZ[batch_index, first_index : first_index + landmarks_XYZ.shape[0]] = landmarks_XYZ
+
+    return pose_estimator_results
+
+
+def mediapipe_landmarks_to_npy(landmark_list, include_visibility: bool = False) -> np.ndarray:
+    """
+    Pulls x, y, z (and optionally visibility) out of a mediapipe landmark list as a [number_of_landmarks, 3 or 4] array.
+    Every landmark serializes to the same fixed-size record of float fields, so the whole list is decoded with one
+    `np.frombuffer` instead of touching each landmark from python. Falls back to reading the landmarks one at a time
+    if the records aren't laid out the way we expect
+    """
+    number_of_fields = 4 if include_visibility else 3
+    if len(landmark_list.landmark) == 0:
+        return np.empty((0, number_of_fields))
+
+    landmarks = _decode_serialized_landmarks(landmark_list, number_of_fields)
+    if landmarks is None:
+        landmarks = _read_landmarks_one_at_a_time(landmark_list, number_of_fields)
+    return landmarks
+
+
+def _decode_serialized_landmarks(landmark_list, number_of_fields: int) -> Optional[np.ndarray]:
+    """
+    Decodes the first `number_of_fields` float fields of every landmark straight from the serialized list, or returns
+    None if any record isn't a fixed-size run of those fields in order (e.g. a field was never set)
+    """
+    number_of_landmarks = len(landmark_list.landmark)
+    serialized_landmarks = np.frombuffer(landmark_list.SerializeToString(), dtype=np.uint8)
+    record_length = serialized_landmarks.size // number_of_landmarks
+    if serialized_landmarks.size != record_length * number_of_landmarks or record_length < 2 + 5 * number_of_fields:
+        return None
+
+    # each record is its tag and length byte, then a tag byte and 4 little endian float bytes per field
+    records = serialized_landmarks.reshape(number_of_landmarks, record_length)
+    field_tag_offsets = [2 + 5 * field_number for field_number in range(number_of_fields)]
+    if not (
+        np.all(records[:, 0] == LANDMARK_RECORD_TAG)
+        and np.all(records[:, 1] == record_length - 2)
+        and np.all(records[:, field_tag_offsets] == LANDMARK_FIELD_TAGS[:number_of_fields])
+    ):
+        return None
+
+    field_byte_offsets = [offset + 1 + byte for offset in field_tag_offsets for byte in range(4)]
+    return np.ascontiguousarray(records[:, field_byte_offsets]).view("<f4").astype(np.float64)
+
+
+def _read_landmarks_one_at_a_time(landmark_list, number_of_fields: int) -> np.ndarray:
+    number_of_landmarks = len(landmark_list.landmark)
+    fields = ("x", "y", "z", "visibility")[:number_of_fields]
+    return np.fromiter(
+        itertools.chain.from_iterable(
+            [getattr(landmark, field) for field in fields] for landmark in landmark_list.landmark
+        ),
+        dtype=np.float64,
+        count=number_of_landmarks * number_of_fields,
+    ).reshape(number_of_landmarks, number_of_fields)
@@ -0,0 +1,225 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.frame_pipeline import SkeletonDetectionStageTimings
+from src.core_processes.processing_2d.mediapipe.mediapipe_2d_checkpoint import Mediapipe2dDetectionCheckpoint
+from src.utilities.number_of_processes import get_number_of_processes
+from src.utilities.shared_memory import SharedNumpyArray
+
+PROGRESS_REPORTS_PER_VIDEO = 20
+
+# set in each worker process by `_initialize_worker`
+_worker_stop_event = None
+_worker_progress_queue = None
+
+
+@dataclass
+class SkeletonDetectionTask:
+    camera_index: int
+    video_file_path: Path
+    number_of_frames: int
+    start_frame: int = 0
+    end_frame: Optional[int] = None
+    chunk_index: Optional[int] = None
+    warmup_frames: int = 0
+    render_annotated_video: bool = True
+    checkpoint_folder_path: Optional[Path] = None
+    # the camera's full length `.npy` buffers to write into, when landmarks are streamed to disk without checkpoints
+    buffer_file_paths: Optional[Dict[str, Path]] = None
+
+    @property
+    def name(self) -> str:
+        if self.chunk_index is None:
+            return f"Camera {self.camera_index} ({self.video_file_path.name})"
+        return f"Camera {self.camera_index} ({self.video_file_path.name}) chunk {self.chunk_index}"
+
+
+def run_skeleton_detection_process_pool(
+    skeleton_detector,
+    tasks: List[SkeletonDetectionTask],
+    output_data_folder_path: Path,
+    shared_array_descriptors: Optional[Tuple],
+    max_number_of_processes: Optional[int] = None,
+    kill_event: multiprocessing.Event = None,
+    stage_timings: Optional[SkeletonDetectionStageTimings] = None,
+) -> bool:
+    """
+    Runs `skeleton_detector.process_video` for each task in its own worker process, each with its own mediapipe model.
+    Workers write their landmarks straight into the shared memory arrays described by `shared_array_descriptors`
+    (data2d, body_world, body_confidence - each indexed by camera, then frame) at their task's frame range, and report
+    their progress back here. Tasks with a `checkpoint_folder_path` write into that checkpoint's buffers instead, and
+    tasks with `buffer_file_paths` into those `.npy` files.
+    Each finished task's stage timings are added to `stage_timings`, if given.
+
+    Returns True if every task finished, False if processing was stopped by the kill event
+    """
+    # forking a process that has already run mediapipe (and its threads) can corrupt the child's heap, so always spawn
+    mp_context = multiprocessing.get_context("spawn")
+    stop_event = mp_context.Event()
+    progress_queue = mp_context.Queue()
+    number_of_processes = get_number_of_processes(len(tasks), max_number_of_processes)
+    logger.info(f"Detecting 2d skeletons in {len(tasks)} videos using {number_of_processes} processes")
+
+    worker_exception = None
+    with ProcessPoolExecutor(
+        max_workers=number_of_processes,
+        mp_context=mp_context,
+        initializer=_initialize_worker,
+        initargs=(stop_event, progress_queue),
+    ) as executor:
+        pending_futures = {
+            executor.submit(
+                _detect_skeletons_in_video_worker,
+                skeleton_detector,
+                task,
+                output_data_folder_path,
+                shared_array_descriptors,
+            )
+            for task in tasks
+        }
+
+        while pending_futures:
+            done_futures, pending_futures = wait(pending_futures, timeout=0.1)
+            _log_worker_progress(progress_queue)
+
+            for future in done_futures:
+                if future.cancelled():
+                    continue
+                if future.exception() is None:
+                    if stage_timings is not None:
+                        stage_timings.add(future.result())
+                    continue
+                logger.error(f"2d skeleton detection worker failed: {future.exception()}")
+                worker_exception = future.exception()
+                stop_event.set()
+
+            if kill_event is not None and kill_event.is_set() and not stop_event.is_set():
+                logger.info("Kill event set, stopping 2d skeleton detection workers")
+                stop_event.set()
+
+            if stop_event.is_set():
+                for future in pending_futures:
+                    future.cancel()
+
+    _log_worker_progress(progress_queue)
+
+    if worker_exception is not None:
+        raise worker_exception
+
+    return not stop_event.is_set()
+
+
+def _initialize_worker(stop_event: multiprocessing.Event, progress_queue: multiprocessing.Queue):
+    global _worker_stop_event, _worker_progress_queue
+    _worker_stop_event = stop_event
+    _worker_progress_queue = progress_queue
+
+
+def run_skeleton_detection_task(
+    skeleton_detector,
+    task: SkeletonDetectionTask,
+    output_data_folder_path: Path,
+    data2d: np.ndarray,
+    body_world: np.ndarray,
+    body_confidence: np.ndarray,
+    kill_event: multiprocessing.Event = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    stage_timings: Optional[SkeletonDetectionStageTimings] = None,
+):
+    """
+    Runs one task's frame range of its video into the camera's full length `data2d`, `body_world` and
+    `body_confidence` buffers, recording progress in the task's checkpoint as it goes if it has one.
+    Memory mapped buffers are flushed once the task stops
+    """
+    frame_range = slice(task.start_frame, task.start_frame + task.number_of_frames)
+    mediapipe_npy_arrays = skeleton_detector._create_npy_arrays_from_buffers(
+        data2d=data2d[frame_range],
+        body_world=body_world[frame_range],
+        body_confidence=body_confidence[frame_range],
+    )
+
+    checkpoint_callback = None
+    if task.checkpoint_folder_path is not None:
+        checkpoint = Mediapipe2dDetectionCheckpoint(task.checkpoint_folder_path)
+
+        def checkpoint_callback(frames_processed: int):
+            skeleton_detector._flush_npy_arrays(mediapipe_npy_arrays)
+            checkpoint.record_progress(task.start_frame, task.end_frame, task.start_frame + frames_processed)
+
+    skeleton_detector.process_video(
+        video_file_path=task.video_file_path,
+        output_data_folder_path=output_data_folder_path,
+        kill_event=kill_event,
+        mediapipe_npy_arrays=mediapipe_npy_arrays,
+        progress_callback=progress_callback,
+        start_frame=task.start_frame,
+        end_frame=task.end_frame,
+        warmup_frames=task.warmup_frames,
+        chunk_index=task.chunk_index,
+        render_annotated_video=task.render_annotated_video,
+        checkpoint_callback=checkpoint_callback,
+        stage_timings=stage_timings,
+    )
+    skeleton_detector._flush_npy_arrays(mediapipe_npy_arrays)
+
+
+def _detect_skeletons_in_video_worker(
+    skeleton_detector,
+    task: SkeletonDetectionTask,
+    output_data_folder_path: Path,
+    shared_array_descriptors: Optional[Tuple],
+) -> SkeletonDetectionStageTimings:
+    stage_timings = SkeletonDetectionStageTimings()
+    report_every_n_frames = max(1, task.number_of_frames // PROGRESS_REPORTS_PER_VIDEO)
+
+    def report_progress(frames_processed: int, number_of_frames: int):
+        if frames_processed % report_every_n_frames == 0 or frames_processed == number_of_frames:
+            _worker_progress_queue.put((task.name, frames_processed, number_of_frames))
+
+    shared_arrays = []
+    if task.checkpoint_folder_path is not None:
+        buffers = Mediapipe2dDetectionCheckpoint(task.checkpoint_folder_path).open_buffers()
+    elif task.buffer_file_paths is not None:
+        buffers = {buffer_name: np.load(str(buffer_path), mmap_mode="r+") for buffer_name, buffer_path in task.buffer_file_paths.items()}
+    else:
+        shared_arrays = [SharedNumpyArray.attach(descriptor) for descriptor in shared_array_descriptors]
+        shared_data2d, shared_body_world, shared_body_confidence = shared_arrays
+        buffers = {
+            "data2d": shared_data2d.array[task.camera_index],
+            "body_world": shared_body_world.array[task.camera_index],
+            "body_confidence": shared_body_confidence.array[task.camera_index],
+        }
+
+    try:
+        run_skeleton_detection_task(
+            skeleton_detector,
+            task,
+            output_data_folder_path,
+            **buffers,
+            kill_event=_worker_stop_event,
+            progress_callback=report_progress,
+            stage_timings=stage_timings,
+        )
+    finally:
+        for shared_array in shared_arrays:
+            shared_array.close()
+
+    return stage_timings
+
+
+def _log_worker_progress(progress_queue: multiprocessing.Queue):
+    while True:
+        try:
+            task_name, frames_processed, number_of_frames = progress_queue.get_nowait()
+        except queue.Empty:
+            return
+        logger.info(f"{task_name}: processed {frames_processed} of {number_of_frames} frames")
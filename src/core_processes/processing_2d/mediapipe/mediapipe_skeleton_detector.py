@@ -3,25 +3,55 @@ logger = logging.getLogger(__name__)
 
 from tqdm import tqdm
 from pathlib import Path
-from typing import Optional, Callable, Union, List, Tuple
+from typing import Optional, Callable, Dict, Union, List, Sequence, Tuple
+import itertools
+import time
 import mediapipe as mp
 import numpy as np
 import cv2
 import multiprocessing
+import psutil
 
-from src.data_layer.session_models.post_processing_parameter_models import MediapipeParametersModel
+from src.data_layer.session_models.post_processing_parameter_models import MediapipeParametersModel, OnnxPoseParametersModel
 from src.core_processes.processing_2d.mediapipe.data_models.mediapipe_dataclasses import Mediapipe2dNumpyArrays
-from src.core_processes.processing_2d.mediapipe.data_models.mediapipe_skeleton_names_and_connections import mediapipe_tracked_point_names_dict
-from src.utilities.video import get_video_paths
+from src.core_processes.processing_2d.mediapipe.data_models.mediapipe_skeleton_names_and_connections import (
+    get_mediapipe_landmark_group_slices,
+    get_mediapipe_landmark_groups,
+    mediapipe_tracked_point_names_dict,
+    NUMBER_OF_MEDIAPIPE_FACE_MARKERS,
+)
+from src.core_processes.processing_2d.mediapipe.frame_pipeline import SkeletonDetectionStageTimings, run_threaded_frame_pipeline
+from src.core_processes.processing_2d.mediapipe.mediapipe_2d_cache import Mediapipe2dDetectionCache
+from src.core_processes.processing_2d.mediapipe.mediapipe_2d_checkpoint import Mediapipe2dDetectionCheckpoint
+from src.core_processes.processing_2d.mediapipe.mediapipe_pose_estimator import (
+    MediapipePoseEstimator,
+    mediapipe_results_to_pose_estimator_results,
+)
+from src.core_processes.processing_2d.mediapipe.mediapipe_process_pool import (
+    SkeletonDetectionTask,
+    run_skeleton_detection_process_pool,
+    run_skeleton_detection_task,
+)
+from src.core_processes.processing_2d.mediapipe.render_annotated_videos import (
+    draw_landmark_groups,
+    get_annotated_video_save_path,
+    render_annotated_video_from_array,
+)
+from src.core_processes.processing_2d.pose_estimator import POSE_ESTIMATOR_BACKENDS, PoseEstimator, PoseEstimatorResults
+from src.utilities.number_of_processes import get_number_of_processes
+from src.utilities.shared_memory import SharedNumpyArray
+from src.utilities.storage_dtype import CONFIDENCE_STORAGE_DTYPE, get_storage_dtype
+from src.utilities.video import concatenate_videos, get_frame_count_of_video, get_video_paths
 
 from src.system.paths_and_filenames.folder_and_filenames import (
-    ANNOTATED_VIDEOS_FOLDER_NAME,
+    MEDIAPIPE_2D_BUFFERS_FOLDER_NAME,
+    MEDIAPIPE_2D_CACHE_FOLDER_NAME,
+    MEDIAPIPE_2D_CHECKPOINTS_FOLDER_NAME,
+    MEDIAPIPE_2D_CONFIDENCE_NPY_FILENAME,
     MEDIAPIPE_2D_NPY_FILENAME,
     MEDIAPIPE_BODY_WORLD_FILENAME
 )
 
-from skellycam.opencv.video_recorder.video_recorder import VideoRecorder
-
 
 mp_drawing = mp.solutions.drawing_utils
 mp_drawing_styles = mp.solutions.drawing_styles
@@ -31,17 +61,45 @@ body_drawing_spec = mp_drawing.DrawingSpec(thickness=1, circle_radius=1)
 hand_drawing_spec = mp_drawing.DrawingSpec(thickness=1, circle_radius=1)
 face_drawing_spec = mp_drawing.DrawingSpec(thickness=1, circle_radius=1)
 
+def interpolate_skipped_frames(array: np.ndarray, tracked_frame_mask: np.ndarray):
+    """
+    Fills, in place, the frames of `array` (frame axis first) that weren't tracked by linear interpolation between the
+    nearest tracked frames either side. Frames before the first or after the last tracked frame are left alone, and a
+    NaN on either side stays NaN
+    """
+    tracked_frames = np.flatnonzero(tracked_frame_mask)
+    if tracked_frames.size < 2:
+        return
+
+    skipped_frames = np.flatnonzero(~tracked_frame_mask)
+    skipped_frames = skipped_frames[(skipped_frames > tracked_frames[0]) & (skipped_frames < tracked_frames[-1])]
+    next_tracked_frames = tracked_frames[np.searchsorted(tracked_frames, skipped_frames)]
+    previous_tracked_frames = tracked_frames[np.searchsorted(tracked_frames, skipped_frames) - 1]
+
+    weights = (skipped_frames - previous_tracked_frames) / (next_tracked_frames - previous_tracked_frames)
+    weights = weights.reshape((-1,) + (1,) * (array.ndim - 1))
+    array[skipped_frames] = (1 - weights) * array[previous_tracked_frames] + weights * array[next_tracked_frames]
+
+
 class MediapipeSkeletonDetector:
     def __init__(
         self,
         parameter_model: Optional[MediapipeParametersModel] = None,
-        use_tqdm: bool = True
+        use_tqdm: bool = True,
+        onnx_pose_parameters_model: Optional[OnnxPoseParametersModel] = None,
+        storage_dtype: str = "float64",
     ):
         if parameter_model is None:
             parameter_model = MediapipeParametersModel()
-        
+        if onnx_pose_parameters_model is None:
+            onnx_pose_parameters_model = OnnxPoseParametersModel()
+        if parameter_model.detector_backend not in POSE_ESTIMATOR_BACKENDS:
+            raise ValueError(f"Unknown detector backend {parameter_model.detector_backend}, expected one of {POSE_ESTIMATOR_BACKENDS}")
+
         self._parameter_model = parameter_model
+        self._onnx_pose_parameters_model = onnx_pose_parameters_model
         self._use_tqdm = use_tqdm
+        self._storage_dtype = get_storage_dtype(storage_dtype)
         
         self._mediapipe_tracked_point_names_dict = mediapipe_tracked_point_names_dict
 
@@ -50,10 +108,15 @@ class MediapipeSkeletonDetector:
         self.left_hand_names_list = self._mediapipe_tracked_point_names_dict["left_hand"]
         self.face_names_list = self._mediapipe_tracked_point_names_dict["face"]
 
+        # landmark groups that aren't tracked get no room in the arrays at all
+        self.landmark_groups = get_mediapipe_landmark_groups(
+            include_hands=self._parameter_model.include_hands,
+            include_face=self._parameter_model.include_face,
+        )
         self.number_of_body_tracked_points = len(self.body_names_list)
-        self.number_of_right_hand_tracked_points = len(self.right_hand_names_list)
-        self.number_of_left_hand_tracked_points = len(self.left_hand_names_list)
-        self.number_of_face_tracked_points = mp.solutions.face_mesh.FACEMESH_NUM_LANDMARKS_WITH_IRISES
+        self.number_of_right_hand_tracked_points = len(self.right_hand_names_list) if "right_hand" in self.landmark_groups else 0
+        self.number_of_left_hand_tracked_points = len(self.left_hand_names_list) if "left_hand" in self.landmark_groups else 0
+        self.number_of_face_tracked_points = NUMBER_OF_MEDIAPIPE_FACE_MARKERS if "face" in self.landmark_groups else 0
 
         self.number_of_tracked_points_total = (
             self.number_of_body_tracked_points
@@ -61,6 +124,12 @@ class MediapipeSkeletonDetector:
             + self.number_of_right_hand_tracked_points
             + self.number_of_face_tracked_points
         )
+        self.landmark_group_slices = get_mediapipe_landmark_group_slices(
+            include_hands=self._parameter_model.include_hands,
+            include_face=self._parameter_model.include_face,
+        )
+        # where the last `process_folder` call spent its time, across all its videos and workers
+        self.stage_timings = SkeletonDetectionStageTimings()
 
 
 
@@ -73,123 +142,533 @@ class MediapipeSkeletonDetector:
     ) -> Union[np.ndarray, None]:
         video_folder_path = Path(video_folder_path)
         logger.info(f"Processing videos in: {video_folder_path}")
+        self.stage_timings = SkeletonDetectionStageTimings()
 
-        tasks = self._create_video_processing_tasks(output_data_folder_path=output_data_folder_path, video_folder_path=video_folder_path)
+        video_paths = get_video_paths(video_folder=video_folder_path)
+        mediapipe2d_single_camera_npy_array_list = [None] * len(video_paths)
 
-        if use_multiprocessing:
-            with multiprocessing.Pool() as pool:
-                mediapipe2d_single_camera_npy_array_list = pool.starmap(self.process_video, tasks)
+        detection_cache = Mediapipe2dDetectionCache(
+            cache_folder_path=Path(output_data_folder_path) / MEDIAPIPE_2D_CACHE_FOLDER_NAME,
+            parameter_model=self._parameter_model,
+            onnx_pose_parameters_model=self._onnx_pose_parameters_model,
+            storage_dtype=self._storage_dtype,
+        )
+        if self._parameter_model.use_2d_detection_cache or self._parameter_model.checkpoint_2d_detection:
+            cache_keys = [detection_cache.get_cache_key(video_path) for video_path in video_paths]
+
+        if self._parameter_model.use_2d_detection_cache:
+            for camera_index, cache_key in enumerate(cache_keys):
+                cached_arrays = detection_cache.load(cache_key)
+                if cached_arrays is not None:
+                    logger.info(f"Using cached 2d data for video: {video_paths[camera_index]}")
+                    mediapipe2d_single_camera_npy_array_list[camera_index] = self._create_npy_arrays_from_buffers(**cached_arrays)
+
+        camera_indices_to_process = [
+            camera_index for camera_index, npy_arrays in enumerate(mediapipe2d_single_camera_npy_array_list) if npy_arrays is None
+        ]
+        video_paths_to_process = [video_paths[camera_index] for camera_index in camera_indices_to_process]
+        video_frame_counts = [get_frame_count_of_video(video_path) for video_path in video_paths_to_process]
+
+        checkpoints = None
+        if self._parameter_model.checkpoint_2d_detection:
+            checkpoints = [
+                Mediapipe2dDetectionCheckpoint.create_or_resume(
+                    checkpoints_folder_path=Path(output_data_folder_path) / MEDIAPIPE_2D_CHECKPOINTS_FOLDER_NAME,
+                    cache_key=cache_keys[camera_index],
+                    video_file_path=video_paths[camera_index],
+                    buffer_shapes=self._get_buffer_shapes(number_of_frames=video_frame_count),
+                    buffer_dtype=self._storage_dtype,
+                )
+                for camera_index, video_frame_count in zip(camera_indices_to_process, video_frame_counts)
+            ]
+
+        # checkpoints already keep their buffers on disk, otherwise `stream_landmarks_to_disk` puts them in files here
+        buffers_folder_path = None
+        if self._parameter_model.stream_landmarks_to_disk and checkpoints is None:
+            buffers_folder_path = Path(output_data_folder_path) / MEDIAPIPE_2D_BUFFERS_FOLDER_NAME
+
+        processed_npy_array_list = []
+        # shared memory the process pool's results live in, released once they are copied into the output arrays
+        shared_arrays = []
+
+        if len(video_paths_to_process) == 0:
+            logger.info("All cameras were found in the 2d detection cache, skipping skeleton detection")
+        elif use_multiprocessing:
+            processed_npy_array_list = self._process_videos_with_process_pool(
+                video_paths=video_paths_to_process,
+                video_frame_counts=video_frame_counts,
+                output_data_folder_path=output_data_folder_path,
+                kill_event=kill_event,
+                checkpoints=checkpoints,
+                shared_arrays=shared_arrays,
+                buffers_folder_path=buffers_folder_path,
+            )
+            if processed_npy_array_list is None:
+                self._release_shared_arrays(shared_arrays)
+                return None
         else:
-            mediapipe2d_single_camera_npy_array_list = []
-            for task in tasks:
-                if kill_event is not None:
-                    if kill_event.is_set():
-                        break
-                mediapipe2d_single_camera_npy_array_list.append(self.process_video(*task))
+            tasks = self._create_skeleton_detection_tasks(
+                video_paths=video_paths_to_process,
+                video_frame_counts=video_frame_counts,
+                number_of_chunks_per_video=1,
+                checkpoints=checkpoints,
+            )
+            for camera_index, video_frame_count in enumerate(video_frame_counts):
+                if checkpoints is not None:
+                    buffers = checkpoints[camera_index].open_buffers()
+                else:
+                    buffers = self._allocate_buffers(
+                        number_of_frames=video_frame_count,
+                        memmap_folder_path=buffers_folder_path,
+                        memmap_file_prefix=video_paths_to_process[camera_index].stem,
+                    )
+                for task in tasks:
+                    if task.camera_index == camera_index:
+                        run_skeleton_detection_task(
+                            self,
+                            task,
+                            Path(output_data_folder_path),
+                            **buffers,
+                            kill_event=kill_event,
+                            stage_timings=self.stage_timings,
+                        )
+                    if kill_event is not None and kill_event.is_set():
+                        return None
+                processed_npy_array_list.append(self._create_npy_arrays_from_buffers(**buffers))
+
+        try:
+            (
+                body_world_numCams_numFrames_numTrackedPts_XYZ,
+                data2d_numCams_numFrames_numTrackedPts_XY,
+                confidence_numCams_numFrames_numTrackedPts,
+            ) = self._finish_processed_cameras(
+                mediapipe2d_single_camera_npy_array_list=mediapipe2d_single_camera_npy_array_list,
+                processed_npy_array_list=processed_npy_array_list,
+                camera_indices_to_process=camera_indices_to_process,
+                video_paths=video_paths,
+                output_data_folder_path=Path(output_data_folder_path),
+                detection_cache=detection_cache,
+                cache_keys=cache_keys if self._parameter_model.use_2d_detection_cache else None,
+                checkpoints=checkpoints,
+            )
+        finally:
+            self._release_shared_arrays(shared_arrays)
 
-        body_world_numCams_numFrames_numTrackedPts_XYZ, data2d_numCams_numFrames_numTrackedPts_XY = self._build_output_numpy_array(mediapipe2d_single_camera_npy_array_list)
+        if buffers_folder_path is not None:
+            # the output arrays have their own copy now
+            self._remove_memmap_buffers(buffers_folder_path=buffers_folder_path, video_paths=video_paths_to_process)
 
         self._save_mediapipe2d_data_to_npy(
             data2d_numCams_numFrames_numTrackedPts_XY=data2d_numCams_numFrames_numTrackedPts_XY,
             body_world_numCams_numFrames_numTrackedPts_XYZ=body_world_numCams_numFrames_numTrackedPts_XYZ,
+            confidence_numCams_numFrames_numTrackedPts=confidence_numCams_numFrames_numTrackedPts,
             output_data_folder_path=Path(output_data_folder_path)
         )
         return data2d_numCams_numFrames_numTrackedPts_XY
-    
-    def _create_video_processing_tasks(self, output_data_folder_path: Union[str, Path], video_folder_path: Union[str, Path]) -> List[Tuple]:
-        video_paths = get_video_paths(video_folder=video_folder_path)
-        tasks = [
-            (
-                video_path,
-                output_data_folder_path,
-                self._parameter_model,
-                self._annotate_image,
-                self._mediapipe_results_list_to_npy_arrays,
-                self._use_tqdm
-            )
-            for video_path in video_paths
-        ]
+
+    def _finish_processed_cameras(
+        self,
+        mediapipe2d_single_camera_npy_array_list: List[Optional[Mediapipe2dNumpyArrays]],
+        processed_npy_array_list: List[Mediapipe2dNumpyArrays],
+        camera_indices_to_process: List[int],
+        video_paths: List[Path],
+        output_data_folder_path: Path,
+        detection_cache: Mediapipe2dDetectionCache,
+        cache_keys: Optional[List[str]],
+        checkpoints: Optional[List[Mediapipe2dDetectionCheckpoint]],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Interpolates, renders and caches the freshly processed cameras where their arrays are (checkpoint files,
+        shared memory or RAM), then copies every camera into the output arrays once. Checkpoints are only removed
+        after that copy
+        """
+        for list_index, camera_index in enumerate(camera_indices_to_process):
+            npy_arrays = processed_npy_array_list[list_index]
+            mediapipe2d_single_camera_npy_array_list[camera_index] = npy_arrays
+
+            if self._parameter_model.frame_stride > 1 and self._parameter_model.interpolate_skipped_frames:
+                self._interpolate_skipped_frames(npy_arrays)
+
+            if checkpoints is not None and checkpoints[list_index].is_resumed and self._render_annotated_videos_inline:
+                # the annotated video of a resumed camera would only cover the frames processed since the restart
+                annotated_video_save_path = self._get_annotated_video_save_path(video_paths[camera_index], output_data_folder_path)
+                for stale_chunk_video_path in annotated_video_save_path.parent.glob(f"{annotated_video_save_path.stem}_chunk*.mp4"):
+                    stale_chunk_video_path.unlink()
+                render_annotated_video_from_array(
+                    video_file_path=video_paths[camera_index],
+                    data2d_numFrames_numTrackedPts_XYZ=npy_arrays.data2d_frameNumber_trackedPointNumber_XYZ,
+                    annotated_video_save_path=annotated_video_save_path,
+                    landmark_groups=self._parameter_model.annotated_landmark_groups,
+                    include_hands=self._parameter_model.include_hands,
+                    include_face=self._parameter_model.include_face,
+                )
+
+            if cache_keys is not None:
+                detection_cache.save(
+                    cache_keys[camera_index],
+                    {
+                        "data2d": npy_arrays.all_data2d_nFrames_nTrackedPts_XY,
+                        "body_world": npy_arrays.body_world_frameNumber_trackedPointNumber_XYZ,
+                        "body_confidence": npy_arrays.body_frameNumber_trackedPointNumber_confidence,
+                    },
+                )
+
+        output_arrays = self._build_output_numpy_array(
+            mediapipe2d_single_camera_npy_array_list=mediapipe2d_single_camera_npy_array_list,
+            output_data_folder_path=output_data_folder_path,
+        )
+
+        if checkpoints is not None:
+            for checkpoint in checkpoints:
+                checkpoint.remove()
+
+        return output_arrays
+
+    def _create_skeleton_detection_tasks(
+        self,
+        video_paths: List[Path],
+        video_frame_counts: List[int],
+        number_of_chunks_per_video: int,
+        checkpoints: Optional[List[Mediapipe2dDetectionCheckpoint]] = None,
+        buffers_folder_path: Optional[Path] = None,
+    ) -> List[SkeletonDetectionTask]:
+        """
+        Splits each video into `number_of_chunks_per_video` frame ranges, leaving out any frames its checkpoint says are
+        already done. Resumed cameras don't render annotated videos during detection, they are rendered once complete.
+        Given a `buffers_folder_path`, the tasks write into each camera's `.npy` buffers in that folder
+        """
+        tasks = []
+        for camera_index, (video_path, video_frame_count) in enumerate(zip(video_paths, video_frame_counts)):
+            if checkpoints is not None:
+                remaining_frame_ranges = checkpoints[camera_index].get_remaining_frame_ranges(number_of_frames=video_frame_count)
+                checkpoint_folder_path = checkpoints[camera_index].checkpoint_folder_path
+            else:
+                remaining_frame_ranges = [(0, video_frame_count)]
+                checkpoint_folder_path = None
+            is_resumed = checkpoints is not None and checkpoints[camera_index].is_resumed
+            buffer_file_paths = None
+            if buffers_folder_path is not None:
+                buffer_file_paths = self._get_memmap_buffer_paths(buffers_folder_path, memmap_file_prefix=Path(video_path).stem)
+
+            chunk_edges = np.linspace(0, video_frame_count, number_of_chunks_per_video + 1).astype(int)
+            for chunk_index, (chunk_start_frame, chunk_end_frame) in enumerate(zip(chunk_edges[:-1], chunk_edges[1:])):
+                for remaining_start_frame, remaining_end_frame in remaining_frame_ranges:
+                    start_frame = max(chunk_start_frame, remaining_start_frame)
+                    end_frame = min(chunk_end_frame, remaining_end_frame)
+                    if end_frame <= start_frame:
+                        continue
+                    tasks.append(
+                        SkeletonDetectionTask(
+                            camera_index=camera_index,
+                            video_file_path=Path(video_path),
+                            number_of_frames=int(end_frame - start_frame),
+                            start_frame=int(start_frame),
+                            end_frame=int(end_frame),
+                            chunk_index=chunk_index if number_of_chunks_per_video > 1 else None,
+                            warmup_frames=self._parameter_model.chunk_warmup_frames,
+                            render_annotated_video=self._render_annotated_videos_inline and not is_resumed,
+                            checkpoint_folder_path=checkpoint_folder_path,
+                            buffer_file_paths=buffer_file_paths,
+                        )
+                    )
         return tasks
-    
-    def _build_output_numpy_array(mediapipe2d_single_camera_npy_array_list) -> np.ndarray:
-        all_cameras_data2d_list = [m2d.all_data2d_nFrames_nTrackedPts_XY for m2d in mediapipe2d_single_camera_npy_array_list]
-        all_cameras_pose_world_data_list = [m2d.body_world_frameNumber_trackedPointNumber_XYZ for m2d in mediapipe2d_single_camera_npy_array_list]
-        all_cameras_right_hand_world_data_list = [m2d.rightHand_frameNumber_trackedPointNumber_XYZ for m2d in mediapipe2d_single_camera_npy_array_list]
-        all_cameras_left_hand_world_data_list = [m2d.leftHand_frameNumber_trackedPointNumber_XYZ for m2d in mediapipe2d_single_camera_npy_array_list]
-        all_cameras_face_world_data_list = [m2d.face_frameNumber_trackedPointNumber_XYZ for m2d in mediapipe2d_single_camera_npy_array_list]
-
-        number_cameras = len(all_cameras_data2d_list)
-        number_frames = all_cameras_data2d_list[0].shape[0]
-        number_tracked_points = all_cameras_data2d_list[0].shape[1]
-        number_spatial_dimensions = all_cameras_data2d_list[0].shape[2]
-        number_body_points = all_cameras_pose_world_data_list[0].shape[1]
-
-        data2d_numCams_numFrames_numTrackedPts_XY = np.empty(
-            (
-                number_cameras,
-                number_frames,
-                number_tracked_points,
-                number_spatial_dimensions
-            )
+
+    def _process_videos_with_process_pool(
+        self,
+        video_paths: List[Path],
+        video_frame_counts: List[int],
+        output_data_folder_path: Union[str, Path],
+        kill_event: multiprocessing.Event = None,
+        checkpoints: Optional[List[Mediapipe2dDetectionCheckpoint]] = None,
+        shared_arrays: Optional[List[SharedNumpyArray]] = None,
+        buffers_folder_path: Optional[Path] = None,
+    ) -> Optional[List[Mediapipe2dNumpyArrays]]:
+        """
+        Runs each camera's video in its own worker process. The workers write into shared memory arrays sized from the
+        videos' frame counts (or into each camera's checkpoint files, when checkpointing, or its `.npy` buffers in
+        `buffers_folder_path`, when streaming landmarks to disk), so nothing but progress updates gets pickled back here.
+        If `number_of_chunks_per_video` is more than 1, each video is also split into that many time chunks that run
+        in separate workers, each one writing its own frame range of the camera's array.
+        Returns each camera's arrays, or None if processing was stopped by the kill event. Without checkpoints those
+        are views into shared memory, which is added to `shared_arrays` for the caller to release once it's done with
+        them (`_release_shared_arrays`)
+        """
+        if shared_arrays is None:
+            shared_arrays = []
+
+        number_of_cameras = len(video_paths)
+        number_of_frames = max(video_frame_counts)
+        number_of_chunks_per_video = self._get_number_of_chunks_per_video(number_of_cameras=number_of_cameras)
+
+        tasks = self._create_skeleton_detection_tasks(
+            video_paths=video_paths,
+            video_frame_counts=video_frame_counts,
+            number_of_chunks_per_video=number_of_chunks_per_video,
+            checkpoints=checkpoints,
+            buffers_folder_path=buffers_folder_path,
         )
-        body_world_numCams_numFrames_numTrackedPts_XYZ = np.empty(
-            (
-                number_cameras,
-                number_frames,
-                number_tracked_points,
-                number_spatial_dimensions
+
+        if buffers_folder_path is not None:
+            for video_path, video_frame_count in zip(video_paths, video_frame_counts):
+                self._flush_npy_arrays(
+                    self._create_npy_arrays_from_buffers(
+                        **self._allocate_buffers(
+                            number_of_frames=video_frame_count,
+                            memmap_folder_path=buffers_folder_path,
+                            memmap_file_prefix=Path(video_path).stem,
+                        )
+                    )
+                )
+        elif checkpoints is None:
+            shared_arrays.extend(
+                SharedNumpyArray((number_of_cameras, *buffer_shape), dtype=self._storage_dtype)
+                for buffer_shape in self._get_buffer_shapes(number_of_frames=number_of_frames).values()
             )
-        )
 
-        for cam_num in range(number_cameras):
-            data2d_numCams_numFrames_numTrackedPts_XY[cam_num, :, :, :] = all_cameras_data2d_list[cam_num]
-            pose_3d = all_cameras_pose_world_data_list[cam_num]
-            right_hand_3d = all_cameras_right_hand_world_data_list[cam_num]
-            left_hand_3d = all_cameras_left_hand_world_data_list[cam_num]
-            face_3d = all_cameras_face_world_data_list[cam_num]
+        finished = run_skeleton_detection_process_pool(
+            skeleton_detector=self,
+            tasks=tasks,
+            output_data_folder_path=Path(output_data_folder_path),
+            shared_array_descriptors=tuple(shared_array.descriptor for shared_array in shared_arrays) if shared_arrays else None,
+            max_number_of_processes=self._parameter_model.max_number_of_processes,
+            kill_event=kill_event,
+            stage_timings=self.stage_timings,
+        )
+        if not finished:
+            return None
+        if number_of_chunks_per_video > 1 and self._render_annotated_videos_inline:
+            self._concatenate_annotated_video_chunks(
+                video_paths=[
+                    video_path
+                    for camera_index, video_path in enumerate(video_paths)
+                    if checkpoints is None or not checkpoints[camera_index].is_resumed
+                ],
+                output_data_folder_path=Path(output_data_folder_path),
+                number_of_chunks_per_video=number_of_chunks_per_video,
+            )
 
-            body_world_numCams_numFrames_numTrackedPts_XYZ[cam_num, :, :, :] = np.concatenate(
-                (pose_3d, right_hand_3d, left_hand_3d, face_3d), axis=1
+        if checkpoints is not None:
+            return [self._create_npy_arrays_from_buffers(**checkpoint.open_buffers()) for checkpoint in checkpoints]
+        if buffers_folder_path is not None:
+            return [
+                self._create_npy_arrays_from_buffers(
+                    **{
+                        buffer_name: np.load(str(buffer_path), mmap_mode="r+")
+                        for buffer_name, buffer_path in self._get_memmap_buffer_paths(
+                            buffers_folder_path, memmap_file_prefix=Path(video_path).stem
+                        ).items()
+                    }
+                )
+                for video_path in video_paths
+            ]
+
+        shared_data2d, shared_body_world, shared_body_confidence = shared_arrays
+        return [
+            self._create_npy_arrays_from_buffers(
+                data2d=shared_data2d.array[camera_index, :video_frame_count],
+                body_world=shared_body_world.array[camera_index, :video_frame_count],
+                body_confidence=shared_body_confidence.array[camera_index, :video_frame_count],
             )
+            for camera_index, video_frame_count in enumerate(video_frame_counts)
+        ]
 
-            logger.info(f"The shape of body_world_numCams_numFrames_numTrackedPts_XYZ is {body_world_numCams_numFrames_numTrackedPts_XYZ.shape}")
+    @staticmethod
+    def _release_shared_arrays(shared_arrays: List[SharedNumpyArray]):
+        for shared_array in shared_arrays:
+            shared_array.close()
+            shared_array.unlink()
+        shared_arrays.clear()
+
+    def _get_number_of_chunks_per_video(self, number_of_cameras: int) -> int:
+        if self._parameter_model.number_of_chunks_per_video is not None:
+            return max(1, self._parameter_model.number_of_chunks_per_video)
+
+        # split the videos just enough to give every process something to do
+        number_of_processes = get_number_of_processes(
+            number_of_tasks=multiprocessing.cpu_count(),
+            max_number_of_processes=self._parameter_model.max_number_of_processes,
+        )
+        return max(1, int(np.ceil(number_of_processes / max(number_of_cameras, 1))))
+
+    def _concatenate_annotated_video_chunks(
+        self,
+        video_paths: List[Path],
+        output_data_folder_path: Path,
+        number_of_chunks_per_video: int,
+    ):
+        for video_path in video_paths:
+            chunk_video_paths = [
+                self._get_annotated_video_save_path(video_path, output_data_folder_path, chunk_index=chunk_index)
+                for chunk_index in range(number_of_chunks_per_video)
+            ]
+            chunk_video_paths = [chunk_video_path for chunk_video_path in chunk_video_paths if chunk_video_path.exists()]
+            annotated_video_save_path = self._get_annotated_video_save_path(video_path, output_data_folder_path)
+            logger.info(f"Joining {len(chunk_video_paths)} annotated video chunks into: {annotated_video_save_path}")
+            concatenate_videos(input_video_paths=chunk_video_paths, output_video_path=annotated_video_save_path)
+            for chunk_video_path in chunk_video_paths:
+                chunk_video_path.unlink()
+
+    def _build_output_numpy_array(
+        self,
+        mediapipe2d_single_camera_npy_array_list: List[Mediapipe2dNumpyArrays],
+        output_data_folder_path: Union[str, Path],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Assembles every camera's arrays into [number_of_cameras, number_of_frames, number_of_tracked_points, XYZ] body
+        world and 2d arrays, and a half precision [number_of_cameras, number_of_frames, number_of_tracked_points]
+        confidence array (NaN for the points the detector gives no score, i.e. the hands and face), copying each camera
+        exactly once (cameras with fewer frames are NaN padded at the end).
+        If the 2d output is bigger than `output_memmap_threshold_megabytes` all the outputs are memory mapped straight
+        onto their `.npy` files in `output_data_folder_path`, so long takes never have to fit in RAM
+        """
+        all_cameras_data2d_list = [m2d.all_data2d_nFrames_nTrackedPts_XY for m2d in mediapipe2d_single_camera_npy_array_list]
+        all_cameras_body_world_list = [m2d.body_world_frameNumber_trackedPointNumber_XYZ for m2d in mediapipe2d_single_camera_npy_array_list]
+        all_cameras_body_confidence_list = [m2d.body_frameNumber_trackedPointNumber_confidence for m2d in mediapipe2d_single_camera_npy_array_list]
+        self._validate_single_camera_arrays(all_cameras_data2d_list, all_cameras_body_world_list)
+
+        number_of_cameras = len(all_cameras_data2d_list)
+        number_of_frames = max(data2d.shape[0] for data2d in all_cameras_data2d_list)
+        number_of_spatial_dimensions = 3
+        output_shapes = {
+            MEDIAPIPE_BODY_WORLD_FILENAME: (number_of_cameras, number_of_frames, self.number_of_body_tracked_points, number_of_spatial_dimensions),
+            MEDIAPIPE_2D_NPY_FILENAME: (number_of_cameras, number_of_frames, self.number_of_tracked_points_total, number_of_spatial_dimensions),
+            MEDIAPIPE_2D_CONFIDENCE_NPY_FILENAME: (number_of_cameras, number_of_frames, self.number_of_tracked_points_total),
+        }
+        output_dtypes = {
+            MEDIAPIPE_BODY_WORLD_FILENAME: self._storage_dtype,
+            MEDIAPIPE_2D_NPY_FILENAME: self._storage_dtype,
+            MEDIAPIPE_2D_CONFIDENCE_NPY_FILENAME: CONFIDENCE_STORAGE_DTYPE,
+        }
+
+        output_memmap_threshold_megabytes = self._parameter_model.output_memmap_threshold_megabytes
+        data2d_megabytes = np.prod(output_shapes[MEDIAPIPE_2D_NPY_FILENAME]) * self._storage_dtype.itemsize / 1024 ** 2
+        use_memmap = output_memmap_threshold_megabytes is not None and data2d_megabytes > output_memmap_threshold_megabytes
+
+        output_arrays = []
+        for output_filename, output_shape in output_shapes.items():
+            if use_memmap:
+                output_file_path = Path(output_data_folder_path) / output_filename
+                output_file_path.parent.mkdir(exist_ok=True, parents=True)
+                output_arrays.append(np.lib.format.open_memmap(str(output_file_path), mode="w+", dtype=output_dtypes[output_filename], shape=output_shape))
+            else:
+                output_arrays.append(np.empty(output_shape, dtype=output_dtypes[output_filename]))
+        body_world_numCams_numFrames_numTrackedPts_XYZ, data2d_numCams_numFrames_numTrackedPts_XY, confidence_numCams_numFrames_numTrackedPts = output_arrays
+        confidence_numCams_numFrames_numTrackedPts[:] = np.nan
+
+        for camera_index, (data2d, body_world) in enumerate(zip(all_cameras_data2d_list, all_cameras_body_world_list)):
+            number_of_camera_frames = data2d.shape[0]
+            data2d_numCams_numFrames_numTrackedPts_XY[camera_index, :number_of_camera_frames] = data2d
+            data2d_numCams_numFrames_numTrackedPts_XY[camera_index, number_of_camera_frames:] = np.nan
+            body_world_numCams_numFrames_numTrackedPts_XYZ[camera_index, :number_of_camera_frames] = body_world
+            body_world_numCams_numFrames_numTrackedPts_XYZ[camera_index, number_of_camera_frames:] = np.nan
+            if all_cameras_body_confidence_list[camera_index] is not None:
+                confidence_numCams_numFrames_numTrackedPts[camera_index, :number_of_camera_frames, self.landmark_group_slices["body"]] = (
+                    all_cameras_body_confidence_list[camera_index]
+                )
+
+        logger.info(
+            f"The shape of data2d_numCams_numFrames_numTrackedPts_XY is {data2d_numCams_numFrames_numTrackedPts_XY.shape} "
+            f"and of body_world_numCams_numFrames_numTrackedPts_XYZ is {body_world_numCams_numFrames_numTrackedPts_XYZ.shape}"
+            + (f" (memory mapped, {data2d_megabytes:.0f} MB of 2d data)" if use_memmap else "")
+        )
+        return body_world_numCams_numFrames_numTrackedPts_XYZ, data2d_numCams_numFrames_numTrackedPts_XY, confidence_numCams_numFrames_numTrackedPts
+
+    def _validate_single_camera_arrays(self, all_cameras_data2d_list: List[np.ndarray], all_cameras_body_world_list: List[np.ndarray]):
+        if len(all_cameras_data2d_list) == 0:
+            raise ValueError("No 2d data to build the output arrays from")
+
+        for camera_index, (data2d, body_world) in enumerate(zip(all_cameras_data2d_list, all_cameras_body_world_list)):
+            if data2d is None or body_world is None:
+                raise ValueError(f"Camera {camera_index} has no 2d data")
+            if data2d.ndim != 3 or data2d.shape[1:] != (self.number_of_tracked_points_total, 3):
+                raise ValueError(
+                    f"2d data for camera {camera_index} has shape {data2d.shape}, "
+                    f"expected (number_of_frames, {self.number_of_tracked_points_total}, 3)"
+                )
+            if body_world.shape != (data2d.shape[0], self.number_of_body_tracked_points, 3):
+                raise ValueError(
+                    f"Body world data for camera {camera_index} has shape {body_world.shape}, "
+                    f"expected ({data2d.shape[0]}, {self.number_of_body_tracked_points}, 3)"
+                )
 
-        return data2d_numCams_numFrames_numTrackedPts_XY
-        
-    
     def _save_mediapipe2d_data_to_npy(
         self,
         data2d_numCams_numFrames_numTrackedPts_XY: np.ndarray,
         body_world_numCams_numFrames_numTrackedPts_XYZ: np.ndarray,
         output_data_folder_path: Union[str, Path],
+        confidence_numCams_numFrames_numTrackedPts: Optional[np.ndarray] = None,
     ):
         mediapipe_2dData_save_path = Path(output_data_folder_path) / MEDIAPIPE_2D_NPY_FILENAME
         mediapipe_2dData_save_path.parent.mkdir(exist_ok=True, parents=True)
         logger.info(f"saving mediapipe image npy file: {mediapipe_2dData_save_path}")
-        np.save(str(mediapipe_2dData_save_path), data2d_numCams_numFrames_numTrackedPts_XY)
+        self._save_or_flush_npy(mediapipe_2dData_save_path, data2d_numCams_numFrames_numTrackedPts_XY)
 
         mediapipe_body_world_save_path = Path(output_data_folder_path) / MEDIAPIPE_BODY_WORLD_FILENAME
         mediapipe_body_world_save_path.parent.mkdir(exist_ok=True, parents=True)
         logger.info(f"Saving mediapipe body world npy xyz: {mediapipe_body_world_save_path}")
-        np.save(str(mediapipe_body_world_save_path), body_world_numCams_numFrames_numTrackedPts_XYZ)
+        self._save_or_flush_npy(mediapipe_body_world_save_path, body_world_numCams_numFrames_numTrackedPts_XYZ)
 
+        if confidence_numCams_numFrames_numTrackedPts is not None:
+            mediapipe_2d_confidence_save_path = Path(output_data_folder_path) / MEDIAPIPE_2D_CONFIDENCE_NPY_FILENAME
+            logger.info(f"Saving mediapipe 2d confidence npy file: {mediapipe_2d_confidence_save_path}")
+            self._save_or_flush_npy(mediapipe_2d_confidence_save_path, confidence_numCams_numFrames_numTrackedPts)
 
     @staticmethod
+    def _save_or_flush_npy(save_path: Path, array: np.ndarray):
+        # memory mapped output arrays are already backed by their .npy file
+        if isinstance(array, np.memmap) and array.filename is not None and Path(array.filename).resolve() == save_path.resolve():
+            array.flush()
+        else:
+            np.save(str(save_path), array)
+
+
     def process_video(
+        self,
         video_file_path: Path,
         output_data_folder_path: Path,
-        parameter_model: MediapipeParametersModel,
-        annotate_image: Callable,
-        mediapipe_results_list_to_npy_arrays: Callable,
-        use_tqdm: bool = True
-    ):
-        logger.info(f"Running mediapipe skeleton detection on video: {str(video_file_path)}")
-
-        holistic_tracker = mp_holistic.Holistic(
-            model_complexity=parameter_model.mediapipe_model_complexity,
-            min_detection_confidence=parameter_model.min_detection_confidence,
-            min_tracking_confidence=parameter_model.min_tracking_confidence,
-        )
+        kill_event: multiprocessing.Event = None,
+        mediapipe_npy_arrays: Optional[Mediapipe2dNumpyArrays] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        warmup_frames: int = 0,
+        chunk_index: Optional[int] = None,
+        render_annotated_video: Optional[bool] = None,
+        checkpoint_callback: Optional[Callable[[int], None]] = None,
+        stage_timings: Optional[SkeletonDetectionStageTimings] = None,
+    ) -> Mediapipe2dNumpyArrays:
+        """
+        Runs the pose estimator (mediapipe, unless `detector_backend` says otherwise) on every frame of the video, streaming each frame's landmarks straight into
+        preallocated arrays and each annotated frame straight into the annotated video file, so memory
+        use doesn't grow with the length of the recording.
+
+        Pass `mediapipe_npy_arrays` to write into buffers the caller already owns (e.g. shared memory, or the memmaps
+        `process_folder` makes when `stream_landmarks_to_disk` is set), and `progress_callback(frames_processed,
+        number_of_frames)` to be told about progress after every frame. Otherwise this call allocates the arrays itself,
+        as memmaps in the output folder if `stream_landmarks_to_disk` is set.
+
+        `start_frame`/`end_frame` restrict processing to one chunk of the video (the arrays then hold just that chunk).
+        The `warmup_frames` before `start_frame` are run through the tracker so it has locked on by the first frame
+        of the chunk, and are then thrown away. Chunks get their own annotated video, tagged with `chunk_index`.
+        `render_annotated_video` overrides the parameter model's annotated video settings for this call.
+
+        `checkpoint_callback(frames_processed)` is called every `checkpoint_interval_frames` frames and once more when
+        processing stops for any reason, with the number of frames written to the arrays so far.
+        Time spent decoding, running the model, converting its results, annotating and encoding is added to
+        `stage_timings`, if given.
+
+        With a `frame_stride` of k only every k-th frame of the video goes through mediapipe, the others stay NaN (or
+        are interpolated, if this call allocated the arrays - `process_folder` interpolates whole cameras itself).
+        If the video has an entry in `regions_of_interest` only that part of the image is tracked, optionally shrunk
+        by `inference_downscale_factor`; landmarks are always stored in full resolution pixel coordinates
+        """
+        video_file_path = Path(video_file_path)
+        output_data_folder_path = Path(output_data_folder_path)
+        logger.info(f"Running {self._parameter_model.detector_backend} skeleton detection on video: {str(video_file_path)}")
+
+        pose_estimator = self._create_pose_estimator()
+        if stage_timings is None:
+            stage_timings = SkeletonDetectionStageTimings()
 
         cap = cv2.VideoCapture(str(video_file_path))
 
@@ -198,285 +677,597 @@ class MediapipeSkeletonDetector:
         video_fps = cap.get(cv2.CAP_PROP_FPS)
         video_frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-        mediapipe_results_list = []
-        annotated_images_list = []
+        if end_frame is None or end_frame > video_frame_count:
+            end_frame = video_frame_count
+        number_of_frames = max(end_frame - start_frame, 0)
 
-        success, image = cap.read()
-        
-        if use_tqdm:
+        if self._parameter_model.stream_landmarks_to_disk:
+            memmap_folder_path = output_data_folder_path / MEDIAPIPE_2D_BUFFERS_FOLDER_NAME
+        else:
+            memmap_folder_path = None
+
+        owns_npy_arrays = mediapipe_npy_arrays is None
+        if owns_npy_arrays:
+            mediapipe_npy_arrays = self._initialize_npy_arrays(
+                number_of_frames=number_of_frames,
+                memmap_folder_path=memmap_folder_path,
+                memmap_file_prefix=video_file_path.stem if chunk_index is None else f"{video_file_path.stem}_chunk{chunk_index:03d}",
+            )
+        else:
+            memmap_folder_path = None
+            number_of_frames = min(number_of_frames, mediapipe_npy_arrays.data2d_frameNumber_trackedPointNumber_XYZ.shape[0])
+
+        if render_annotated_video is None:
+            render_annotated_video = self._render_annotated_videos_inline
+
+        if render_annotated_video:
+            annotated_video_save_path = self._get_annotated_video_save_path(
+                video_file_path=video_file_path,
+                output_data_folder_path=output_data_folder_path,
+                chunk_index=chunk_index,
+            )
+            logger.info(f"Saving mediapipe annotated video to: {annotated_video_save_path}")
+            annotated_video_writer = cv2.VideoWriter(
+                str(annotated_video_save_path),
+                cv2.VideoWriter_fourcc(*"mp4v"),
+                video_fps,
+                (int(video_width), int(video_height)),
+            )
+        else:
+            annotated_video_writer = None
+
+        if self._use_tqdm:
             iterator = tqdm(
-                range(video_frame_count),
+                range(number_of_frames),
                 desc=f"mediapiping video: {video_file_path.name}",
-                total=video_frame_count,
+                total=number_of_frames,
                 colour="magenta",
                 unit="frames",
                 dynamic_ncols=True,
             )
         else:
-            iterator = range(video_frame_count)
+            iterator = range(number_of_frames)
 
-        # iterate over each frame in video
-        for _ in iterator:
-            if not success or image is None:
-                logger.error(f"Failed to load an image from: {str(video_file_path)}")
-                raise Exception
-            
-            mediapipe_results = holistic_tracker.process(image)
-
-            mediapipe_single_frame_npy_data = mediapipe_results_list_to_npy_arrays(
-                [mediapipe_results],
-                image_width=image.shape[0],
-                image_height=image.shape[1],
-            )
-
-            # TODO: should this be parameterized instead of hard coded?
-            # TODO: This also doesn't appear to do anything, the final variable isn't used
-            confidence_threshold = 0.5
+        region_of_interest = self._get_region_of_interest(
+            video_file_path=video_file_path,
+            image_width=int(video_width),
+            image_height=int(video_height),
+        )
+        frame_stride = max(1, self._parameter_model.frame_stride)
+        inference_batch_size = self._get_inference_batch_size(
+            pose_estimator=pose_estimator,
+            image_width=int(video_width),
+            image_height=int(video_height),
+            region_of_interest=region_of_interest,
+        )
+        annotated_landmark_groups = [
+            landmark_group for landmark_group in self._parameter_model.annotated_landmark_groups if landmark_group in self.landmark_groups
+        ]
 
-            threshold_mask = mediapipe_single_frame_npy_data.body_frameNumber_trackedPointNumber_confidence < confidence_threshold
-            mediapipe_single_frame_npy_data.body_frameNumber_trackedPointNumber_XYZ[threshold_mask, :] = np.nan
+        def is_tracked_frame(frame_number: int) -> bool:
+            return (start_frame + frame_number) % frame_stride == 0
 
-            mediapipe_results_list.append(mediapipe_results)
-            annotated_images_list.append(annotate_image(image, mediapipe_results))
+        number_of_frames_processed = 0
+        next_frame_number_to_read = 0
 
+        def read_image() -> np.ndarray:
+            tic = time.perf_counter()
             success, image = cap.read()
+            stage_timings.decode_seconds += time.perf_counter() - tic
+            if not success or image is None:
+                logger.error(f"Failed to load an image from: {str(video_file_path)}")
+                raise Exception
+            return image
+
+        def read_frame() -> Optional[np.ndarray]:
+            nonlocal next_frame_number_to_read
+            frame_number = next_frame_number_to_read
+            next_frame_number_to_read += 1
+
+            # frames that are neither tracked nor annotated don't need decoding
+            if annotated_video_writer is None and not is_tracked_frame(frame_number):
+                tic = time.perf_counter()
+                success = cap.grab()
+                stage_timings.decode_seconds += time.perf_counter() - tic
+                if not success:
+                    logger.error(f"Failed to load an image from: {str(video_file_path)}")
+                    raise Exception
+                return None
+            return read_image()
+
+        def process_frames(frame_numbers: List[int], images: List[Optional[np.ndarray]]) -> List[Optional[PoseEstimatorResults]]:
+            """Runs the tracked frames among these consecutive frames through one `detect` call, one result per frame"""
+            frames_results = [None] * len(frame_numbers)
+            tracked_frame_indices = [frame_index for frame_index, frame_number in enumerate(frame_numbers) if is_tracked_frame(frame_number)]
+            if len(tracked_frame_indices) > 0:
+                tic = time.perf_counter()
+                pose_estimator_results = pose_estimator.detect(
+                    [self._get_inference_image(images[frame_index], region_of_interest) for frame_index in tracked_frame_indices]
+                )
+                toc = time.perf_counter()
+                stage_timings.inference_seconds += toc - tic
+
+                for batch_index, frame_index in enumerate(tracked_frame_indices):
+                    self._add_pose_estimator_results_to_npy_arrays(
+                        mediapipe_npy_arrays=mediapipe_npy_arrays,
+                        frame_number=frame_numbers[frame_index],
+                        pose_estimator_results=pose_estimator_results,
+                        batch_index=batch_index,
+                        image_width=video_width,
+                        image_height=video_height,
+                        region_of_interest=region_of_interest,
+                    )
+                    self._threshold_body_by_confidence(
+                        mediapipe_npy_arrays=mediapipe_npy_arrays,
+                        frame_number=frame_numbers[frame_index],
+                        confidence_threshold=self._landmark_confidence_threshold,
+                    )
+                    frames_results[frame_index] = pose_estimator_results.select(batch_index)
+                stage_timings.convert_seconds += time.perf_counter() - toc
+
+            nonlocal number_of_frames_processed
+            checkpoint_interval_frames = self._parameter_model.checkpoint_interval_frames
+            for frame_number in frame_numbers:
+                previous_number_of_frames_processed = number_of_frames_processed
+                number_of_frames_processed = frame_number + 1
+
+                if progress_callback is not None:
+                    progress_callback(number_of_frames_processed, number_of_frames)
+                # a batch can step over a multiple of the interval without landing on it
+                if checkpoint_callback is not None and (
+                    number_of_frames_processed // checkpoint_interval_frames > previous_number_of_frames_processed // checkpoint_interval_frames
+                ):
+                    checkpoint_callback(number_of_frames_processed)
+            return frames_results
+
+        def write_frame(image: np.ndarray, pose_estimator_results: Optional[PoseEstimatorResults]):
+            tic = time.perf_counter()
+            if pose_estimator_results is not None and pose_estimator_results.raw_results is not None:
+                # mediapipe's landmarks are relative to the tracked region, so draw into a view of just that region
+                x_start, y_start, x_end, y_end = region_of_interest
+                self._annotate_image(
+                    image[y_start:y_end, x_start:x_end],
+                    pose_estimator_results.raw_results[0],
+                    annotated_landmark_groups,
+                )
+            elif pose_estimator_results is not None:
+                draw_landmark_groups(
+                    image=image,
+                    points_XY=self._get_pixel_landmarks_XYZ(pose_estimator_results, 0, region_of_interest)[:, :2],
+                    landmark_group_slices=self.landmark_group_slices,
+                    landmark_groups=annotated_landmark_groups,
+                )
+            toc = time.perf_counter()
+            annotated_video_writer.write(image)
+            stage_timings.annotate_seconds += toc - tic
+            stage_timings.encode_seconds += time.perf_counter() - toc
 
-        # aggregate frame data
         try:
-            annotated_video_path = output_data_folder_path / ANNOTATED_VIDEOS_FOLDER_NAME
-            annotated_video_path.mkdir(exist_ok=True, parents=True)
-            annotated_video_name = video_file_path.stem + "_mediapipe.mp4"
-            annotated_video_save_path = annotated_video_path / annotated_video_name
-
-            logger.info(f"Saving mediapipe annotated video to: {annotated_video_save_path}")
+            first_frame_to_read = max(start_frame - warmup_frames, 0)
+            if first_frame_to_read > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame_to_read)
+
+            # let the tracker lock on before the chunk starts, the results are thrown away
+            for _ in range(start_frame - first_frame_to_read):
+                pose_estimator.detect([self._get_inference_image(read_image(), region_of_interest)])
+
+            if self._parameter_model.use_threaded_pipeline:
+                run_threaded_frame_pipeline(
+                    read_frame=read_frame,
+                    process_frames=process_frames,
+                    write_frame=write_frame if annotated_video_writer is not None else None,
+                    frame_numbers=iterator,
+                    queue_depth=self._parameter_model.pipeline_queue_depth,
+                    kill_event=kill_event,
+                    name=video_file_path.name if chunk_index is None else f"{video_file_path.name} chunk {chunk_index}",
+                    batch_size=inference_batch_size,
+                )
+            else:
+                # iterate over the video a batch of frames at a time
+                frame_number_iterator = iter(iterator)
+                while True:
+                    if kill_event is not None and kill_event.is_set():
+                        logger.info(f"Kill event set, stopping mediapipe skeleton detection on video: {str(video_file_path)}")
+                        break
 
-            video_recorder = VideoRecorder()
-            video_recorder.save_image_list_to_disk(
-                image_list=annotated_images_list,
-                path_to_save_video_file=annotated_video_save_path,
-                frames_per_second=video_fps
-            )
+                    batch_frame_numbers = list(itertools.islice(frame_number_iterator, inference_batch_size))
+                    if len(batch_frame_numbers) == 0:
+                        break
+                    batch_images = [read_frame() for _ in batch_frame_numbers]
+                    batch_results = process_frames(batch_frame_numbers, batch_images)
+                    if annotated_video_writer is not None:
+                        for image, pose_estimator_results in zip(batch_images, batch_results):
+                            write_frame(image, pose_estimator_results)
         except Exception as e:
-            logger.error(f"Failed to save annotated video file to disk: {e}")
+            logger.error(f"Failed to process video {video_file_path}: {e}")
             raise e
-        
-        # return the aggregated numpy array for this video
-        return mediapipe_results_list_to_npy_arrays(
-            mediapipe_results_list=mediapipe_results_list,
-            image_width=video_width,
-            image_height=video_height
-        )
-
+        finally:
+            cap.release()
+            if annotated_video_writer is not None:
+                annotated_video_writer.release()
+            pose_estimator.close()
+            if checkpoint_callback is not None:
+                checkpoint_callback(number_of_frames_processed)
 
+        if owns_npy_arrays and frame_stride > 1 and self._parameter_model.interpolate_skipped_frames:
+            self._interpolate_skipped_frames(mediapipe_npy_arrays, first_frame_number=start_frame)
 
+        if memmap_folder_path is not None:
+            self._flush_npy_arrays(mediapipe_npy_arrays)
 
+        # return the numpy arrays for this video
+        return mediapipe_npy_arrays
 
     @staticmethod
-    def _annotate_image(image, mediapipe_results):
-        mp_drawing.draw_landmarks(
-            image=image,
-            landmark_list=mediapipe_results.face_landmarks,
-            connections=mp_holistic.FACEMESH_CONTOURS,
-            landmark_drawing_spec=None,
-            connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_contours_style(),
+    def _get_annotated_video_save_path(
+        video_file_path: Path,
+        output_data_folder_path: Path,
+        chunk_index: Optional[int] = None,
+    ) -> Path:
+        return get_annotated_video_save_path(
+            video_file_path=video_file_path,
+            output_data_folder_path=output_data_folder_path,
+            chunk_index=chunk_index,
         )
-        mp_drawing.draw_landmarks(
-            image=image,
-            landmark_list=mediapipe_results.face_landmarks,
-            connections=mp_holistic.FACEMESH_TESSELATION,
-            landmark_drawing_spec=None,
-            connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_tesselation_style(),
+
+    @property
+    def _landmark_confidence_threshold(self) -> float:
+        """Onnx keypoint scores are on a different scale to mediapipe's visibility, so that backend has its own threshold"""
+        if self._parameter_model.detector_backend == "onnx":
+            return self._onnx_pose_parameters_model.score_threshold
+        return self._parameter_model.landmark_confidence_threshold
+
+    @property
+    def _render_annotated_videos_inline(self) -> bool:
+        return self._parameter_model.render_annotated_videos and not self._parameter_model.defer_annotated_video_rendering
+
+    def _create_pose_estimator(self) -> PoseEstimator:
+        if self._parameter_model.detector_backend == "onnx":
+            # imported here so onnxruntime is only needed by sessions that use it
+            from src.core_processes.processing_2d.onnx.onnx_pose_estimator import OnnxPoseEstimator
+
+            return OnnxPoseEstimator(
+                parameter_model=self._onnx_pose_parameters_model,
+                landmark_group_slices=self.landmark_group_slices,
+            )
+        return MediapipePoseEstimator(
+            parameter_model=self._parameter_model,
+            landmark_group_slices=self.landmark_group_slices,
         )
-        mp_drawing.draw_landmarks(
-            image=image,
-            landmark_list=mediapipe_results.pose_landmarks,
-            connections=mp_holistic.POSE_CONNECTIONS,
-            landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style(),
+
+    def _get_inference_batch_size(
+        self,
+        pose_estimator: PoseEstimator,
+        image_width: int,
+        image_height: int,
+        region_of_interest: Tuple[int, int, int, int],
+    ) -> int:
+        """
+        How many frames go through each `detect` call. Backends that can't batch always get one frame at a time. An
+        `inference_batch_size` of 0 fits the batch into `inference_batch_memory_fraction` of the available memory
+        """
+        requested_batch_size = self._parameter_model.inference_batch_size
+        if requested_batch_size == 1:
+            return 1
+        if not pose_estimator.supports_batching:
+            logger.info(f"The {pose_estimator.name} pose estimator can't batch frames, running one frame at a time")
+            return 1
+        if requested_batch_size > 1:
+            return requested_batch_size
+
+        x_start, y_start, x_end, y_end = region_of_interest
+        downscale_factor = max(1.0, self._parameter_model.inference_downscale_factor)
+        inference_image_width = max(1, round((x_end - x_start) / downscale_factor))
+        inference_image_height = max(1, round((y_end - y_start) / downscale_factor))
+        # each frame of a batch is held decoded, possibly again on its way to the encoder, and as the inference image
+        bytes_per_frame = (
+            2 * 3 * image_width * image_height
+            + 3 * inference_image_width * inference_image_height
+            + pose_estimator.get_working_bytes_per_image(inference_image_width, inference_image_height)
         )
-        mp_drawing.draw_landmarks(
-            image=image,
-            landmark_list=mediapipe_results.left_hand_landmarks,
-            connections=mp_holistic.HAND_CONNECTIONS,
-            landmark_drawing_spec=None,
-            connection_drawing_spec=mp_drawing_styles.get_default_hand_connections_style(),
+        available_bytes = psutil.virtual_memory().available * self._parameter_model.inference_batch_memory_fraction
+        inference_batch_size = int(np.clip(available_bytes // bytes_per_frame, 1, self._parameter_model.max_inference_batch_size))
+        logger.info(
+            f"Running the {pose_estimator.name} pose estimator on batches of {inference_batch_size} frames "
+            f"(~{bytes_per_frame / 1024 ** 2:.1f} MB per frame, {available_bytes / 1024 ** 3:.1f} GB budget)"
         )
+        return inference_batch_size
+
+    def _get_region_of_interest(self, video_file_path: Path, image_width: int, image_height: int) -> Tuple[int, int, int, int]:
+        """The (x_start, y_start, x_end, y_end) pixel box to track in, from `regions_of_interest` [x, y, width, height]"""
+        region_of_interest = self._parameter_model.regions_of_interest.get(Path(video_file_path).stem)
+        if region_of_interest is None:
+            return (0, 0, image_width, image_height)
+
+        x, y, width, height = [int(value) for value in region_of_interest]
+        x_start, y_start = max(x, 0), max(y, 0)
+        x_end, y_end = min(x + width, image_width), min(y + height, image_height)
+        if x_end <= x_start or y_end <= y_start:
+            logger.warning(f"Region of interest {region_of_interest} is outside of {video_file_path}, tracking the full image")
+            return (0, 0, image_width, image_height)
+        return (x_start, y_start, x_end, y_end)
+
+    def _get_inference_image(self, image: np.ndarray, region_of_interest: Tuple[int, int, int, int]) -> np.ndarray:
+        x_start, y_start, x_end, y_end = region_of_interest
+        inference_image = image[y_start:y_end, x_start:x_end]
+        downscale_factor = self._parameter_model.inference_downscale_factor
+        if downscale_factor > 1:
+            inference_image = cv2.resize(
+                inference_image,
+                (max(1, round(inference_image.shape[1] / downscale_factor)), max(1, round(inference_image.shape[0] / downscale_factor))),
+                interpolation=cv2.INTER_AREA,
+            )
+        # mediapipe wants contiguous memory, which a crop isn't
+        return np.ascontiguousarray(inference_image)
 
-        mp_drawing.draw_landmarks(
-            image=image,
-            landmark_list=mediapipe_results.right_hand_landmarks,
-            connections=mp_holistic.HAND_CONNECTIONS,
-            landmark_drawing_spec=None,
-            connection_drawing_spec=mp_drawing_styles.get_default_hand_connections_style(),
-        )
+    def _interpolate_skipped_frames(self, mediapipe_npy_arrays: Mediapipe2dNumpyArrays, first_frame_number: int = 0):
+        if mediapipe_npy_arrays.data2d_frameNumber_trackedPointNumber_XYZ is not None:
+            landmark_arrays = [mediapipe_npy_arrays.data2d_frameNumber_trackedPointNumber_XYZ]
+        else:
+            landmark_arrays = [
+                mediapipe_npy_arrays.body_frameNumber_trackedPointNumber_XYZ,
+                mediapipe_npy_arrays.rightHand_frameNumber_trackedPointNumber_XYZ,
+                mediapipe_npy_arrays.leftHand_frameNumber_trackedPointNumber_XYZ,
+                mediapipe_npy_arrays.face_frameNumber_trackedPointNumber_XYZ,
+            ]
+
+        number_of_frames = mediapipe_npy_arrays.body_frameNumber_trackedPointNumber_XYZ.shape[0]
+        tracked_frame_mask = (np.arange(number_of_frames) + first_frame_number) % max(1, self._parameter_model.frame_stride) == 0
+        for array in landmark_arrays + [
+            mediapipe_npy_arrays.body_world_frameNumber_trackedPointNumber_XYZ,
+            mediapipe_npy_arrays.body_frameNumber_trackedPointNumber_confidence,
+        ]:
+            interpolate_skipped_frames(array, tracked_frame_mask)
+
+    @staticmethod
+    def _annotate_image(
+        image,
+        mediapipe_results,
+        landmark_groups: Sequence[str] = ("body", "right_hand", "left_hand", "face"),
+    ):
+        if "face" in landmark_groups:
+            mp_drawing.draw_landmarks(
+                image=image,
+                landmark_list=mediapipe_results.face_landmarks,
+                connections=mp_holistic.FACEMESH_CONTOURS,
+                landmark_drawing_spec=None,
+                connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_contours_style(),
+            )
+            mp_drawing.draw_landmarks(
+                image=image,
+                landmark_list=mediapipe_results.face_landmarks,
+                connections=mp_holistic.FACEMESH_TESSELATION,
+                landmark_drawing_spec=None,
+                connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_tesselation_style(),
+            )
+        if "body" in landmark_groups:
+            mp_drawing.draw_landmarks(
+                image=image,
+                landmark_list=mediapipe_results.pose_landmarks,
+                connections=mp_holistic.POSE_CONNECTIONS,
+                landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style(),
+            )
+        if "left_hand" in landmark_groups:
+            mp_drawing.draw_landmarks(
+                image=image,
+                landmark_list=mediapipe_results.left_hand_landmarks,
+                connections=mp_holistic.HAND_CONNECTIONS,
+                landmark_drawing_spec=None,
+                connection_drawing_spec=mp_drawing_styles.get_default_hand_connections_style(),
+            )
+        if "right_hand" in landmark_groups:
+            mp_drawing.draw_landmarks(
+                image=image,
+                landmark_list=mediapipe_results.right_hand_landmarks,
+                connections=mp_holistic.HAND_CONNECTIONS,
+                landmark_drawing_spec=None,
+                connection_drawing_spec=mp_drawing_styles.get_default_hand_connections_style(),
+            )
         return image
     
-    def _mediapipe_results_list_to_npy_arrays(
+    def _initialize_npy_arrays(
         self,
-        mediapipe_results_list: List,
-        image_width: Union[int, float],
-        image_height: Union[int, float],
+        number_of_frames: int,
+        memmap_folder_path: Optional[Union[str, Path]] = None,
+        memmap_file_prefix: str = "",
     ) -> Mediapipe2dNumpyArrays:
-        number_of_frames = len(mediapipe_results_list)
-        number_of_spatial_dimensions = 3  # this will be 2d XY pixel data, with mediapipe's estimate of Z
-
-        body_frameNumber_trackedPointNumber_XYZ = np.zeros(
-            (
-                number_of_frames,
-                self.number_of_body_tracked_points,
-                number_of_spatial_dimensions,
-            )
-        )
-        body_frameNumber_trackedPointNumber_XYZ[:] = np.nan
-
-        body_world_frameNumber_trackedPointNumber_XYZ = np.zeros(
-            (
-                number_of_frames,
-                self.number_of_body_tracked_points,
-                number_of_spatial_dimensions,
+        """
+        Preallocates NaN filled arrays for `number_of_frames` frames. The body, hand and face arrays are views into one
+        contiguous [number_of_frames, number_of_tracked_points, XYZ] buffer. If `memmap_folder_path` is given the buffers
+        are backed by `.npy` files in that folder instead of RAM
+        """
+        return self._create_npy_arrays_from_buffers(
+            **self._allocate_buffers(
+                number_of_frames=number_of_frames,
+                memmap_folder_path=memmap_folder_path,
+                memmap_file_prefix=memmap_file_prefix,
             )
         )
-        body_world_frameNumber_trackedPointNumber_XYZ[:] = np.nan
 
-        body_frameNumber_trackedPointNumber_confidence = np.zeros(
-            (number_of_frames, self.number_of_body_tracked_points)
-        )
-        body_frameNumber_trackedPointNumber_confidence[:] = np.nan  # only body markers get a 'confidence' value
-
-        rightHand_frameNumber_trackedPointNumber_XYZ = np.zeros(
-            (
-                number_of_frames,
-                self.number_of_right_hand_tracked_points,
-                number_of_spatial_dimensions,
+    def _allocate_buffers(
+        self,
+        number_of_frames: int,
+        memmap_folder_path: Optional[Union[str, Path]] = None,
+        memmap_file_prefix: str = "",
+    ) -> Dict[str, np.ndarray]:
+        """NaN filled data2d, body_world and body_confidence buffers, in RAM or as `.npy` memmaps in `memmap_folder_path`"""
+        if memmap_folder_path is None:
+            return {
+                buffer_name: np.full(buffer_shape, np.nan, dtype=self._storage_dtype)
+                for buffer_name, buffer_shape in self._get_buffer_shapes(number_of_frames=number_of_frames).items()
+            }
+
+        Path(memmap_folder_path).mkdir(exist_ok=True, parents=True)
+        buffer_paths = self._get_memmap_buffer_paths(memmap_folder_path, memmap_file_prefix=memmap_file_prefix)
+        buffers = {}
+        for buffer_name, buffer_shape in self._get_buffer_shapes(number_of_frames=number_of_frames).items():
+            buffers[buffer_name] = np.lib.format.open_memmap(
+                str(buffer_paths[buffer_name]), mode="w+", dtype=self._storage_dtype, shape=buffer_shape
             )
-        )
-        rightHand_frameNumber_trackedPointNumber_XYZ[:] = np.nan
+            buffers[buffer_name][:] = np.nan
+        return buffers
+
+    def _get_memmap_buffer_paths(self, memmap_folder_path: Union[str, Path], memmap_file_prefix: str) -> Dict[str, Path]:
+        return {
+            buffer_name: Path(memmap_folder_path) / f"{memmap_file_prefix}_{buffer_name}.npy"
+            for buffer_name in self._get_buffer_shapes(number_of_frames=0)
+        }
+
+    def _remove_memmap_buffers(self, buffers_folder_path: Path, video_paths: List[Path]):
+        for video_path in video_paths:
+            for buffer_path in self._get_memmap_buffer_paths(buffers_folder_path, memmap_file_prefix=Path(video_path).stem).values():
+                try:
+                    buffer_path.unlink(missing_ok=True)
+                except OSError as e:
+                    # e.g. on Windows, while something still maps the file
+                    logger.warning(f"Could not remove 2d detection buffer {buffer_path}: {e}")
+
+    def _get_buffer_shapes(self, number_of_frames: int) -> Dict[str, Tuple[int, ...]]:
+        number_of_spatial_dimensions = 3  # this will be 2d XY pixel data, with mediapipe's estimate of Z
+        return {
+            "data2d": (number_of_frames, self.number_of_tracked_points_total, number_of_spatial_dimensions),
+            "body_world": (number_of_frames, self.number_of_body_tracked_points, number_of_spatial_dimensions),
+            "body_confidence": (number_of_frames, self.number_of_body_tracked_points),
+        }
 
-        leftHand_frameNumber_trackedPointNumber_XYZ = np.zeros(
-            (
-                number_of_frames,
-                self.number_of_left_hand_tracked_points,
-                number_of_spatial_dimensions,
-            )
-        )
-        leftHand_frameNumber_trackedPointNumber_XYZ[:] = np.nan
+    def _create_npy_arrays_from_buffers(
+        self,
+        data2d: np.ndarray,
+        body_world: np.ndarray,
+        body_confidence: np.ndarray,
+    ) -> Mediapipe2dNumpyArrays:
+        """Wraps existing buffers (in RAM, memmapped or in shared memory) without copying them"""
+        first_right_hand_index = self.number_of_body_tracked_points
+        first_left_hand_index = first_right_hand_index + self.number_of_right_hand_tracked_points
+        first_face_index = first_left_hand_index + self.number_of_left_hand_tracked_points
 
-        face_frameNumber_trackedPointNumber_XYZ = np.zeros(
-            (
-                number_of_frames,
-                self.number_of_face_tracked_points,
-                number_of_spatial_dimensions,
-            )
+        return Mediapipe2dNumpyArrays(
+            body_frameNumber_trackedPointNumber_XYZ=data2d[:, :first_right_hand_index, :],
+            body_world_frameNumber_trackedPointNumber_XYZ=body_world,
+            rightHand_frameNumber_trackedPointNumber_XYZ=data2d[:, first_right_hand_index:first_left_hand_index, :],
+            leftHand_frameNumber_trackedPointNumber_XYZ=data2d[:, first_left_hand_index:first_face_index, :],
+            face_frameNumber_trackedPointNumber_XYZ=data2d[:, first_face_index:, :],
+            body_frameNumber_trackedPointNumber_confidence=body_confidence,
+            data2d_frameNumber_trackedPointNumber_XYZ=data2d,
         )
-        face_frameNumber_trackedPointNumber_XYZ[:] = np.nan
 
-        all_body_tracked_points_visible_on_frame_bool_list = []
-        all_right_hand_points_visible_on_frame_bool_list = []
-        all_left_hand_points_visible_on_frame_bool_list = []
-        all_face_points_visible_on_frame_bool_list = []
-        all_tracked_points_visible_on_frame_list = []
-
-        for frame_number, frame_results in enumerate(mediapipe_results_list):
-            # get the Body data (aka 'pose')
-            if frame_results.pose_landmarks is not None:
-                for landmark_number, landmark_data in enumerate(frame_results.pose_landmarks.landmark):
-                    body_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 0] = (
-                        landmark_data.x * image_width
-                    )
-                    body_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 1] = (
-                        landmark_data.y * image_height
-                    )
-                    body_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 2] = (
-                        landmark_data.z
-                        * image_width
-                        # z is on roughly the same scale as x, according to mediapipe docs
-                    )
-                    body_frameNumber_trackedPointNumber_confidence[
-                        frame_number, landmark_number
-                    ] = landmark_data.visibility  # mediapipe calls their 'confidence' score 'visibility'
-
-                for landmark_number, landmark_data in enumerate(frame_results.pose_world_landmarks.landmark):
-                    body_world_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 0] = (
-                        landmark_data.x * image_width
-                    )
-                    body_world_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 1] = (
-                        landmark_data.y * image_height
-                    )
-                    body_world_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 2] = (
-                        landmark_data.z * image_width
-                    )
-
-            # get Right Hand data
-            if frame_results.right_hand_landmarks is not None:
-                for landmark_number, landmark_data in enumerate(frame_results.right_hand_landmarks.landmark):
-                    rightHand_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 0] = (
-                        landmark_data.x * image_width
-                    )
-                    rightHand_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 1] = (
-                        landmark_data.y * image_height
-                    )
-                    rightHand_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 2] = (
-                        landmark_data.z * image_width
-                    )
-
-            # get Left Hand data
-            if frame_results.left_hand_landmarks is not None:
-                for landmark_number, landmark_data in enumerate(frame_results.left_hand_landmarks.landmark):
-                    leftHand_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 0] = (
-                        landmark_data.x * image_width
-                    )
-                    leftHand_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 1] = (
-                        landmark_data.y * image_height
-                    )
-                    leftHand_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 2] = (
-                        landmark_data.z * image_width
-                    )
-
-            # get Face data
-            if frame_results.face_landmarks is not None:
-                for landmark_number, landmark_data in enumerate(frame_results.face_landmarks.landmark):
-                    face_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 0] = (
-                        landmark_data.x * image_width
-                    )
-                    face_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 1] = (
-                        landmark_data.y * image_height
-                    )
-                    face_frameNumber_trackedPointNumber_XYZ[frame_number, landmark_number, 2] = (
-                        landmark_data.z * image_width
-                    )
+    @staticmethod
+    def _flush_npy_arrays(mediapipe_npy_arrays: Mediapipe2dNumpyArrays):
+        for array in [
+            mediapipe_npy_arrays.data2d_frameNumber_trackedPointNumber_XYZ,
+            mediapipe_npy_arrays.body_world_frameNumber_trackedPointNumber_XYZ,
+            mediapipe_npy_arrays.body_frameNumber_trackedPointNumber_confidence,
+        ]:
+            if isinstance(array, np.memmap):
+                array.flush()
 
-            # check if all tracked points are visible on this frame
-            all_body_visible = all(sum(np.isnan(body_frameNumber_trackedPointNumber_XYZ[frame_number, :, :])) == 0)
-            all_body_tracked_points_visible_on_frame_bool_list.append(all_body_visible)
+    @staticmethod
+    def _get_pixel_landmarks_XYZ(
+        pose_estimator_results: PoseEstimatorResults,
+        batch_index: int,
+        region_of_interest: Tuple[int, int, int, int],
+    ) -> np.ndarray:
+        """Maps one image's landmarks, normalized to the tracked region, back to full image pixel coordinates"""
+        x_start, y_start, x_end, y_end = region_of_interest
+        # z is on roughly the same scale as x, according to mediapipe docs
+        pixel_scale_XYZ = np.array([x_end - x_start, y_end - y_start, x_end - x_start], dtype=np.float64)
+        pixel_offset_XYZ = np.array([x_start, y_start, 0], dtype=np.float64)
+        return pose_estimator_results.landmarks_XYZ[batch_index] * pixel_scale_XYZ + pixel_offset_XYZ
+
+    @classmethod
+    def _add_pose_estimator_results_to_npy_arrays(
+        cls,
+        mediapipe_npy_arrays: Mediapipe2dNumpyArrays,
+        frame_number: int,
+        pose_estimator_results: PoseEstimatorResults,
+        batch_index: int,
+        image_width: Union[int, float],
+        image_height: Union[int, float],
+        region_of_interest: Optional[Tuple[int, int, int, int]] = None,
+    ):
+        if region_of_interest is None:
+            region_of_interest = (0, 0, image_width, image_height)
 
-            all_right_hand_visible = all(
-                sum(np.isnan(rightHand_frameNumber_trackedPointNumber_XYZ[frame_number, :, :])) == 0
+        mediapipe_npy_arrays.data2d_frameNumber_trackedPointNumber_XYZ[frame_number] = cls._get_pixel_landmarks_XYZ(
+            pose_estimator_results=pose_estimator_results,
+            batch_index=batch_index,
+            region_of_interest=region_of_interest,
+        )
+        mediapipe_npy_arrays.body_frameNumber_trackedPointNumber_confidence[frame_number] = pose_estimator_results.body_confidences[batch_index]
+        if pose_estimator_results.body_world_XYZ is not None:
+            world_pixel_scale_XYZ = np.array([image_width, image_height, image_width], dtype=np.float64)
+            mediapipe_npy_arrays.body_world_frameNumber_trackedPointNumber_XYZ[frame_number] = (
+                pose_estimator_results.body_world_XYZ[batch_index] * world_pixel_scale_XYZ
             )
-            all_right_hand_points_visible_on_frame_bool_list.append(all_right_hand_visible)
 
-            all_left_hand_visible = all(
-                sum(np.isnan(leftHand_frameNumber_trackedPointNumber_XYZ[frame_number, :, :])) == 0
-            )
-            all_left_hand_points_visible_on_frame_bool_list.append(all_left_hand_visible)
+    @classmethod
+    def _add_mediapipe_results_to_npy_arrays(
+        cls,
+        mediapipe_npy_arrays: Mediapipe2dNumpyArrays,
+        frame_number: int,
+        frame_results,
+        image_width: Union[int, float],
+        image_height: Union[int, float],
+        region_of_interest: Optional[Tuple[int, int, int, int]] = None,
+    ):
+        """Adds one raw mediapipe holistic (or pose) result, laid out to fit whichever landmark groups the arrays have"""
+        landmark_group_slices = {}
+        first_index = 0
+        for landmark_group, frameNumber_trackedPointNumber_XYZ in [
+            ("body", mediapipe_npy_arrays.body_frameNumber_trackedPointNumber_XYZ),
+            ("right_hand", mediapipe_npy_arrays.rightHand_frameNumber_trackedPointNumber_XYZ),
+            ("left_hand", mediapipe_npy_arrays.leftHand_frameNumber_trackedPointNumber_XYZ),
+            ("face", mediapipe_npy_arrays.face_frameNumber_trackedPointNumber_XYZ),
+        ]:
+            # groups that aren't tracked have zero width arrays
+            if frameNumber_trackedPointNumber_XYZ.shape[1] > 0:
+                landmark_group_slices[landmark_group] = slice(first_index, first_index + frameNumber_trackedPointNumber_XYZ.shape[1])
+            first_index += frameNumber_trackedPointNumber_XYZ.shape[1]
+
+        pose_estimator_results = mediapipe_results_to_pose_estimator_results(
+            mediapipe_results_list=[frame_results],
+            pose_estimator_results=PoseEstimatorResults.empty(batch_size=1, number_of_tracked_points=first_index),
+            landmark_group_slices=landmark_group_slices,
+        )
+        cls._add_pose_estimator_results_to_npy_arrays(
+            mediapipe_npy_arrays=mediapipe_npy_arrays,
+            frame_number=frame_number,
+            pose_estimator_results=pose_estimator_results,
+            batch_index=0,
+            image_width=image_width,
+            image_height=image_height,
+            region_of_interest=region_of_interest,
+        )
+
+    @staticmethod
+    def _threshold_body_by_confidence(
+        mediapipe_npy_arrays: Mediapipe2dNumpyArrays,
+        frame_number: int,
+        confidence_threshold: float,
+    ):
+        """NaN out the body points on this frame whose confidence (mediapipe's 'visibility') is below `confidence_threshold`"""
+        below_threshold = mediapipe_npy_arrays.body_frameNumber_trackedPointNumber_confidence[frame_number] < confidence_threshold
+        mediapipe_npy_arrays.body_frameNumber_trackedPointNumber_XYZ[frame_number, below_threshold, :] = np.nan
 
-            all_face_visible = all(sum(np.isnan(face_frameNumber_trackedPointNumber_XYZ[frame_number, :, :])) == 0)
-            all_face_points_visible_on_frame_bool_list.append(all_face_visible)
+    def _mediapipe_results_list_to_npy_arrays(
+        self,
+        mediapipe_results_list: List,
+        image_width: Union[int, float],
+        image_height: Union[int, float],
+    ) -> Mediapipe2dNumpyArrays:
+        mediapipe_npy_arrays = self._initialize_npy_arrays(number_of_frames=len(mediapipe_results_list))
 
-            all_points_visible = all(
-                [
-                    all_body_visible,
-                    all_right_hand_visible,
-                    all_left_hand_visible,
-                    all_face_visible,
-                ],
+        for frame_number, frame_results in enumerate(mediapipe_results_list):
+            self._add_mediapipe_results_to_npy_arrays(
+                mediapipe_npy_arrays=mediapipe_npy_arrays,
+                frame_number=frame_number,
+                frame_results=frame_results,
+                image_width=image_width,
+                image_height=image_height,
             )
 
-            all_tracked_points_visible_on_frame_list.append(all_points_visible)
-
-        return Mediapipe2dNumpyArrays(
-            body_frameNumber_trackedPointNumber_XYZ=np.squeeze(body_frameNumber_trackedPointNumber_XYZ),
-            body_world_frameNumber_trackedPointNumber_XYZ=np.squeeze(body_world_frameNumber_trackedPointNumber_XYZ),
-            rightHand_frameNumber_trackedPointNumber_XYZ=np.squeeze(rightHand_frameNumber_trackedPointNumber_XYZ),
-            leftHand_frameNumber_trackedPointNumber_XYZ=np.squeeze(leftHand_frameNumber_trackedPointNumber_XYZ),
-            face_frameNumber_trackedPointNumber_XYZ=np.squeeze(face_frameNumber_trackedPointNumber_XYZ),
-            body_frameNumber_trackedPointNumber_confidence=np.squeeze(body_frameNumber_trackedPointNumber_confidence),
-        )
\ No newline at end of file
+        logger.debug(
+            f"All tracked points visible on {np.sum(mediapipe_npy_arrays.all_tracked_points_visible_on_frame)} "
+            f"of {len(mediapipe_results_list)} frames"
+        )
+        return mediapipe_npy_arrays
@@ -0,0 +1,223 @@
+import logging
+logger = logging.getLogger(__name__)
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.data_models.mediapipe_skeleton_names_and_connections import (
+    get_mediapipe_landmark_group_slices,
+    mediapipe_body_connections,
+    mediapipe_face_connections,
+    mediapipe_hand_connections,
+    MEDIAPIPE_LANDMARK_GROUPS,
+)
+from src.system.paths_and_filenames.folder_and_filenames import (
+    ANNOTATED_VIDEOS_FOLDER_NAME,
+    MEDIAPIPE_2D_NPY_FILENAME,
+    OUTPUT_DATA_FOLDER_NAME,
+    RAW_DATA_FOLDER_NAME,
+    SYNCHRONIZED_VIDEOS_FOLDER_NAME,
+)
+from src.utilities.number_of_processes import get_number_of_processes
+from src.utilities.video import get_video_paths
+
+# BGR
+landmark_group_colors = {
+    "body": (0, 200, 0),
+    "right_hand": (200, 100, 0),
+    "left_hand": (0, 100, 200),
+    "face": (200, 200, 200),
+}
+landmark_group_connections = {
+    "body": mediapipe_body_connections,
+    "right_hand": mediapipe_hand_connections,
+    "left_hand": mediapipe_hand_connections,
+    "face": mediapipe_face_connections,
+}
+
+
+def render_annotated_videos(
+    synchronized_videos_folder_path: Union[str, Path],
+    mediapipe_2d_data_npy_file_path: Union[str, Path],
+    output_data_folder_path: Union[str, Path],
+    camera_indices: Optional[Sequence[int]] = None,
+    landmark_groups: Sequence[str] = MEDIAPIPE_LANDMARK_GROUPS,
+    max_number_of_processes: Optional[int] = None,
+    include_hands: bool = True,
+    include_face: bool = True,
+) -> List[Path]:
+    """
+    Draws the saved 2d mediapipe data onto the synchronized videos, for when annotated videos were skipped or deferred
+    during skeleton detection. Only the cameras in `camera_indices` (all of them if None) are rendered, one per process.
+    `include_hands` and `include_face` say which landmark groups the data was tracked with
+    """
+    video_paths = get_video_paths(video_folder=synchronized_videos_folder_path)
+    if camera_indices is None:
+        camera_indices = list(range(len(video_paths)))
+
+    # memory map the data so each worker only reads its own camera
+    data2d_numCams_numFrames_numTrackedPts_XYZ = np.load(str(mediapipe_2d_data_npy_file_path), mmap_mode="r")
+    if data2d_numCams_numFrames_numTrackedPts_XYZ.shape[0] != len(video_paths):
+        raise ValueError(
+            f"2d data has {data2d_numCams_numFrames_numTrackedPts_XYZ.shape[0]} cameras "
+            f"but there are {len(video_paths)} videos in {synchronized_videos_folder_path}"
+        )
+
+    number_of_processes = get_number_of_processes(len(camera_indices), max_number_of_processes)
+    logger.info(f"Rendering annotated videos for cameras {list(camera_indices)} using {number_of_processes} processes")
+
+    with ProcessPoolExecutor(max_workers=number_of_processes) as executor:
+        futures = [
+            executor.submit(
+                render_annotated_video,
+                video_paths[camera_index],
+                mediapipe_2d_data_npy_file_path,
+                camera_index,
+                get_annotated_video_save_path(
+                    video_file_path=video_paths[camera_index],
+                    output_data_folder_path=output_data_folder_path,
+                ),
+                landmark_groups,
+                include_hands,
+                include_face,
+            )
+            for camera_index in camera_indices
+        ]
+        return [future.result() for future in futures]
+
+
+def render_annotated_video(
+    video_file_path: Union[str, Path],
+    mediapipe_2d_data_npy_file_path: Union[str, Path],
+    camera_index: int,
+    annotated_video_save_path: Union[str, Path],
+    landmark_groups: Sequence[str] = MEDIAPIPE_LANDMARK_GROUPS,
+    include_hands: bool = True,
+    include_face: bool = True,
+) -> Path:
+    return render_annotated_video_from_array(
+        video_file_path=video_file_path,
+        data2d_numFrames_numTrackedPts_XYZ=np.load(str(mediapipe_2d_data_npy_file_path), mmap_mode="r")[camera_index],
+        annotated_video_save_path=annotated_video_save_path,
+        landmark_groups=landmark_groups,
+        include_hands=include_hands,
+        include_face=include_face,
+    )
+
+
+def render_annotated_video_from_array(
+    video_file_path: Union[str, Path],
+    data2d_numFrames_numTrackedPts_XYZ: np.ndarray,
+    annotated_video_save_path: Union[str, Path],
+    landmark_groups: Sequence[str] = MEDIAPIPE_LANDMARK_GROUPS,
+    include_hands: bool = True,
+    include_face: bool = True,
+) -> Path:
+    landmark_group_slices = get_mediapipe_landmark_group_slices(
+        include_hands=include_hands,
+        include_face=include_face,
+        number_of_tracked_points=data2d_numFrames_numTrackedPts_XYZ.shape[1],
+    )
+    # groups that weren't tracked have nothing to draw
+    landmark_groups = [landmark_group for landmark_group in landmark_groups if landmark_group in landmark_group_slices]
+
+    cap = cv2.VideoCapture(str(video_file_path))
+    video_writer = cv2.VideoWriter(
+        str(annotated_video_save_path),
+        cv2.VideoWriter_fourcc(*"mp4v"),
+        cap.get(cv2.CAP_PROP_FPS),
+        (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))),
+    )
+    logger.info(f"Rendering annotated video: {annotated_video_save_path}")
+
+    try:
+        for frame_number in range(data2d_numFrames_numTrackedPts_XYZ.shape[0]):
+            success, image = cap.read()
+            if not success or image is None:
+                break
+            draw_landmark_groups(
+                image=image,
+                points_XY=np.asarray(data2d_numFrames_numTrackedPts_XYZ[frame_number, :, :2]),
+                landmark_group_slices=landmark_group_slices,
+                landmark_groups=landmark_groups,
+            )
+            video_writer.write(image)
+    finally:
+        cap.release()
+        video_writer.release()
+
+    return Path(annotated_video_save_path)
+
+
+def get_annotated_video_save_path(
+    video_file_path: Union[str, Path],
+    output_data_folder_path: Union[str, Path],
+    chunk_index: Optional[int] = None,
+) -> Path:
+    annotated_video_path = Path(output_data_folder_path) / ANNOTATED_VIDEOS_FOLDER_NAME
+    annotated_video_path.mkdir(exist_ok=True, parents=True)
+    if chunk_index is None:
+        annotated_video_name = Path(video_file_path).stem + "_mediapipe.mp4"
+    else:
+        annotated_video_name = Path(video_file_path).stem + f"_mediapipe_chunk{chunk_index:03d}.mp4"
+    return annotated_video_path / annotated_video_name
+
+
+def draw_landmark_groups(
+    image: np.ndarray,
+    points_XY: np.ndarray,
+    landmark_group_slices: Dict[str, slice],
+    landmark_groups: Sequence[str],
+):
+    """Draws one frame's [number_of_tracked_points, XY] pixel points, for each of `landmark_groups` that was tracked"""
+    for landmark_group in landmark_groups:
+        if landmark_group not in landmark_group_slices:
+            continue
+        draw_landmark_group(
+            image=image,
+            points_XY=points_XY[landmark_group_slices[landmark_group]],
+            connections=landmark_group_connections[landmark_group],
+            color=landmark_group_colors[landmark_group],
+            draw_points=landmark_group != "face",
+        )
+
+
+def draw_landmark_group(
+    image: np.ndarray,
+    points_XY: np.ndarray,
+    connections: Sequence,
+    color: tuple,
+    draw_points: bool = True,
+):
+    visible = ~np.isnan(points_XY).any(axis=1)
+    if not visible.any():
+        return
+
+    pixel_points_XY = np.zeros(points_XY.shape, dtype=np.int64)
+    pixel_points_XY[visible] = np.round(points_XY[visible])
+    pixel_points_XY = pixel_points_XY.tolist()
+
+    number_of_points = points_XY.shape[0]
+    for start_index, end_index in connections:
+        if start_index < number_of_points and end_index < number_of_points and visible[start_index] and visible[end_index]:
+            cv2.line(image, tuple(pixel_points_XY[start_index]), tuple(pixel_points_XY[end_index]), color, 1)
+
+    if draw_points:
+        for point_index in np.flatnonzero(visible):
+            cv2.circle(image, tuple(pixel_points_XY[point_index]), 2, color, -1)
+
+
+if __name__ == "__main__":
+    session_folder_path = Path(r"C:\Users\jonma\freemocap_data\session_10-15-2022-09_50_10")
+
+    render_annotated_videos(
+        synchronized_videos_folder_path=session_folder_path / SYNCHRONIZED_VIDEOS_FOLDER_NAME,
+        mediapipe_2d_data_npy_file_path=session_folder_path / OUTPUT_DATA_FOLDER_NAME / RAW_DATA_FOLDER_NAME / MEDIAPIPE_2D_NPY_FILENAME,
+        output_data_folder_path=session_folder_path / OUTPUT_DATA_FOLDER_NAME / RAW_DATA_FOLDER_NAME,
+        camera_indices=[0],
+        landmark_groups=["body", "right_hand", "left_hand"],
+    )
@@ -0,0 +1,198 @@
+import logging
+logger = logging.getLogger(__name__)
+
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.data_models.mediapipe_skeleton_names_and_connections import (
+    mediapipe_body_landmark_names,
+)
+from src.core_processes.processing_2d.pose_estimator import PoseEstimator, PoseEstimatorResults
+from src.data_layer.session_models.post_processing_parameter_models import OnnxPoseParametersModel
+
+coco_17_keypoint_names = [
+    "nose",
+    "left_eye",
+    "right_eye",
+    "left_ear",
+    "right_ear",
+    "left_shoulder",
+    "right_shoulder",
+    "left_elbow",
+    "right_elbow",
+    "left_wrist",
+    "right_wrist",
+    "left_hip",
+    "right_hip",
+    "left_knee",
+    "right_knee",
+    "left_ankle",
+    "right_ankle",
+]
+
+# a guess at the peak activation memory of a top-down pose network per byte of its input, only used to size batches
+ONNX_ACTIVATION_BYTES_PER_INPUT_BYTE = 16
+
+keypoint_format_names = {
+    "coco17": coco_17_keypoint_names,
+}
+
+
+class OnnxPoseEstimator(PoseEstimator):
+    """
+    A single person 2d pose model run with ONNX Runtime on the CPU, e.g. a SimpleBaseline/HRNet/ViTPose style COCO
+    model exported to ONNX. Frames are letterboxed to the model's input size and a whole batch goes through one
+    `InferenceSession.run`. The model's keypoints are put in the mediapipe body slots with the same names; mediapipe
+    body points the model doesn't have (and the hands and face) stay NaN. Keypoint scores are divided by
+    `score_normalization` and clipped to [0, 1] to give the body confidences, which the skeleton detector thresholds
+    with `score_threshold` rather than mediapipe's `landmark_confidence_threshold`
+    """
+
+    name = "onnx"
+    supports_batching = True
+
+    def __init__(self, parameter_model: OnnxPoseParametersModel, landmark_group_slices: Dict[str, slice]):
+        super().__init__(landmark_group_slices=landmark_group_slices)
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The onnx pose estimator backend needs `onnxruntime`, install it with `pip install onnxruntime`") from e
+
+        if parameter_model.model_path is None or not Path(parameter_model.model_path).is_file():
+            raise FileNotFoundError(f"Could not find the onnx pose model at: {parameter_model.model_path}")
+        if parameter_model.keypoint_format not in keypoint_format_names:
+            raise ValueError(f"Unknown keypoint format {parameter_model.keypoint_format}, expected one of {list(keypoint_format_names)}")
+        if parameter_model.output_format not in ["heatmaps", "keypoints"]:
+            raise ValueError(f"Unknown output format {parameter_model.output_format}, expected 'heatmaps' or 'keypoints'")
+        if parameter_model.score_normalization <= 0:
+            raise ValueError(f"The onnx score normalization must be positive, got {parameter_model.score_normalization}")
+
+        self._parameter_model = parameter_model
+        self._mediapipe_body_indices = np.array(
+            [mediapipe_body_landmark_names.index(name) for name in keypoint_format_names[parameter_model.keypoint_format]]
+        )
+        self._input_mean = np.array(parameter_model.input_mean, dtype=np.float32)
+        self._input_std = np.array(parameter_model.input_std, dtype=np.float32)
+
+        if len(self.landmark_groups) > 1:
+            logger.warning(
+                f"The onnx pose model only has body keypoints, the {self.landmark_groups[1:]} points will all be NaN. "
+                f"Turn off `include_hands`/`include_face` to not store them"
+            )
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = parameter_model.intra_op_num_threads
+        session_options.inter_op_num_threads = 1
+        session_options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = onnxruntime.InferenceSession(
+            str(parameter_model.model_path),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        # models exported with a fixed batch size get their batches padded (or split) to that size
+        self._model_batch_size = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        logger.info(
+            f"Loaded onnx pose model {parameter_model.model_path} with input {model_input.name} {model_input.shape} "
+            f"({parameter_model.intra_op_num_threads or 'default'} intra-op threads)"
+        )
+
+    def detect(self, images: Sequence[np.ndarray]) -> PoseEstimatorResults:
+        pose_estimator_results = self._empty_results(batch_size=len(images))
+        run_size = self._model_batch_size or max(len(images), 1)
+
+        for first_image_index in range(0, len(images), run_size):
+            run_images = images[first_image_index : first_image_index + run_size]
+            input_batch, letterbox_scales, letterbox_offsets_XY = self._preprocess(run_images, batch_size=run_size)
+            model_output = self._session.run(None, {self._input_name: input_batch})[0][: len(run_images)]
+            keypoints_XY, keypoint_scores = self._decode(model_output)
+
+            # undo the letterbox, then normalize to each image like mediapipe does
+            image_sizes_XY = np.array([image.shape[1::-1] for image in run_images], dtype=np.float64)
+            keypoints_XY = (keypoints_XY - letterbox_offsets_XY[:, None, :]) / letterbox_scales[:, None, None]
+            keypoints_XY /= image_sizes_XY[:, None, :]
+
+            run_slice = slice(first_image_index, first_image_index + len(run_images))
+            pose_estimator_results.landmarks_XYZ[run_slice, self._mediapipe_body_indices, :2] = keypoints_XY
+            pose_estimator_results.landmarks_XYZ[run_slice, self._mediapipe_body_indices, 2] = 0.0
+            pose_estimator_results.body_confidences[run_slice, self._mediapipe_body_indices] = np.clip(
+                keypoint_scores / self._parameter_model.score_normalization, 0.0, 1.0
+            )
+
+        return pose_estimator_results
+
+    def get_working_bytes_per_image(self, image_width: int, image_height: int) -> int:
+        # the resized and normalized copies of the image, its slot in the float32 input batch, and the model's
+        # activations, which for these networks are some multiple of the input
+        input_bytes = 3 * self._parameter_model.input_width * self._parameter_model.input_height * np.dtype(np.float32).itemsize
+        return 3 * input_bytes + ONNX_ACTIVATION_BYTES_PER_INPUT_BYTE * input_bytes
+
+    def _preprocess(self, images: Sequence[np.ndarray], batch_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Letterboxes, color converts and normalizes the images into one NCHW float32 batch"""
+        input_width = self._parameter_model.input_width
+        input_height = self._parameter_model.input_height
+        input_batch = np.zeros((batch_size, 3, input_height, input_width), dtype=np.float32)
+        letterbox_scales = np.empty(len(images))
+        letterbox_offsets_XY = np.empty((len(images), 2))
+
+        for image_index, image in enumerate(images):
+            image_height, image_width = image.shape[:2]
+            scale = min(input_width / image_width, input_height / image_height)
+            resized_width = max(1, round(image_width * scale))
+            resized_height = max(1, round(image_height * scale))
+            offset_x = (input_width - resized_width) // 2
+            offset_y = (input_height - resized_height) // 2
+
+            resized_image = cv2.resize(image, (resized_width, resized_height), interpolation=cv2.INTER_LINEAR)
+            if self._parameter_model.input_color_order == "RGB":
+                resized_image = cv2.cvtColor(resized_image, cv2.COLOR_BGR2RGB)
+            normalized_image = (resized_image.astype(np.float32) - self._input_mean) / self._input_std
+            input_batch[image_index, :, offset_y : offset_y + resized_height, offset_x : offset_x + resized_width] = normalized_image.transpose(2, 0, 1)
+
+            letterbox_scales[image_index] = scale
+            letterbox_offsets_XY[image_index] = (offset_x, offset_y)
+
+        return input_batch, letterbox_scales, letterbox_offsets_XY
+
+    def _decode(self, model_output: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """The model's keypoints as [batch, keypoints, XY] in model input pixels, and their [batch, keypoints] scores"""
+        number_of_keypoints = len(self._mediapipe_body_indices)
+        if model_output.shape[1] != number_of_keypoints:
+            raise ValueError(
+                f"Onnx pose model gave {model_output.shape[1]} keypoints, "
+                f"expected {number_of_keypoints} for {self._parameter_model.keypoint_format}"
+            )
+
+        if self._parameter_model.output_format == "keypoints":
+            return model_output[..., :2].astype(np.float64), model_output[..., 2].astype(np.float64)
+
+        batch_size, _, heatmap_height, heatmap_width = model_output.shape
+        flat_heatmaps = model_output.reshape(batch_size, number_of_keypoints, -1)
+        peak_indices = flat_heatmaps.argmax(axis=2)
+        keypoint_scores = np.take_along_axis(flat_heatmaps, peak_indices[..., None], axis=2)[..., 0].astype(np.float64)
+        peak_y, peak_x = np.divmod(peak_indices, heatmap_width)
+
+        # shift a quarter pixel towards the higher neighbour, as SimpleBaseline does
+        batch_indices, keypoint_indices = np.indices((batch_size, number_of_keypoints))
+        shift_x = np.sign(
+            model_output[batch_indices, keypoint_indices, peak_y, np.minimum(peak_x + 1, heatmap_width - 1)]
+            - model_output[batch_indices, keypoint_indices, peak_y, np.maximum(peak_x - 1, 0)]
+        )
+        shift_y = np.sign(
+            model_output[batch_indices, keypoint_indices, np.minimum(peak_y + 1, heatmap_height - 1), peak_x]
+            - model_output[batch_indices, keypoint_indices, np.maximum(peak_y - 1, 0), peak_x]
+        )
+
+        keypoints_XY = np.stack(
+            [
+                (peak_x + 0.25 * shift_x) * self._parameter_model.input_width / heatmap_width,
+                (peak_y + 0.25 * shift_y) * self._parameter_model.input_height / heatmap_height,
+            ],
+            axis=-1,
+        )
+        return keypoints_XY, keypoint_scores
@@ -0,0 +1,87 @@
+import logging
+logger = logging.getLogger(__name__)
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.data_models.mediapipe_skeleton_names_and_connections import (
+    NUMBER_OF_MEDIAPIPE_BODY_MARKERS,
+)
+
+POSE_ESTIMATOR_BACKENDS = ["mediapipe", "onnx"]
+
+
+@dataclass
+class PoseEstimatorResults:
+    """
+    Landmarks for a batch of images, laid out along the tracked point axis like the mediapipe 2d data (body, then the
+    hands and face if they are tracked - see `get_mediapipe_landmark_group_slices`). Points that weren't found are NaN
+    """
+
+    # [batch, number_of_tracked_points, XYZ], x and y normalized to the width and height of each image, z on the scale of x
+    landmarks_XYZ: np.ndarray
+    # [batch, number_of_body_points]
+    body_confidences: np.ndarray
+    # [batch, number_of_body_points, XYZ] in the estimator's world units, None if it doesn't estimate them
+    body_world_XYZ: Optional[np.ndarray] = None
+    # the estimator's own output for each image, if it has a nicer way to draw it than plain landmarks
+    raw_results: Optional[list] = None
+
+    @property
+    def batch_size(self) -> int:
+        return self.landmarks_XYZ.shape[0]
+
+    def select(self, batch_index: int) -> "PoseEstimatorResults":
+        """One image's results, as a batch of one that views this batch's arrays"""
+        batch_slice = slice(batch_index, batch_index + 1)
+        return PoseEstimatorResults(
+            landmarks_XYZ=self.landmarks_XYZ[batch_slice],
+            body_confidences=self.body_confidences[batch_slice],
+            body_world_XYZ=self.body_world_XYZ[batch_slice] if self.body_world_XYZ is not None else None,
+            raw_results=self.raw_results[batch_slice] if self.raw_results is not None else None,
+        )
+
+    @classmethod
+    def empty(cls, batch_size: int, number_of_tracked_points: int) -> "PoseEstimatorResults":
+        return cls(
+            landmarks_XYZ=np.full((batch_size, number_of_tracked_points, 3), np.nan),
+            body_confidences=np.full((batch_size, NUMBER_OF_MEDIAPIPE_BODY_MARKERS), np.nan),
+        )
+
+
+class PoseEstimator(ABC):
+    """
+    A 2d pose estimator the skeleton detector can run on video frames. `detect` is given a batch of BGR images, always
+    in video order (trackers may carry state from one call to the next), and returns landmarks in the mediapipe layout
+    for the `landmark_groups` being tracked, so everything downstream of 2d detection is the same for every backend.
+    Backends that run a whole batch through their model in one call set `supports_batching`. Backends must implement
+    `detect`, and can't be constructed until they do
+    """
+
+    name = ""
+    supports_batching = False
+
+    def __init__(self, landmark_group_slices: Dict[str, slice]):
+        self._landmark_group_slices = landmark_group_slices
+        self._number_of_tracked_points = max(landmark_group_slice.stop for landmark_group_slice in landmark_group_slices.values())
+
+    @property
+    def landmark_groups(self) -> List[str]:
+        return list(self._landmark_group_slices.keys())
+
+    @abstractmethod
+    def detect(self, images: Sequence[np.ndarray]) -> PoseEstimatorResults:
+        ...
+
+    def close(self):
+        pass
+
+    def get_working_bytes_per_image(self, image_width: int, image_height: int) -> int:
+        """Roughly how much memory the estimator needs for each image of a batch, on top of the image itself"""
+        return 0
+
+    def _empty_results(self, batch_size: int) -> PoseEstimatorResults:
+        return PoseEstimatorResults.empty(batch_size=batch_size, number_of_tracked_points=self._number_of_tracked_points)
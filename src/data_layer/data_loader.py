@@ -39,6 +39,10 @@ class DataLoader():
         self._output_folder_path = Path(get_output_data_folder_path(self._session_folder_path))
         self._include_hands = include_hands
         self._include_face = include_face
+        # stay None for the groups that weren't tracked
+        self._right_hand_dataframe = None
+        self._left_hand_dataframe = None
+        self._face_dataframe = None
 
         self._load_data()
 
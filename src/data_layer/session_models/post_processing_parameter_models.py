@@ -1,6 +1,8 @@
 import logging
 logger = logging.getLogger(__name__)
 
+from typing import Dict, List, Optional
+
 from pydantic import BaseModel
 from src.data_layer.session_models.session_info_model import SessionInfoModel
 
@@ -9,13 +11,61 @@ class MediapipeParametersModel(BaseModel):
     mediapipe_model_complexity: int = 2
     min_detection_confidence: float = 0.5
     min_tracking_confidence: float = 0.5
+    landmark_confidence_threshold: float = 0.5
     static_image_mode: bool = False
+    include_hands: bool = True
+    include_face: bool = True  # the body is always tracked, untracked groups aren't computed or stored anywhere
+    detector_backend: str = "mediapipe"  # or "onnx", configured by the OnnxPoseParametersModel
     skip_2d_image_tracking: bool = False
+    use_2d_detection_cache: bool = True
+    checkpoint_2d_detection: bool = True
+    checkpoint_interval_frames: int = 500
+    frame_stride: int = 1
+    interpolate_skipped_frames: bool = True
+    regions_of_interest: Dict[str, List[int]] = {}  # video file stem -> [x, y, width, height] in pixels
+    inference_downscale_factor: float = 1.0
+    stream_landmarks_to_disk: bool = False  # detect into .npy memmaps in the output folder rather than RAM (checkpoints always do)
+    output_memmap_threshold_megabytes: Optional[int] = 2048  # bigger 2d outputs are written straight to disk, None never
+    max_number_of_processes: Optional[int] = None
+    number_of_chunks_per_video: Optional[int] = 1  # None splits videos until every process has a chunk
+    chunk_warmup_frames: int = 10
+    use_threaded_pipeline: bool = True
+    pipeline_queue_depth: int = 8
+    inference_batch_size: int = 1  # frames per inference call for backends that batch (onnx), 0 sizes batches to fit in memory
+    inference_batch_memory_fraction: float = 0.25  # share of available memory a process's batches may use when sized automatically
+    max_inference_batch_size: int = 64
+    render_annotated_videos: bool = True
+    defer_annotated_video_rendering: bool = False  # render later from the saved 2d data with render_annotated_videos.py
+    annotated_landmark_groups: List[str] = ["body", "right_hand", "left_hand", "face"]
+    annotated_video_camera_indices: Optional[List[int]] = None  # cameras to render after a deferred run, None skips it
+
+class OnnxPoseParametersModel(BaseModel):
+    model_path: Optional[str] = None
+    keypoint_format: str = "coco17"
+    output_format: str = "heatmaps"  # or "keypoints", [batch, keypoints, (x, y, score)] in model input pixels
+    input_width: int = 192
+    input_height: int = 256
+    input_color_order: str = "RGB"
+    input_mean: List[float] = [123.675, 116.28, 103.53]
+    input_std: List[float] = [58.395, 57.12, 57.375]
+    intra_op_num_threads: int = 0  # 0 lets onnxruntime decide
+    # heatmap peaks (or the model's own scores) aren't on the scale of mediapipe's visibility, so they are divided by
+    # this and clipped to [0, 1] before being stored and used as triangulation weights
+    score_normalization: float = 1.0
+    score_threshold: float = 0.3  # normalized scores under this are set to NaN, in place of landmark_confidence_threshold
 
 class AniposeTriangulate3DParametersModel(BaseModel):
     confidence_threshold_cutoff: float = 0.5
     use_triangulate_ransac_method: bool = False
     skip_3d_triangulation: bool = False
+    use_multiprocessing: bool = False
+    number_of_points_per_chunk: int = 2**16  # [frames * tracked points] triangulated per worker task
+    max_number_of_processes: Optional[int] = None
+    number_of_frames_per_block: Optional[int] = None  # memory maps the 3d stage in blocks of this many frames, None loads it all
+    use_reprojection_error_filtering: bool = False  # re-triangulate points over median + k * MAD error leaving out each camera in turn, keeping the best drop
+    reprojection_error_threshold_number_of_mads: float = 3.0  # the k above
+    reprojection_error_filtering_min_cams: int = 2
+    use_confidence_weighted_triangulation: bool = False  # weight each camera by its 2d confidence, dropping views under the cut-off
 
 class ButterworthFilterParametersModel(BaseModel):
     sampling_rate: float = 30
@@ -31,8 +81,10 @@ class PostProcessingParametersModel(BaseModel):
 class PostProcessingParameterModel(BaseModel):
     session_info_model: SessionInfoModel = None
     mediapipe_parameters_model: MediapipeParametersModel = MediapipeParametersModel()
+    onnx_pose_parameters_model: OnnxPoseParametersModel = OnnxPoseParametersModel()
     anipose_triangulate_3d_parameters_model: AniposeTriangulate3DParametersModel = AniposeTriangulate3DParametersModel()
     post_processing_parameters_model: PostProcessingParametersModel = PostProcessingParametersModel()
+    storage_dtype: str = "float64"  # or "float32", for the 2d, 3d, reprojection error and center of mass arrays
 
     class Config:
         arbitrary_types_allowed: bool = True
\ No newline at end of file
@@ -12,6 +12,7 @@ from src.system.paths_and_filenames.folder_and_filenames import (
     OUTPUT_DATA_FOLDER_NAME,
     RAW_DATA_FOLDER_NAME,
     MEDIAPIPE_2D_NPY_FILENAME,
+    MEDIAPIPE_2D_CONFIDENCE_NPY_FILENAME,
     RAW_MEDIAPIPE_3D_NPY_FILENAME,
     MEDIAPIPE_3D_NPY_FILENAME,
     MEDIAPIPE_REPROJECTION_ERROR_NPY_FILENAME
@@ -83,6 +84,10 @@ class SessionInfoModel:
     @property
     def mediapipe_2d_data_npy_file_path(self) -> Path:
         return Path(self._path) / OUTPUT_DATA_FOLDER_NAME / RAW_DATA_FOLDER_NAME / MEDIAPIPE_2D_NPY_FILENAME
+
+    @property
+    def mediapipe_2d_confidence_npy_file_path(self) -> Path:
+        return Path(self._path) / OUTPUT_DATA_FOLDER_NAME / RAW_DATA_FOLDER_NAME / MEDIAPIPE_2D_CONFIDENCE_NPY_FILENAME
     
     @property
     def mediapipe_3d_data_npy_file_path(self) -> Path:
@@ -18,6 +18,10 @@ BUTTERWORTH_FILTER_TREE_NAME = "Butterworth Filter"
 
 USE_RANSAC_METHOD = "Use RANSAC Method"
 
+USE_REPROJECTION_ERROR_FILTERING = "Filter High Reprojection Error"
+
+USE_CONFIDENCE_WEIGHTED_TRIANGULATION = "Weight By Confidence"
+
 ANIPOSE_CONFIDENCE_CUTOFF = "Confidence Threshold Cut-off"
 
 ANIPOSE_TREE_NAME = "Anipose Triangulation"
@@ -28,8 +32,14 @@ MINIUMUM_TRACKING_CONFIDENCE = "Minimum Tracking Confidence"
 
 MINIMUM_DETECTION_CONFIDENCE = "Minimum Detection Confidence"
 
+LANDMARK_CONFIDENCE_THRESHOLD = "Landmark Confidence Threshold"
+
 MEDIAPIPE_MODEL_COMPLEXITY = "Model Complexity"
 
+TRACK_HANDS = "Track Hands"
+
+TRACK_FACE = "Track Face"
+
 MEDIAPIPE_TREE_NAME = "Mediapipe"
 
 SKIP_2D_IMAGE_TRACKING_NAME = "Skip 2d image tracking?"
@@ -87,6 +97,15 @@ def create_mediapipe_parameter_group(
                 tip="Minimum confidence needed to use the previous frame's skeleton estiamte to predict the next one"
                 "Variable name in `mediapipe` code: `min_tracking_confidence`.",
             ),
+            dict(
+                name=LANDMARK_CONFIDENCE_THRESHOLD,
+                type="float",
+                value=parameter_model.landmark_confidence_threshold,
+                step=0.05,
+                limits=(0.0, 1.0),
+                tip="Body landmarks with a mediapipe 'visibility' score below this value are set to NaN in the 2d data. "
+                "Set to 0.0 to keep every detected landmark. The onnx backend uses its own `score_threshold` instead.",
+            ),
             dict(
                 name=STATIC_IMAGE_MODE,
                 type="bool",
@@ -95,6 +114,19 @@ def create_mediapipe_parameter_group(
                 "I think this is equivalent to setting `min_tracking_confidence` to 0.0"
                 "Variable name in `mediapipe` code: `static_image_mode`",
             ),
+            dict(
+                name=TRACK_HANDS,
+                type="bool",
+                value=parameter_model.include_hands,
+                tip="Track the hands. If off, hand points are not tracked, triangulated or saved at all.",
+            ),
+            dict(
+                name=TRACK_FACE,
+                type="bool",
+                value=parameter_model.include_face,
+                tip="Track the face mesh (~478 points). If off, face points are not tracked, triangulated or saved at all, "
+                "and with the hands also off the faster body-only mediapipe model is used.",
+            ),
         ],
     )
 
@@ -113,16 +145,33 @@ def create_3d_triangulation_parameter_group(
                 name=ANIPOSE_CONFIDENCE_CUTOFF,
                 type="float",
                 value=parameter_model.confidence_threshold_cutoff,
-                tip="Confidence threshold cut-off for triangulation. "
+                tip="Confidence threshold cut-off for triangulation, used when weighting by confidence: camera views of a point with a lower confidence are left out. "
                 "NOTE - Never trust a machine learning model's estimates of their own confidence! "
                 "TODO - Something similar that uses `reprojection_error` instead of `confidence`",
             ),
+            dict(
+                name=USE_CONFIDENCE_WEIGHTED_TRIANGULATION,
+                type="bool",
+                value=parameter_model.use_confidence_weighted_triangulation,
+                tip="If true, each camera's view of a point counts in the triangulation in proportion to the 2d tracker's confidence in it. "
+                "Only the body has confidences (mediapipe's 'visibility'), the hands and face are weighted equally. ",
+            ),
             dict(
                 name=USE_RANSAC_METHOD,
                 type="bool",
                 value=parameter_model.use_triangulate_ransac_method,
                 tip="If true, use `anipose`'s `triangulate_ransac` method instead of the default `triangulate_simple` method. "
-                "NOTE - Much slower than the 'simple' method, but might be more accurate and better at rejecting bad camera views. Needs more testing and evaluation to see if it's worth it. ",
+                "NOTE - Slower than the 'simple' method (it triangulates every point from every subset of the cameras), but might be more accurate and better at rejecting bad camera views. Needs more testing and evaluation to see if it's worth it. ",
+            ),
+            dict(
+                name=USE_REPROJECTION_ERROR_FILTERING,
+                type="bool",
+                value=parameter_model.use_reprojection_error_filtering,
+                tip="If true, points with a reprojection error over median + k * MAD, where k is the session's "
+                f"`reprojection_error_threshold_number_of_mads` (currently {parameter_model.reprojection_error_threshold_number_of_mads:g}), "
+                "are re-triangulated once without each of their cameras, "
+                "keeping the drop that lowers their error most and repeating while that helps. "
+                "Costs a triangulation per camera per round for those points, but is much faster than RANSAC. ",
             ),
         ],
     )
@@ -176,12 +225,17 @@ def extract_parameter_model_from_parameter_tree(
             mediapipe_model_complexity=mediapipe_model_complexity_integer,
             min_detection_confidence=parameter_values_dictionary[MINIMUM_DETECTION_CONFIDENCE],
             min_tracking_confidence=parameter_values_dictionary[MINIUMUM_TRACKING_CONFIDENCE],
+            landmark_confidence_threshold=parameter_values_dictionary[LANDMARK_CONFIDENCE_THRESHOLD],
             static_image_mode=parameter_values_dictionary[STATIC_IMAGE_MODE],
+            include_hands=parameter_values_dictionary[TRACK_HANDS],
+            include_face=parameter_values_dictionary[TRACK_FACE],
             skip_2d_image_tracking=parameter_values_dictionary[SKIP_2D_IMAGE_TRACKING_NAME],
         ),
         anipose_triangulate_3d_parameters_model=AniposeTriangulate3DParametersModel(
             confidence_threshold_cutoff=parameter_values_dictionary[ANIPOSE_CONFIDENCE_CUTOFF],
             use_triangulate_ransac_method=parameter_values_dictionary[USE_RANSAC_METHOD],
+            use_reprojection_error_filtering=parameter_values_dictionary[USE_REPROJECTION_ERROR_FILTERING],
+            use_confidence_weighted_triangulation=parameter_values_dictionary[USE_CONFIDENCE_WEIGHTED_TRIANGULATION],
             skip_3d_triangulation=parameter_values_dictionary[SKIP_3D_TRIANGULATION_NAME],
         ),
         post_processing_parameters_model=PostProcessingParametersModel(
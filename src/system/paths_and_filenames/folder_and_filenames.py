@@ -15,6 +15,9 @@ RAW_DATA_FOLDER_NAME = "raw_data"
 LOGS_INFO_AND_SETTINGS_FOLDER_NAME = "logs_info_and_settings"
 LOG_FILE_FOLDER_NAME = "logs"
 CENTER_OF_MASS_FOLDER_NAME = "center_of_mass"
+MEDIAPIPE_2D_BUFFERS_FOLDER_NAME = "mediapipe_2d_buffers"
+MEDIAPIPE_2D_CACHE_FOLDER_NAME = "mediapipe_2d_cache"
+MEDIAPIPE_2D_CHECKPOINTS_FOLDER_NAME = "mediapipe_2d_checkpoints"
 
 STYLESHEET_FOLDER_PATH_FROM_ROOT = "gui/qt/stylesheets"
 
@@ -28,6 +31,7 @@ GUI_STATE_JSON_FILENAME = "gui_state.json"
 
 MEDIAPIPE_2D_NPY_FILENAME = "mediapipe2dData_numCams_numFrames_numTrackedPoints_pixelXYZ.npy"
 MEDIAPIPE_BODY_WORLD_FILENAME = "mediapipeBodyWorld_numCams_numFrames_numTrackedPoitnt_XYZ.npy"
+MEDIAPIPE_2D_CONFIDENCE_NPY_FILENAME = "mediapipe2dData_numCams_numFrames_numTrackedPoints_confidence.npy"
 RAW_MEDIAPIPE_3D_NPY_FILENAME = "mediapipe3dData_numFrames_numTrackedPoints_spatialXYZ.npy"
 MEDIAPIPE_3D_NPY_FILENAME = "mediapipeSkel_3d_body_hands_face.npy"
 MEDIAPIPE_REPROJECTION_ERROR_NPY_FILENAME = "mediapipe3dData_numFrames_numTrackedPoints_reprojectionError.npy"
@@ -0,0 +1,110 @@
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+import cv2
+import numpy as np
+import pytest
+
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.anipose_lib import CameraGroup
+from src.core_processes.processing_2d.mediapipe.mediapipe_skeleton_detector import MediapipeSkeletonDetector
+from src.core_processes.processing_2d.pose_estimator import PoseEstimator, PoseEstimatorResults
+from src.utilities.synthetic_capture_data import (
+    add_outliers,
+    create_synthetic_2d_data,
+    create_synthetic_camera_group,
+    create_synthetic_trajectories,
+)
+
+SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS = 2
+SYNTHETIC_VIDEO_NUMBER_OF_FRAMES = 30
+SYNTHETIC_VIDEO_WIDTH = 64
+SYNTHETIC_VIDEO_HEIGHT = 48
+
+
+def write_synthetic_video(video_file_path: Path, brightness_offset: int, number_of_frames: int = SYNTHETIC_VIDEO_NUMBER_OF_FRAMES):
+    """A small video whose frames get brighter frame by frame, so each frame decodes to a different mean pixel value"""
+    video_writer = cv2.VideoWriter(
+        str(video_file_path), cv2.VideoWriter_fourcc(*"mp4v"), 30, (SYNTHETIC_VIDEO_WIDTH, SYNTHETIC_VIDEO_HEIGHT)
+    )
+    for frame_number in range(number_of_frames):
+        video_writer.write(
+            np.full((SYNTHETIC_VIDEO_HEIGHT, SYNTHETIC_VIDEO_WIDTH, 3), (brightness_offset + 5 * frame_number) % 256, dtype=np.uint8)
+        )
+    video_writer.release()
+
+
+class FrameBrightnessPoseEstimator(PoseEstimator):
+    """
+    Puts every landmark at an x given by the image's mean brightness and a y given by the landmark's index, so the 2d
+    data depends on the video's content without a person in it. Counts the frames it has detected across instances
+    """
+
+    name = "frame_brightness"
+    number_of_frames_detected = 0
+
+    def __init__(self, landmark_group_slices: Dict[str, slice]):
+        super().__init__(landmark_group_slices=landmark_group_slices)
+
+    def detect(self, images: Sequence[np.ndarray]) -> PoseEstimatorResults:
+        FrameBrightnessPoseEstimator.number_of_frames_detected += len(images)
+        results = self._empty_results(batch_size=len(images))
+        for batch_index, image in enumerate(images):
+            results.landmarks_XYZ[batch_index, :, 0] = image.mean() / 255
+            results.landmarks_XYZ[batch_index, :, 1] = np.linspace(0, 1, self._number_of_tracked_points)
+            results.landmarks_XYZ[batch_index, :, 2] = 0
+        results.body_confidences[:] = 1
+        return results
+
+
+@pytest.fixture
+def synthetic_video_folder_path(tmp_path: Path) -> Path:
+    video_folder_path = tmp_path / "synchronized_videos"
+    video_folder_path.mkdir()
+    for camera_index in range(SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS):
+        write_synthetic_video(video_folder_path / f"cam_{camera_index}.mp4", brightness_offset=40 * camera_index)
+    return video_folder_path
+
+
+@pytest.fixture
+def frame_brightness_pose_estimator(monkeypatch) -> type:
+    """Makes `MediapipeSkeletonDetector` (in this process) detect with `FrameBrightnessPoseEstimator`"""
+    FrameBrightnessPoseEstimator.number_of_frames_detected = 0
+    monkeypatch.setattr(
+        MediapipeSkeletonDetector,
+        "_create_pose_estimator",
+        lambda detector: FrameBrightnessPoseEstimator(landmark_group_slices=detector.landmark_group_slices),
+    )
+    return FrameBrightnessPoseEstimator
+
+
+@pytest.fixture
+def synthetic_camera_group() -> CameraGroup:
+    """4 cameras on a 3 meter circle, all looking at the origin"""
+    return create_synthetic_camera_group(number_of_cameras=4)
+
+
+@pytest.fixture
+def synthetic_2d_data(synthetic_camera_group: CameraGroup) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    10 frames of 50 random 3d points as [500, XYZ], and their [4, 500, XY] projections in `synthetic_camera_group`
+    with 1 pixel of noise and 10% of the camera views missing
+    """
+    return create_synthetic_2d_data(synthetic_camera_group, number_of_frames=10, number_of_tracked_points=50)
+
+
+@pytest.fixture
+def synthetic_2d_data_with_outliers(synthetic_2d_data: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """`synthetic_2d_data` with 15% of the camera views thrown ~80 pixels off"""
+    points_3d, points_2d = synthetic_2d_data
+    return points_3d, add_outliers(points_2d)
+
+
+@pytest.fixture
+def synthetic_trajectories(synthetic_camera_group: CameraGroup) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    30 frames of 20 smoothly moving points as [30, 20, XYZ], and their [4, 30, 20, XY] projections in
+    `synthetic_camera_group` with 1 pixel of noise and 30% of the camera views missing
+    """
+    return create_synthetic_trajectories(
+        synthetic_camera_group, number_of_frames=30, number_of_tracked_points=20, missing_fraction=0.3
+    )
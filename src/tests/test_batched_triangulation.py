@@ -0,0 +1,34 @@
+import multiprocessing
+
+import numpy as np
+
+from src.utilities.synthetic_capture_data import create_synthetic_2d_data, create_synthetic_camera_group, legacy_triangulate
+
+
+def test_batched_triangulation_matches_per_point_triangulation(synthetic_camera_group, synthetic_2d_data):
+    _, points_2d = synthetic_2d_data
+
+    legacy_points_3d = legacy_triangulate(synthetic_camera_group, points_2d)
+    batched_points_3d = synthetic_camera_group.triangulate(points_2d)
+
+    assert batched_points_3d.shape == legacy_points_3d.shape
+    np.testing.assert_array_equal(np.isnan(batched_points_3d), np.isnan(legacy_points_3d))
+    assert np.any(np.isnan(batched_points_3d)), "some points should be seen by fewer than 2 cameras"
+    np.testing.assert_allclose(batched_points_3d, legacy_points_3d, rtol=1e-6, atol=1e-6)
+
+
+def test_batched_triangulation_of_one_point_matches_per_point_triangulation():
+    camera_group = create_synthetic_camera_group(number_of_cameras=3)
+    _, points_2d = create_synthetic_2d_data(camera_group, number_of_frames=1, number_of_tracked_points=1, missing_fraction=0.0)
+
+    np.testing.assert_allclose(
+        camera_group.triangulate(points_2d[:, 0]), legacy_triangulate(camera_group, points_2d)[0], rtol=1e-6, atol=1e-6
+    )
+
+
+def test_batched_triangulation_returns_none_when_killed(synthetic_camera_group, synthetic_2d_data):
+    _, points_2d = synthetic_2d_data
+    kill_event = multiprocessing.Event()
+    kill_event.set()
+
+    assert synthetic_camera_group.triangulate(points_2d, kill_event=kill_event) is None
@@ -0,0 +1,53 @@
+import numpy as np
+
+from src.core_processes.capture_volume_calibration.triangulation_process_pool import triangulate_with_reprojection_error
+from src.utilities.synthetic_capture_data import add_confidence_dependent_noise
+
+
+def test_weights_of_one_match_unweighted_triangulation(synthetic_camera_group, synthetic_2d_data):
+    camera_group = synthetic_camera_group
+    _, points_2d = synthetic_2d_data
+    unweighted_points_3d = camera_group.triangulate(points_2d)
+
+    np.testing.assert_allclose(
+        camera_group.triangulate(points_2d, weights=np.ones(points_2d.shape[:2])), unweighted_points_3d, rtol=1e-9, atol=1e-9
+    )
+    # a NaN weight counts as 1
+    np.testing.assert_allclose(
+        camera_group.triangulate(points_2d, weights=np.full(points_2d.shape[:2], np.nan)),
+        unweighted_points_3d,
+        rtol=1e-9,
+        atol=1e-9,
+    )
+
+
+def test_zero_weights_leave_out_camera_views(synthetic_camera_group, synthetic_2d_data):
+    camera_group = synthetic_camera_group
+    _, points_2d = synthetic_2d_data
+    weights = np.random.default_rng(0).uniform(0.2, 1.0, size=points_2d.shape[:2])
+    left_out = np.random.default_rng(1).random(points_2d.shape[:2]) < 0.3
+    weights[left_out] = 0
+
+    weighted_points_3d = camera_group.triangulate(points_2d, weights=weights)
+    points_2d_left_out = np.where(left_out[:, :, None], np.nan, points_2d)
+
+    np.testing.assert_allclose(
+        weighted_points_3d, camera_group.triangulate(points_2d_left_out, weights=weights), rtol=1e-9, atol=1e-9
+    )
+    np.testing.assert_array_equal(np.isnan(weighted_points_3d), np.isnan(camera_group.triangulate(points_2d_left_out)))
+
+
+def test_confidence_weighting_lowers_errors_to_ground_truth(synthetic_camera_group, synthetic_2d_data):
+    camera_group = synthetic_camera_group
+    points_3d, points_2d = synthetic_2d_data
+    points_2d, confidence = add_confidence_dependent_noise(points_2d)
+
+    unweighted_points_3d, _ = triangulate_with_reprojection_error(camera_group, points_2d)
+    weighted_points_3d, weighted_reprojection_error = triangulate_with_reprojection_error(
+        camera_group, points_2d, confidence_flat=confidence
+    )
+
+    assert weighted_reprojection_error.shape == (points_2d.shape[1],)
+    assert np.nanmedian(np.linalg.norm(weighted_points_3d - points_3d, axis=1)) < np.nanmedian(
+        np.linalg.norm(unweighted_points_3d - points_3d, axis=1)
+    )
@@ -0,0 +1,38 @@
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.mediapipe_skeleton_detector import MediapipeSkeletonDetector
+from src.core_processes.processing_2d.pose_estimator import PoseEstimatorResults
+from src.data_layer.session_models.post_processing_parameter_models import MediapipeParametersModel, OnnxPoseParametersModel
+
+
+def test_onnx_backend_uses_its_own_score_threshold(
+    tmp_path: Path, synthetic_video_folder_path: Path, frame_brightness_pose_estimator, monkeypatch
+):
+    detect = frame_brightness_pose_estimator.detect
+
+    def detect_with_low_confidence(pose_estimator, images: Sequence[np.ndarray]) -> PoseEstimatorResults:
+        results = detect(pose_estimator, images)
+        results.body_confidences[:] = 0.4
+        return results
+
+    monkeypatch.setattr(frame_brightness_pose_estimator, "detect", detect_with_low_confidence)
+
+    def get_data2d(detector_backend: str) -> np.ndarray:
+        parameter_model = MediapipeParametersModel(
+            include_hands=False,
+            include_face=False,
+            use_2d_detection_cache=False,
+            checkpoint_2d_detection=False,
+            render_annotated_videos=False,
+            landmark_confidence_threshold=0.5,
+            detector_backend=detector_backend,
+        )
+        return MediapipeSkeletonDetector(
+            parameter_model, use_tqdm=False, onnx_pose_parameters_model=OnnxPoseParametersModel(score_threshold=0.3)
+        ).process_folder(synthetic_video_folder_path, tmp_path / detector_backend)
+
+    assert np.all(np.isnan(get_data2d("mediapipe")))
+    assert not np.any(np.isnan(get_data2d("onnx")))
@@ -0,0 +1,107 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.mediapipe_2d_cache import Mediapipe2dDetectionCache
+from src.core_processes.processing_2d.mediapipe.mediapipe_skeleton_detector import MediapipeSkeletonDetector
+from src.data_layer.session_models.post_processing_parameter_models import MediapipeParametersModel
+from src.system.paths_and_filenames.folder_and_filenames import MEDIAPIPE_2D_CACHE_FOLDER_NAME
+from src.tests.conftest import SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS, SYNTHETIC_VIDEO_NUMBER_OF_FRAMES, write_synthetic_video
+
+
+def _get_parameter_model(**kwargs) -> MediapipeParametersModel:
+    return MediapipeParametersModel(
+        include_hands=False,
+        include_face=False,
+        checkpoint_2d_detection=False,
+        render_annotated_videos=False,
+        **kwargs,
+    )
+
+
+def test_cache_key_changes_with_the_video_and_the_parameters(tmp_path: Path):
+    video_file_path = tmp_path / "cam_0.mp4"
+    write_synthetic_video(video_file_path, brightness_offset=0)
+    cache = Mediapipe2dDetectionCache(cache_folder_path=tmp_path / "cache", parameter_model=_get_parameter_model())
+    cache_key = cache.get_cache_key(video_file_path)
+
+    assert cache.get_cache_key(video_file_path) == cache_key
+    # parameters that don't change the 2d data don't change the key
+    assert Mediapipe2dDetectionCache(tmp_path / "cache", _get_parameter_model(use_threaded_pipeline=False)).get_cache_key(video_file_path) == cache_key
+    assert Mediapipe2dDetectionCache(tmp_path / "cache", _get_parameter_model(frame_stride=2)).get_cache_key(video_file_path) != cache_key
+    assert Mediapipe2dDetectionCache(tmp_path / "cache", _get_parameter_model(), storage_dtype="float32").get_cache_key(video_file_path) != cache_key
+
+    write_synthetic_video(video_file_path, brightness_offset=100)
+    assert cache.get_cache_key(video_file_path) != cache_key
+
+
+def test_cache_round_trips_arrays(tmp_path: Path):
+    cache = Mediapipe2dDetectionCache(cache_folder_path=tmp_path / "cache", parameter_model=_get_parameter_model())
+    arrays = {
+        "data2d": np.random.default_rng(0).random((5, 33, 3)),
+        "body_world": np.random.default_rng(1).random((5, 33, 3)),
+        "body_confidence": np.random.default_rng(2).random((5, 33)),
+    }
+
+    assert cache.load("key") is None
+    cache.save("key", arrays)
+    loaded_arrays = cache.load("key")
+
+    assert loaded_arrays.keys() == arrays.keys()
+    for array_name, array in arrays.items():
+        np.testing.assert_array_equal(loaded_arrays[array_name], array)
+
+
+def test_unchanged_session_hits_the_cache(tmp_path: Path, synthetic_video_folder_path: Path, frame_brightness_pose_estimator):
+    parameter_model = _get_parameter_model()
+    first_data2d = MediapipeSkeletonDetector(parameter_model, use_tqdm=False).process_folder(synthetic_video_folder_path, tmp_path / "output")
+    assert frame_brightness_pose_estimator.number_of_frames_detected == SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS * SYNTHETIC_VIDEO_NUMBER_OF_FRAMES
+    assert len(list((tmp_path / "output" / MEDIAPIPE_2D_CACHE_FOLDER_NAME).glob("*_data2d.npy"))) == SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS
+
+    frame_brightness_pose_estimator.number_of_frames_detected = 0
+    second_data2d = MediapipeSkeletonDetector(parameter_model, use_tqdm=False).process_folder(synthetic_video_folder_path, tmp_path / "output")
+
+    assert frame_brightness_pose_estimator.number_of_frames_detected == 0
+    assert not np.all(np.isnan(first_data2d))
+    np.testing.assert_array_equal(second_data2d, first_data2d)
+
+
+def test_changed_video_misses_the_cache(tmp_path: Path, synthetic_video_folder_path: Path, frame_brightness_pose_estimator):
+    parameter_model = _get_parameter_model()
+    first_data2d = MediapipeSkeletonDetector(parameter_model, use_tqdm=False).process_folder(synthetic_video_folder_path, tmp_path / "output")
+
+    write_synthetic_video(synthetic_video_folder_path / "cam_1.mp4", brightness_offset=150)
+    frame_brightness_pose_estimator.number_of_frames_detected = 0
+    second_data2d = MediapipeSkeletonDetector(parameter_model, use_tqdm=False).process_folder(synthetic_video_folder_path, tmp_path / "output")
+
+    # only the changed camera is detected again
+    assert frame_brightness_pose_estimator.number_of_frames_detected == SYNTHETIC_VIDEO_NUMBER_OF_FRAMES
+    np.testing.assert_array_equal(second_data2d[0], first_data2d[0])
+    assert not np.allclose(second_data2d[1], first_data2d[1], equal_nan=True)
+
+
+def test_changed_parameters_miss_the_cache(tmp_path: Path, synthetic_video_folder_path: Path, frame_brightness_pose_estimator):
+    MediapipeSkeletonDetector(_get_parameter_model(), use_tqdm=False).process_folder(synthetic_video_folder_path, tmp_path / "output")
+
+    frame_brightness_pose_estimator.number_of_frames_detected = 0
+    data2d = MediapipeSkeletonDetector(
+        _get_parameter_model(frame_stride=2, interpolate_skipped_frames=False), use_tqdm=False
+    ).process_folder(synthetic_video_folder_path, tmp_path / "output")
+
+    assert frame_brightness_pose_estimator.number_of_frames_detected == SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS * SYNTHETIC_VIDEO_NUMBER_OF_FRAMES // 2
+    assert np.all(np.isnan(data2d[:, 1::2]))
+
+
+def test_changed_storage_dtype_misses_the_cache(tmp_path: Path, synthetic_video_folder_path: Path, frame_brightness_pose_estimator):
+    parameter_model = _get_parameter_model()
+    float64_data2d = MediapipeSkeletonDetector(parameter_model, use_tqdm=False).process_folder(synthetic_video_folder_path, tmp_path / "output")
+
+    frame_brightness_pose_estimator.number_of_frames_detected = 0
+    float32_data2d = MediapipeSkeletonDetector(parameter_model, use_tqdm=False, storage_dtype="float32").process_folder(
+        synthetic_video_folder_path, tmp_path / "output"
+    )
+
+    assert frame_brightness_pose_estimator.number_of_frames_detected == SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS * SYNTHETIC_VIDEO_NUMBER_OF_FRAMES
+    assert float64_data2d.dtype == np.float64
+    assert float32_data2d.dtype == np.float32
+    np.testing.assert_allclose(float32_data2d, float64_data2d, rtol=1e-6)
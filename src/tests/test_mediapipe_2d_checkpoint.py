@@ -0,0 +1,126 @@
+import multiprocessing
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.mediapipe_2d_checkpoint import Mediapipe2dDetectionCheckpoint
+from src.core_processes.processing_2d.mediapipe.mediapipe_skeleton_detector import MediapipeSkeletonDetector
+from src.core_processes.processing_2d.pose_estimator import PoseEstimatorResults
+from src.data_layer.session_models.post_processing_parameter_models import MediapipeParametersModel
+from src.system.paths_and_filenames.folder_and_filenames import MEDIAPIPE_2D_CHECKPOINTS_FOLDER_NAME
+from src.tests.conftest import SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS, SYNTHETIC_VIDEO_NUMBER_OF_FRAMES
+
+BUFFER_SHAPES = {"data2d": (20, 33, 3), "body_world": (20, 33, 3), "body_confidence": (20, 33)}
+
+
+def _get_parameter_model(**kwargs) -> MediapipeParametersModel:
+    return MediapipeParametersModel(
+        include_hands=False,
+        include_face=False,
+        use_2d_detection_cache=False,
+        checkpoint_2d_detection=True,
+        checkpoint_interval_frames=5,
+        render_annotated_videos=False,
+        **kwargs,
+    )
+
+
+def test_checkpoint_resumes_only_the_remaining_frames(tmp_path: Path):
+    checkpoint = Mediapipe2dDetectionCheckpoint.create_or_resume(tmp_path, "key", "cam_0.mp4", BUFFER_SHAPES)
+    assert not checkpoint.is_resumed
+    buffers = checkpoint.open_buffers()
+    buffers["data2d"][:7] = 1.0
+    buffers["data2d"].flush()
+    del buffers
+    checkpoint.record_progress(start_frame=0, end_frame=10, completed_until_frame=7)
+    checkpoint.record_progress(start_frame=10, end_frame=20, completed_until_frame=12)
+
+    resumed_checkpoint = Mediapipe2dDetectionCheckpoint.create_or_resume(tmp_path, "key", "cam_0.mp4", BUFFER_SHAPES)
+
+    assert resumed_checkpoint.is_resumed
+    assert resumed_checkpoint.get_remaining_frame_ranges(number_of_frames=20) == [(7, 10), (12, 20)]
+    np.testing.assert_array_equal(resumed_checkpoint.open_buffers()["data2d"][:7], 1.0)
+
+
+def test_checkpoint_with_a_different_key_is_discarded(tmp_path: Path):
+    checkpoint = Mediapipe2dDetectionCheckpoint.create_or_resume(tmp_path, "old_key", "cam_0.mp4", BUFFER_SHAPES)
+    checkpoint.record_progress(start_frame=0, end_frame=20, completed_until_frame=10)
+    other_video_checkpoint = Mediapipe2dDetectionCheckpoint.create_or_resume(tmp_path, "other_key", "cam_1.mp4", BUFFER_SHAPES)
+
+    new_checkpoint = Mediapipe2dDetectionCheckpoint.create_or_resume(tmp_path, "new_key", "cam_0.mp4", BUFFER_SHAPES)
+
+    assert not new_checkpoint.is_resumed
+    assert new_checkpoint.get_remaining_frame_ranges(number_of_frames=20) == [(0, 20)]
+    assert not checkpoint.checkpoint_folder_path.exists()
+    assert other_video_checkpoint.checkpoint_folder_path.exists()
+
+
+def test_killed_detection_resumes_from_its_checkpoint_with_the_same_output(
+    tmp_path: Path, synthetic_video_folder_path: Path, frame_brightness_pose_estimator, monkeypatch
+):
+    parameter_model = _get_parameter_model()
+    uninterrupted_data2d = MediapipeSkeletonDetector(parameter_model, use_tqdm=False).process_folder(
+        synthetic_video_folder_path, tmp_path / "uninterrupted_output"
+    )
+    assert not np.all(np.isnan(uninterrupted_data2d))
+
+    # kill the run part way through the second camera
+    number_of_frames_before_kill = SYNTHETIC_VIDEO_NUMBER_OF_FRAMES + SYNTHETIC_VIDEO_NUMBER_OF_FRAMES // 2
+    kill_event = multiprocessing.Event()
+    detect = frame_brightness_pose_estimator.detect
+
+    def detect_until_killed(pose_estimator, images: Sequence[np.ndarray]) -> PoseEstimatorResults:
+        results = detect(pose_estimator, images)
+        if frame_brightness_pose_estimator.number_of_frames_detected >= number_of_frames_before_kill:
+            kill_event.set()
+        return results
+
+    monkeypatch.setattr(frame_brightness_pose_estimator, "detect", detect_until_killed)
+    frame_brightness_pose_estimator.number_of_frames_detected = 0
+    killed_data2d = MediapipeSkeletonDetector(parameter_model, use_tqdm=False).process_folder(
+        synthetic_video_folder_path, tmp_path / "output", kill_event=kill_event
+    )
+    assert killed_data2d is None
+    assert any((tmp_path / "output" / MEDIAPIPE_2D_CHECKPOINTS_FOLDER_NAME).iterdir())
+
+    monkeypatch.setattr(frame_brightness_pose_estimator, "detect", detect)
+    frame_brightness_pose_estimator.number_of_frames_detected = 0
+    resumed_data2d = MediapipeSkeletonDetector(parameter_model, use_tqdm=False).process_folder(
+        synthetic_video_folder_path, tmp_path / "output"
+    )
+
+    # only the frames the killed run hadn't checkpointed are detected again
+    number_of_frames_total = SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS * SYNTHETIC_VIDEO_NUMBER_OF_FRAMES
+    assert 0 < frame_brightness_pose_estimator.number_of_frames_detected <= number_of_frames_total - SYNTHETIC_VIDEO_NUMBER_OF_FRAMES
+    np.testing.assert_array_equal(resumed_data2d, uninterrupted_data2d)
+    # a finished run cleans up its checkpoints
+    assert not any((tmp_path / "output" / MEDIAPIPE_2D_CHECKPOINTS_FOLDER_NAME).iterdir())
+
+
+def test_checkpoint_is_not_resumed_with_a_different_storage_dtype(
+    tmp_path: Path, synthetic_video_folder_path: Path, frame_brightness_pose_estimator, monkeypatch
+):
+    kill_event = multiprocessing.Event()
+    detect = frame_brightness_pose_estimator.detect
+
+    def detect_until_killed(pose_estimator, images: Sequence[np.ndarray]) -> PoseEstimatorResults:
+        results = detect(pose_estimator, images)
+        if frame_brightness_pose_estimator.number_of_frames_detected >= SYNTHETIC_VIDEO_NUMBER_OF_FRAMES // 2:
+            kill_event.set()
+        return results
+
+    monkeypatch.setattr(frame_brightness_pose_estimator, "detect", detect_until_killed)
+    assert MediapipeSkeletonDetector(_get_parameter_model(), use_tqdm=False).process_folder(
+        synthetic_video_folder_path, tmp_path / "output", kill_event=kill_event
+    ) is None
+
+    monkeypatch.setattr(frame_brightness_pose_estimator, "detect", detect)
+    frame_brightness_pose_estimator.number_of_frames_detected = 0
+    float32_data2d = MediapipeSkeletonDetector(_get_parameter_model(), use_tqdm=False, storage_dtype="float32").process_folder(
+        synthetic_video_folder_path, tmp_path / "output"
+    )
+
+    assert frame_brightness_pose_estimator.number_of_frames_detected == SYNTHETIC_VIDEO_NUMBER_OF_CAMERAS * SYNTHETIC_VIDEO_NUMBER_OF_FRAMES
+    assert float32_data2d.dtype == np.float32
+    assert not np.any(np.isnan(float32_data2d[..., :2]))
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from mediapipe.framework.formats import landmark_pb2
+
+from src.core_processes.processing_2d.mediapipe.mediapipe_pose_estimator import (
+    _decode_serialized_landmarks,
+    _read_landmarks_one_at_a_time,
+    mediapipe_landmarks_to_npy,
+)
+
+
+def _create_landmark_list(number_of_points: int, include_presence: bool = False, seed: int = 0):
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility, presence in np.random.default_rng(seed).normal(size=(number_of_points, 5)):
+        landmark = landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+        if include_presence:
+            landmark.presence = presence
+    return landmark_list
+
+
+@pytest.mark.parametrize("include_presence", [False, True])
+@pytest.mark.parametrize("include_visibility", [False, True])
+def test_serialized_landmarks_decode_like_the_landmarks_read_one_at_a_time(include_visibility: bool, include_presence: bool):
+    number_of_fields = 4 if include_visibility else 3
+    for number_of_points in [1, 21, 33, 478]:
+        landmark_list = _create_landmark_list(number_of_points, include_presence=include_presence)
+
+        decoded_landmarks = _decode_serialized_landmarks(landmark_list, number_of_fields)
+
+        # pins the fast path: landmarks laid out the way mediapipe fills them in must not fall back
+        assert decoded_landmarks is not None
+        np.testing.assert_array_equal(decoded_landmarks, _read_landmarks_one_at_a_time(landmark_list, number_of_fields))
+        np.testing.assert_array_equal(mediapipe_landmarks_to_npy(landmark_list, include_visibility=include_visibility), decoded_landmarks)
+
+
+def test_landmarks_with_unset_fields_fall_back_to_reading_one_at_a_time():
+    landmark_list = _create_landmark_list(33)
+    landmark_list.landmark[5].ClearField("visibility")
+    landmark_list.landmark[6].ClearField("y")
+
+    assert _decode_serialized_landmarks(landmark_list, number_of_fields=4) is None
+    for include_visibility in [False, True]:
+        number_of_fields = 4 if include_visibility else 3
+        np.testing.assert_array_equal(
+            mediapipe_landmarks_to_npy(landmark_list, include_visibility=include_visibility),
+            _read_landmarks_one_at_a_time(landmark_list, number_of_fields),
+        )
+
+
+def test_empty_landmark_list():
+    assert mediapipe_landmarks_to_npy(landmark_pb2.NormalizedLandmarkList(), include_visibility=True).shape == (0, 4)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.anipose_lib import (
+    CameraGroup,
+    FisheyeCamera,
+)
+from src.utilities.synthetic_capture_data import create_synthetic_camera_group, opencv_project, opencv_reprojection_error
+
+
+def test_pinhole_projection_matches_opencv(synthetic_camera_group, synthetic_2d_data):
+    camera_group = synthetic_camera_group
+    points_3d, points_2d = synthetic_2d_data
+    for camera in camera_group.cameras:
+        camera.set_distortions([-0.2, 0.05, 0.001, -0.002, 0.01])
+
+    np.testing.assert_allclose(camera_group.project(points_3d), opencv_project(camera_group, points_3d), rtol=0, atol=1e-6)
+    np.testing.assert_allclose(
+        camera_group.reprojection_error(points_3d, points_2d, mean=True),
+        opencv_reprojection_error(camera_group, points_3d, points_2d),
+        rtol=0,
+        atol=1e-6,
+    )
+
+
+def test_single_pinhole_camera_projection_matches_opencv():
+    camera = create_synthetic_camera_group(number_of_cameras=1).cameras[0]
+    points_3d = (np.random.default_rng(0).random((100, 3)) - 0.5) * 2000
+
+    np.testing.assert_allclose(
+        camera.project(points_3d).reshape(-1, 2),
+        opencv_project(CameraGroup([camera]), points_3d)[0],
+        rtol=0,
+        atol=1e-6,
+    )
+
+
+def test_mixed_pinhole_and_fisheye_projection_matches_opencv():
+    camera_group = create_synthetic_camera_group(number_of_cameras=3)
+    pinhole_camera = camera_group.cameras[1]
+    fisheye_camera = FisheyeCamera(
+        matrix=pinhole_camera.get_camera_matrix(),
+        dist=[0.01, -0.005, 0.0, 0.0],
+        size=pinhole_camera.get_size(),
+        rvec=pinhole_camera.get_rotation(),
+        tvec=pinhole_camera.get_translation(),
+        name="fisheye",
+    )
+    camera_group.cameras[1] = fisheye_camera
+    points_3d = (np.random.default_rng(0).random((100, 3)) - 0.5) * 2000
+
+    projected = camera_group.project(points_3d)
+
+    np.testing.assert_allclose(projected[1], fisheye_camera.project(points_3d).reshape(-1, 2), rtol=0, atol=1e-9)
+    for camera_index in [0, 2]:
+        np.testing.assert_allclose(
+            projected[camera_index],
+            opencv_project(CameraGroup([camera_group.cameras[camera_index]]), points_3d)[0],
+            rtol=0,
+            atol=1e-6,
+        )
@@ -0,0 +1,11 @@
+import pytest
+
+from src.core_processes.processing_2d.pose_estimator import PoseEstimator
+
+
+def test_pose_estimator_without_detect_fails_on_construction():
+    class PoseEstimatorWithoutDetect(PoseEstimator):
+        name = "without_detect"
+
+    with pytest.raises(TypeError):
+        PoseEstimatorWithoutDetect(landmark_group_slices={"body": slice(0, 33)})
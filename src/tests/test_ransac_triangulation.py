@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("min_cams", [2, 3])
+def test_batched_ransac_triangulation_matches_triangulate_possible(min_cams: int, synthetic_camera_group, synthetic_2d_data_with_outliers):
+    _, points_2d = synthetic_2d_data_with_outliers
+
+    legacy_points_3d = synthetic_camera_group.triangulate_possible(points_2d[:, :, None], min_cams=min_cams)
+    batched_points_3d = synthetic_camera_group.triangulate_ransac(points_2d, min_cams=min_cams)
+
+    assert batched_points_3d.shape == legacy_points_3d.shape
+    np.testing.assert_array_equal(np.isnan(batched_points_3d), np.isnan(legacy_points_3d))
+    np.testing.assert_allclose(batched_points_3d, legacy_points_3d, rtol=1e-6, atol=1e-6)
+
+
+def test_ransac_triangulation_rejects_outlier_views(synthetic_camera_group, synthetic_2d_data_with_outliers):
+    points_3d, points_2d = synthetic_2d_data_with_outliers
+
+    simple_errors_to_ground_truth = np.linalg.norm(synthetic_camera_group.triangulate(points_2d) - points_3d, axis=1)
+    ransac_errors_to_ground_truth = np.linalg.norm(synthetic_camera_group.triangulate_ransac(points_2d) - points_3d, axis=1)
+
+    assert np.nanmedian(ransac_errors_to_ground_truth) < np.nanmedian(simple_errors_to_ground_truth)
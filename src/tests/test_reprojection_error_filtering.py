@@ -0,0 +1,87 @@
+import numpy as np
+
+from src.core_processes.capture_volume_calibration import triangulate_3d_data
+
+from src.core_processes.capture_volume_calibration.triangulate_3d_data import (
+    get_reprojection_error_threshold,
+    remove_3d_data_with_high_reprojection_error,
+)
+from src.utilities.synthetic_capture_data import add_outliers, create_synthetic_2d_data, create_synthetic_camera_group
+
+NUMBER_OF_FRAMES = 10
+
+
+def _get_filter_inputs(camera_group, points_3d: np.ndarray, points_2d: np.ndarray):
+    """The frame by frame 2d data, ground truth, triangulation and reprojection error of flat synthetic 2d data"""
+    number_of_cameras = len(camera_group.cameras)
+    data3d = camera_group.triangulate(points_2d)
+    reprojection_error = camera_group.reprojection_error(data3d, points_2d, mean=True)
+    return (
+        points_3d.reshape(NUMBER_OF_FRAMES, -1, 3),
+        points_2d.reshape(number_of_cameras, NUMBER_OF_FRAMES, -1, 2),
+        data3d.reshape(NUMBER_OF_FRAMES, -1, 3),
+        reprojection_error.reshape(NUMBER_OF_FRAMES, -1),
+    )
+
+
+def test_reprojection_error_filtering_leaves_two_camera_data_alone():
+    # every point over the threshold is already at `min_cams` cameras, so there is nothing to filter
+    camera_group = create_synthetic_camera_group(number_of_cameras=2)
+    points_3d, points_2d = create_synthetic_2d_data(camera_group, number_of_frames=NUMBER_OF_FRAMES, number_of_tracked_points=50)
+    _, data2d, data3d, reprojection_error = _get_filter_inputs(camera_group, points_3d, add_outliers(points_2d))
+    assert np.any(reprojection_error > get_reprojection_error_threshold(reprojection_error))
+    original_data3d = data3d.copy()
+    original_reprojection_error = reprojection_error.copy()
+
+    assert remove_3d_data_with_high_reprojection_error(camera_group, data2d, data3d, reprojection_error, min_cams=2)
+
+    np.testing.assert_array_equal(data3d, original_data3d)
+    np.testing.assert_array_equal(reprojection_error, original_reprojection_error)
+
+
+def test_reprojection_error_filtering_lowers_errors(synthetic_camera_group, synthetic_2d_data_with_outliers):
+    camera_group = synthetic_camera_group
+    points_3d, data2d, data3d, reprojection_error = _get_filter_inputs(camera_group, *synthetic_2d_data_with_outliers)
+    error_threshold = get_reprojection_error_threshold(reprojection_error)
+    original_data3d = data3d.copy()
+    original_reprojection_error = reprojection_error.copy()
+
+    assert remove_3d_data_with_high_reprojection_error(
+        camera_group, data2d, data3d, reprojection_error, number_of_frames_per_block=3
+    )
+
+    # points under the threshold aren't touched, and points over it never get worse
+    under_threshold = ~(original_reprojection_error > error_threshold)
+    np.testing.assert_array_equal(data3d[under_threshold], original_data3d[under_threshold])
+    assert np.all(reprojection_error[~under_threshold] <= original_reprojection_error[~under_threshold])
+    assert np.sum(reprojection_error > error_threshold) < np.sum(~under_threshold)
+
+    original_errors_to_ground_truth = np.linalg.norm(original_data3d - points_3d, axis=2)[~under_threshold]
+    errors_to_ground_truth = np.linalg.norm(data3d - points_3d, axis=2)[~under_threshold]
+    assert np.nanmedian(errors_to_ground_truth) < np.nanmedian(original_errors_to_ground_truth)
+
+
+def _get_reprojection_errors(number_of_frames: int = 500, number_of_tracked_points: int = 40) -> np.ndarray:
+    reprojection_error = np.random.default_rng(0).lognormal(size=(number_of_frames, number_of_tracked_points))
+    reprojection_error[::7, ::3] = np.nan
+    return reprojection_error
+
+
+def test_reprojection_error_threshold_is_exact_block_by_block():
+    reprojection_error = _get_reprojection_errors()
+    median = np.nanmedian(reprojection_error)
+    expected_threshold = median + 3 * np.nanmedian(np.abs(reprojection_error - median))
+
+    assert get_reprojection_error_threshold(reprojection_error) == expected_threshold
+    assert get_reprojection_error_threshold(reprojection_error, number_of_frames_per_block=7) == expected_threshold
+
+
+def test_reprojection_error_threshold_samples_long_recordings(monkeypatch):
+    reprojection_error = _get_reprojection_errors()
+    exact_threshold = get_reprojection_error_threshold(reprojection_error)
+
+    monkeypatch.setattr(triangulate_3d_data, "MAX_NUMBER_OF_REPROJECTION_ERROR_SAMPLES", 2000)
+    sampled_threshold = get_reprojection_error_threshold(reprojection_error, number_of_frames_per_block=50)
+
+    assert sampled_threshold != exact_threshold
+    np.testing.assert_allclose(sampled_threshold, exact_threshold, rtol=0.1)
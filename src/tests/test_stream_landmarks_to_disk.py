@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.core_processes.processing_2d.mediapipe.mediapipe_skeleton_detector import MediapipeSkeletonDetector
+from src.data_layer.session_models.post_processing_parameter_models import MediapipeParametersModel
+from src.system.paths_and_filenames.folder_and_filenames import MEDIAPIPE_2D_BUFFERS_FOLDER_NAME
+
+
+def _get_parameter_model(**kwargs) -> MediapipeParametersModel:
+    return MediapipeParametersModel(
+        include_hands=False,
+        include_face=False,
+        use_2d_detection_cache=False,
+        checkpoint_2d_detection=False,
+        render_annotated_videos=False,
+        **kwargs,
+    )
+
+
+def test_process_folder_streams_landmarks_to_disk(
+    tmp_path: Path, synthetic_video_folder_path: Path, frame_brightness_pose_estimator, monkeypatch
+):
+    in_memory_data2d = MediapipeSkeletonDetector(_get_parameter_model(), use_tqdm=False).process_folder(
+        synthetic_video_folder_path, tmp_path / "in_memory_output"
+    )
+
+    finish_processed_cameras = MediapipeSkeletonDetector._finish_processed_cameras
+    processed_buffers_are_memmaps = []
+
+    def record_processed_buffers(skeleton_detector, **kwargs):
+        processed_buffers_are_memmaps.extend(
+            isinstance(npy_arrays.data2d_frameNumber_trackedPointNumber_XYZ, np.memmap)
+            for npy_arrays in kwargs["processed_npy_array_list"]
+        )
+        return finish_processed_cameras(skeleton_detector, **kwargs)
+
+    monkeypatch.setattr(MediapipeSkeletonDetector, "_finish_processed_cameras", record_processed_buffers)
+    streamed_data2d = MediapipeSkeletonDetector(_get_parameter_model(stream_landmarks_to_disk=True), use_tqdm=False).process_folder(
+        synthetic_video_folder_path, tmp_path / "streamed_output"
+    )
+
+    assert processed_buffers_are_memmaps == [True, True]
+    assert not np.all(np.isnan(streamed_data2d))
+    np.testing.assert_array_equal(streamed_data2d, in_memory_data2d)
+    # the buffers are removed once the output arrays have their own copy
+    assert not any((tmp_path / "streamed_output" / MEDIAPIPE_2D_BUFFERS_FOLDER_NAME).iterdir())
@@ -0,0 +1,76 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def trajectories_with_gaps(synthetic_trajectories):
+    points_3d, points_2d = synthetic_trajectories
+    # a gap in one point's track, and a point only one camera ever sees
+    points_2d[:, 5:8, 3] = np.nan
+    points_2d[1:, :, 4] = np.nan
+    return points_3d, points_2d
+
+
+def test_warm_start_nan_pattern_matches_simple_triangulation(synthetic_camera_group, trajectories_with_gaps):
+    camera_group = synthetic_camera_group
+    _, points_2d = trajectories_with_gaps
+    number_of_cameras, number_of_frames, number_of_tracked_points, _ = points_2d.shape
+
+    warm_start_points_3d = camera_group.triangulate_warm_start(points_2d)
+    simple_points_3d = camera_group.triangulate(points_2d.reshape(number_of_cameras, -1, 2)).reshape(
+        number_of_frames, number_of_tracked_points, 3
+    )
+
+    assert warm_start_points_3d.shape == (number_of_frames, number_of_tracked_points, 3)
+    np.testing.assert_array_equal(np.isnan(warm_start_points_3d), np.isnan(simple_points_3d))
+    assert np.all(np.isnan(warm_start_points_3d[5:8, 3]))
+    assert np.all(np.isnan(warm_start_points_3d[:, 4]))
+    # the point picks back up after its gap
+    assert np.all(np.isfinite(warm_start_points_3d[8, 3]))
+
+
+def test_warm_start_does_not_reproject_worse_than_simple_triangulation(synthetic_camera_group, trajectories_with_gaps):
+    camera_group = synthetic_camera_group
+    points_3d, points_2d = trajectories_with_gaps
+    number_of_cameras, number_of_frames, number_of_tracked_points, _ = points_2d.shape
+    points_2d_flat = points_2d.reshape(number_of_cameras, -1, 2)
+
+    warm_start_points_3d = camera_group.triangulate_warm_start(points_2d).reshape(-1, 3)
+    simple_points_3d = camera_group.triangulate(points_2d_flat)
+
+    # Gauss-Newton minimizes the sum of squared errors (undistorted, so only roughly in pixels), not the mean error
+    def get_squared_reprojection_error(triangulated_points_3d: np.ndarray) -> np.ndarray:
+        errors = camera_group.reprojection_error(triangulated_points_3d, points_2d_flat)
+        return np.nansum(errors**2, axis=(0, 2))
+
+    triangulated = ~np.isnan(simple_points_3d[:, 0])
+    warm_start_squared_error = get_squared_reprojection_error(warm_start_points_3d)[triangulated]
+    simple_squared_error = get_squared_reprojection_error(simple_points_3d)[triangulated]
+    assert np.all(warm_start_squared_error <= simple_squared_error * 1.01 + 1e-6)
+    assert np.sum(warm_start_squared_error) < np.sum(simple_squared_error)
+    assert np.nanmedian(np.linalg.norm(warm_start_points_3d - points_3d.reshape(-1, 3), axis=1)) < 5.0
+
+
+def test_warm_start_weights_leave_out_camera_views(synthetic_camera_group, trajectories_with_gaps):
+    camera_group = synthetic_camera_group
+    _, points_2d = trajectories_with_gaps
+    weights = np.ones(points_2d.shape[:3])
+    weights[0] = 0
+
+    np.testing.assert_allclose(
+        camera_group.triangulate_warm_start(points_2d, weights=weights),
+        camera_group.triangulate_warm_start(np.where((weights == 0)[..., None], np.nan, points_2d)),
+        rtol=1e-6,
+        atol=1e-6,
+    )
+
+
+def test_warm_start_returns_none_when_killed(synthetic_camera_group, trajectories_with_gaps):
+    camera_group = synthetic_camera_group
+    _, points_2d = trajectories_with_gaps
+    kill_event = multiprocessing.Event()
+    kill_event.set()
+
+    assert camera_group.triangulate_warm_start(points_2d, kill_event=kill_event) is None
@@ -0,0 +1,11 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+from typing import Optional
+
+
+def get_number_of_processes(number_of_tasks: int, max_number_of_processes: Optional[int] = None) -> int:
+    """How many worker processes a pool for `number_of_tasks` tasks should start: one per task, up to the core budget"""
+    core_budget = max_number_of_processes or os.cpu_count() or 1
+    return max(1, min(number_of_tasks, core_budget))
@@ -0,0 +1,67 @@
+import logging
+logger = logging.getLogger(__name__)
+
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class SharedNumpyArray:
+    """
+    A numpy array that lives in `multiprocessing.shared_memory`, so worker processes can write their results straight
+    into the parent's array instead of pickling them back. Create it in the parent, hand `descriptor` to the workers,
+    and re-open it there with `SharedNumpyArray.attach(descriptor)`. Only the process that created it should `unlink` it.
+    """
+
+    def __init__(
+        self,
+        shape: Tuple[int, ...],
+        dtype: np.dtype = np.float64,
+        fill_value: Optional[float] = np.nan,
+        _shared_memory: shared_memory.SharedMemory = None,
+    ):
+        self._shape = tuple(int(dimension) for dimension in shape)
+        self._dtype = np.dtype(dtype)
+        self._is_owner = _shared_memory is None
+
+        if _shared_memory is None:
+            number_of_bytes = max(int(np.prod(self._shape)) * self._dtype.itemsize, 1)
+            _shared_memory = shared_memory.SharedMemory(create=True, size=number_of_bytes)
+
+        self._shared_memory = _shared_memory
+        self._array = np.ndarray(self._shape, dtype=self._dtype, buffer=self._shared_memory.buf)
+
+        if self._is_owner and fill_value is not None:
+            self._array[:] = fill_value
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._array
+
+    @property
+    def descriptor(self) -> Tuple[str, Tuple[int, ...], str]:
+        return (self._shared_memory.name, self._shape, self._dtype.str)
+
+    @classmethod
+    def attach(cls, descriptor: Tuple[str, Tuple[int, ...], str]) -> "SharedNumpyArray":
+        name, shape, dtype = descriptor
+        # multiprocessing children share the parent's resource tracker, so attaching doesn't need any bookkeeping here
+        attached_shared_memory = shared_memory.SharedMemory(name=name)
+        return cls(shape=shape, dtype=np.dtype(dtype), fill_value=None, _shared_memory=attached_shared_memory)
+
+    def close(self):
+        self._array = None
+        try:
+            self._shared_memory.close()
+        except BufferError:
+            # a view onto the block is still referenced (e.g. by an exception traceback); the mapping is released
+            # when that view is garbage collected or the process exits
+            logger.debug(f"Shared memory {self._shared_memory.name} still has views, leaving it mapped")
+
+    def unlink(self):
+        if not self._is_owner:
+            logger.warning(f"Refusing to unlink shared memory {self._shared_memory.name} from a process that did not create it")
+            return
+        self._shared_memory.unlink()
+
@@ -0,0 +1,21 @@
+import logging
+logger = logging.getLogger(__name__)
+
+from typing import Union
+
+import numpy as np
+
+STORAGE_DTYPES = ["float64", "float32"]
+
+# the per camera, per point landmark confidences only need to be good to ~3 digits, so they are always half precision
+CONFIDENCE_STORAGE_DTYPE = np.dtype("float16")
+
+
+def get_storage_dtype(storage_dtype: Union[str, np.dtype] = "float64") -> np.dtype:
+    """
+    The dtype the session's 2d, 3d, reprojection error and center of mass arrays are kept in, in memory and on disk.
+    Numerically sensitive steps (undistortion, triangulation, bundle adjustment) upcast to float64 internally either way
+    """
+    if np.dtype(storage_dtype).name not in STORAGE_DTYPES:
+        raise ValueError(f"Unsupported storage dtype {storage_dtype}, expected one of {STORAGE_DTYPES}")
+    return np.dtype(storage_dtype)
@@ -0,0 +1,156 @@
+import logging
+logger = logging.getLogger(__name__)
+
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.anipose_lib import (
+    Camera,
+    CameraGroup,
+    mean_reprojection_error,
+    triangulate_simple,
+)
+from src.utilities.storage_dtype import CONFIDENCE_STORAGE_DTYPE
+
+
+def create_synthetic_camera_group(number_of_cameras: int = 4, image_width: int = 1920, image_height: int = 1080) -> CameraGroup:
+    """Cameras on a 3 meter circle around the origin, all looking at it, with a little lens distortion"""
+    cameras = []
+    for camera_index in range(number_of_cameras):
+        angle = 2 * np.pi * camera_index / number_of_cameras
+        camera_position = np.array([3000 * np.cos(angle), 3000 * np.sin(angle), 1000.0])
+
+        # rows of the world to camera rotation: camera x, y (down) and z (forward, towards the origin)
+        forward = -camera_position / np.linalg.norm(camera_position)
+        right = np.cross(forward, [0.0, 0.0, 1.0])
+        right /= np.linalg.norm(right)
+        down = np.cross(forward, right)
+        rotation_matrix = np.stack([right, down, forward])
+
+        cameras.append(
+            Camera(
+                matrix=[[1400.0, 0.0, image_width / 2], [0.0, 1400.0, image_height / 2], [0.0, 0.0, 1.0]],
+                dist=[-0.05, 0.01, 0.0, 0.0, 0.0],
+                size=(image_width, image_height),
+                rvec=cv2.Rodrigues(rotation_matrix)[0].ravel(),
+                tvec=-rotation_matrix @ camera_position,
+                name=f"cam_{camera_index}",
+            )
+        )
+    return CameraGroup(cameras)
+
+
+def create_synthetic_2d_data(
+    camera_group: CameraGroup,
+    number_of_frames: int = 200,
+    number_of_tracked_points: int = 553,
+    pixel_noise: float = 1.0,
+    missing_fraction: float = 0.1,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Random 3d points in a 2 meter cube, and their [number_of_cameras, number_of_frames * number_of_tracked_points, XY]
+    projections with pixel noise and `missing_fraction` of the camera views set to NaN
+    """
+    random_number_generator = np.random.default_rng(seed)
+    points_3d = (random_number_generator.random((number_of_frames * number_of_tracked_points, 3)) - 0.5) * 2000
+    points_2d = _project_with_noise(camera_group, points_3d, pixel_noise, missing_fraction, random_number_generator)
+    return points_3d, points_2d
+
+
+def create_synthetic_trajectories(
+    camera_group: CameraGroup,
+    number_of_frames: int = 300,
+    number_of_tracked_points: int = 553,
+    frames_per_second: float = 30.0,
+    pixel_noise: float = 1.0,
+    missing_fraction: float = 0.1,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Points swinging smoothly (up to ~2 m/s) around random spots in a 2 meter cube, as [number_of_frames,
+    number_of_tracked_points, XYZ], and their [number_of_cameras, number_of_frames, number_of_tracked_points, XY]
+    projections with pixel noise and `missing_fraction` of the camera views set to NaN
+    """
+    random_number_generator = np.random.default_rng(seed)
+    centers = (random_number_generator.random((number_of_tracked_points, 3)) - 0.5) * 1400
+    amplitudes = random_number_generator.uniform(50, 300, size=(number_of_tracked_points, 3))
+    frequencies = random_number_generator.uniform(0.2, 1.0, size=(number_of_tracked_points, 3))
+    phases = random_number_generator.uniform(0, 2 * np.pi, size=(number_of_tracked_points, 3))
+    seconds = np.arange(number_of_frames)[:, None, None] / frames_per_second
+    points_3d = centers + amplitudes * np.sin(2 * np.pi * frequencies * seconds + phases)
+
+    points_2d = _project_with_noise(camera_group, points_3d.reshape(-1, 3), pixel_noise, missing_fraction, random_number_generator)
+    return points_3d, points_2d.reshape(len(camera_group.cameras), number_of_frames, number_of_tracked_points, 2)
+
+
+def _project_with_noise(
+    camera_group: CameraGroup,
+    points_3d: np.ndarray,
+    pixel_noise: float,
+    missing_fraction: float,
+    random_number_generator: np.random.Generator,
+) -> np.ndarray:
+    points_2d = camera_group.project(points_3d)
+    points_2d += random_number_generator.normal(scale=pixel_noise, size=points_2d.shape)
+    points_2d[random_number_generator.random(points_2d.shape[:2]) < missing_fraction] = np.nan
+    return points_2d
+
+
+def add_outliers(points_2d: np.ndarray, outlier_fraction: float = 0.15, outlier_pixels: float = 80.0, seed: int = 1) -> np.ndarray:
+    """Throws `outlier_fraction` of the camera views `outlier_pixels`-ish off, so ransac has bad views to reject"""
+    random_number_generator = np.random.default_rng(seed)
+    points_2d = points_2d.copy()
+    outliers = random_number_generator.random(points_2d.shape[:2]) < outlier_fraction
+    points_2d[outliers] += random_number_generator.normal(scale=outlier_pixels, size=(outliers.sum(), 2))
+    return points_2d
+
+
+def add_confidence_dependent_noise(
+    points_2d: np.ndarray,
+    minimum_confidence: float = 0.2,
+    low_confidence_pixels: float = 20.0,
+    seed: int = 2,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gives every camera view a confidence between `minimum_confidence` and 1, and adds pixel noise that grows to
+    `low_confidence_pixels` as the confidence drops, the way a detector's guesses at occluded points wander.
+    Returns the noisy points and the half precision [number_of_cameras, number_of_points] confidences
+    """
+    random_number_generator = np.random.default_rng(seed)
+    confidence = random_number_generator.uniform(minimum_confidence, 1.0, size=points_2d.shape[:2])
+    pixel_noise = low_confidence_pixels * (1 - confidence) / (1 - minimum_confidence)
+    points_2d = points_2d + random_number_generator.normal(size=points_2d.shape) * pixel_noise[..., None]
+    return points_2d, confidence.astype(CONFIDENCE_STORAGE_DTYPE)
+
+
+def legacy_triangulate(camera_group: CameraGroup, points: np.ndarray) -> np.ndarray:
+    """The original one-point-at-a-time `CameraGroup.triangulate` loop, that the batched triangulation is checked against"""
+    undistorted_points = np.empty(points.shape)
+    for camera_index, camera in enumerate(camera_group.cameras):
+        undistorted_points[camera_index] = camera.undistort_points(np.copy(points[camera_index]))
+
+    camera_mats = np.array([camera.get_extrinsics_mat() for camera in camera_group.cameras])
+    out = np.full((points.shape[1], 3), np.nan)
+    for point_index in range(points.shape[1]):
+        point_2d = undistorted_points[:, point_index, :]
+        good = ~np.isnan(point_2d[:, 0])
+        if np.sum(good) >= 2:
+            out[point_index] = triangulate_simple(point_2d[good], camera_mats[good])
+    return out
+
+
+def opencv_project(camera_group: CameraGroup, points_3d: np.ndarray) -> np.ndarray:
+    """The original one `cv2.projectPoints` call per camera projection, that the vectorized projection is checked against"""
+    return np.array(
+        [
+            cv2.projectPoints(points_3d.reshape(-1, 1, 3), camera.rvec, camera.tvec, camera.matrix, camera.dist)[0].reshape(-1, 2)
+            for camera in camera_group.cameras
+        ]
+    )
+
+
+def opencv_reprojection_error(camera_group: CameraGroup, points_3d: np.ndarray, points_2d: np.ndarray) -> np.ndarray:
+    return mean_reprojection_error(points_2d - opencv_project(camera_group, points_3d))
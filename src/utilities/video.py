@@ -287,6 +287,62 @@ def convert_video_to_mp4(input_video_pathstring: str, output_video_pathstring: s
     )
     return Path(output_video_pathstring)
 
+def concatenate_videos(input_video_paths: list[Path], output_video_path: Union[str, Path]) -> Path:
+    """
+    Joins videos end to end. Uses ffmpeg's concat demuxer to copy the streams without re-encoding, and falls back to
+    re-encoding frame by frame with opencv if ffmpeg isn't available or fails
+    """
+    output_video_path = Path(output_video_path)
+    concat_list_path = output_video_path.with_suffix(".concat.txt")
+    concat_list_path.write_text("".join(f"file '{Path(path).resolve().as_posix()}'\n" for path in input_video_paths))
+
+    try:
+        concatenate_subprocess = subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                str(concat_list_path),
+                "-c",
+                "copy",
+                str(output_video_path),
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        if concatenate_subprocess.returncode == 0:
+            return output_video_path
+        logger.warning(f"ffmpeg failed to concatenate videos into {output_video_path}, re-encoding with opencv instead")
+    except FileNotFoundError:
+        logger.warning("ffmpeg not found, concatenating videos with opencv instead")
+    finally:
+        concat_list_path.unlink(missing_ok=True)
+
+    video_writer = None
+    try:
+        for input_video_path in input_video_paths:
+            cap = cv2.VideoCapture(str(input_video_path))
+            if video_writer is None:
+                video_writer = cv2.VideoWriter(
+                    str(output_video_path),
+                    cv2.VideoWriter_fourcc(*"mp4v"),
+                    cap.get(cv2.CAP_PROP_FPS),
+                    (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))),
+                )
+            success, image = cap.read()
+            while success:
+                video_writer.write(image)
+                success, image = cap.read()
+            cap.release()
+    finally:
+        if video_writer is not None:
+            video_writer.release()
+    return output_video_path
+
 
 def get_framerates_of_videos(folder_path: Union[str, Path]) -> list[float]:
     video_paths = get_video_paths(Path(folder_path))